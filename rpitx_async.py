@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+import time
+import asyncio
+import subprocess
+from typing import AsyncIterator, List, Optional
+
+import numpy as np
+
+from rpitx_iq import BYTES_PER_SAMPLE, encode_samples
+from rpitx_metrics import timed_chunks
+from rpitx_supervisor import CANCEL_GRACE, ResourceUsage, SupervisedProcess, deadline_chunks, deadline_for
+
+
+class TransmissionHandle:
+    """A transmission running on the event loop
+
+    Await the handle (or its wait()) for completion; a failed tool raises the
+    same exception as the blocking transmit_* methods ("<tool> error: ..."
+    or "<tool> timed out ..."). The tool runs as a SupervisedProcess, with
+    the same deadline, process-group kill and wait4 accounting as
+    RpiTX.execute(). When it ends, the plan's phase timings are recorded
+    with metrics. With dither, integer sample formats get the same TPDF
+    dither as the blocking path.
+    """
+
+    def __init__(self, plan, process: SupervisedProcess, stderr: asyncio.StreamReader,
+                 metrics=None, origin: Optional[float] = None, dither: bool = False):
+        self.plan = plan
+        self.process = plan.process = process
+        self.metrics = metrics  # rpitx_metrics.TransmissionMetrics
+        self.started = plan.started = time.monotonic()
+        self.origin = origin or self.started
+        plan.timings["spawn"] = self.started - self.origin
+        self.finished: Optional[float] = None
+        self.written: Optional[float] = None  # once the last sample is accepted
+        self.samples_sent = 0
+        self.cancelled = False
+        self.failure: Optional[str] = None  # why the tool failed, once it has ended
+        self.rng = np.random.default_rng() if dither else None
+        self._stderr: List[str] = []
+        self._stderr_done = False
+        self._stderr_changed = asyncio.Condition()
+        self._reader = asyncio.ensure_future(self._read_stderr(stderr))
+        # Reaping blocks, so one worker thread waits for the tool
+        self._exited = asyncio.get_running_loop().run_in_executor(None, process.wait)
+        self._feeder = None
+        if plan.chunks is not None:
+            chunks = timed_chunks(plan.chunks, plan.timings)
+            plan.chunks = deadline_chunks(chunks, process, plan.sample_rate)
+            self._feeder = asyncio.ensure_future(self._feed())
+
+    @classmethod
+    async def start(cls, plan, metrics=None, dither: bool = False) -> "TransmissionHandle":
+        """Spawn the plan's tool and start streaming its samples"""
+        if plan.align is not None:
+            await asyncio.get_running_loop().run_in_executor(None, plan.align)
+        origin = time.monotonic()
+        streamed = plan.chunks is not None
+        # A streamed tool's deadline grows with the samples fed to it
+        expected = (plan.duration or 0.0) if streamed else plan.duration
+        process = SupervisedProcess(plan.command, deadline_for(expected),
+                                    stdin=subprocess.PIPE if streamed else subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = asyncio.StreamReader()
+        await asyncio.get_running_loop().connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(stderr), process.proc.stderr)
+        return cls(plan, process, stderr, metrics, origin, dither)
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def progress(self) -> Optional[float]:
+        """Fraction of the transmission completed, or None when its length is unknown"""
+        if self.finished is not None:
+            return 1.0
+        if not self.plan.duration:
+            return None
+        if self.plan.chunks is not None:
+            done = self.samples_sent / (self.plan.duration * self.plan.sample_rate)
+        else:
+            done = self.elapsed / self.plan.duration
+        return min(done, 1.0)
+
+    @property
+    def usage(self) -> Optional[ResourceUsage]:
+        """The tool's CPU time, peak RSS and context switches, once it has exited"""
+        return self.process.usage
+
+    def done(self) -> bool:
+        return self.finished is not None
+
+    def _send_next(self) -> Optional[int]:
+        """Render, encode and write the next chunk, returning its samples (None at
+        the end); runs off the event loop, as rendering and pipe writes block"""
+        chunk = next(self.plan.chunks, None)
+        if chunk is None:
+            return None
+        chunk = encode_samples(chunk, self.plan.iq_type, rng=self.rng)
+        self.process.proc.stdin.write(memoryview(chunk.view(np.uint8)))
+        return chunk.nbytes // BYTES_PER_SAMPLE[self.plan.iq_type]
+
+    async def _feed(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                # Rendering (SSTV, spectrum painting...) can take a while per
+                # chunk, so it happens on a worker thread, one chunk at a time
+                sent = await loop.run_in_executor(None, self._send_next)
+                if sent is None:
+                    break
+                if not self.samples_sent:
+                    self.plan.timings["first_sample"] = time.monotonic() - self.origin
+                self.samples_sent += sent
+            await loop.run_in_executor(None, self.process.proc.stdin.close)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        self.written = time.monotonic()
+
+    async def _read_stderr(self, stderr: asyncio.StreamReader):
+        async for line in stderr:
+            async with self._stderr_changed:
+                self._stderr.append(line.decode(errors="replace").rstrip("\n"))
+                self._stderr_changed.notify_all()
+        async with self._stderr_changed:
+            self._stderr_done = True
+            self._stderr_changed.notify_all()
+
+    async def stderr(self) -> AsyncIterator[str]:
+        """Yield the tool's stderr lines as they arrive, from the beginning"""
+        index = 0
+        while True:
+            async with self._stderr_changed:
+                await self._stderr_changed.wait_for(
+                    lambda: index < len(self._stderr) or self._stderr_done)
+                lines = self._stderr[index:]
+                finished = self._stderr_done
+            for line in lines:
+                yield line
+            index += len(lines)
+            if finished and index == len(self._stderr):
+                return
+
+    def cancel(self):
+        """Stop the transmission: stop feeding samples and terminate the tool's group
+
+        The tool gets SIGTERM, then SIGKILL if it is still running after
+        CANCEL_GRACE seconds.
+        """
+        if self.done() or self.cancelled:
+            return
+        self.cancelled = True
+        if self._feeder:
+            self._feeder.cancel()
+        self.process.cancel()
+
+    async def wait(self):
+        """Wait for the transmission to end"""
+        error = None
+        if self._feeder:
+            try:
+                await self._feeder
+            except asyncio.CancelledError:
+                if not self.cancelled:
+                    raise
+            except Exception as e:
+                # The render failed (e.g. an enforced mask): the tool must not linger
+                error = e
+                self.process.kill()
+        await self._exited
+        await self._reader
+        if self.finished is None:
+            self.finished = self.plan.finished = time.monotonic()
+            self.plan.close()
+            if self.plan.chunks is not None:
+                try:
+                    self.process.proc.stdin.close()
+                except OSError:
+                    pass  # unflushed samples of a killed tool
+            self.failure = str(error) if error else self.process.failure("\n".join(self._stderr))
+            self._record()
+        if self.cancelled:
+            raise asyncio.CancelledError()
+        if self.failure:
+            raise Exception(self.failure)
+
+    def _record(self):
+        timings = self.plan.timings
+        if self._feeder:
+            written = self.written or self.finished
+            timings["transmit"] = written - self.started
+            timings["teardown"] = self.finished - written
+        else:
+            timings["transmit"] = self.finished - self.started
+        timings["total"] = self.finished - self.origin
+        self.plan.resources = self.process.usage.as_dict()
+        if self.metrics is None:
+            return
+        if self.process.timed_out:
+            self.metrics.record(self.plan, "timeout", self.failure)
+        elif self.cancelled:
+            self.metrics.record(self.plan, "cancelled", self.failure)
+        elif self.failure:
+            self.metrics.record(self.plan, "error", self.failure)
+        else:
+            self.metrics.record(self.plan)
+
+    def __await__(self):
+        return self.wait().__await__()
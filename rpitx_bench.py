@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from rpitx_chirp import RpiTX, RadioConfig
+from rpitx_image import ImageCache, set_image_cache
+from rpitx_iq import SAMPLE_RATE
+
+# Every rpitx tool name the stand-in answers to
+FAKE_TOOLS = ("sendiq", "pichirp", "piopera", "pisstv", "pocsag", "morse", "spectrumpaint",
+              "pift8", "tune", "sendook")
+
+# Stand-in for the rpitx binaries. It drains stdin at speed times the real
+# rate implied by sendiq's -s/-t (0 means as fast as possible), sleeps for
+# pichirp's duration argument, and appends one JSON line per run to
+# $KHANFAR_FAKE_LOG.
+FAKE_TOOL_SCRIPT = r'''#!{python}
+import os, sys, json, time
+BYTES = {{"float": 8, "i16": 4, "u8": 2}}
+tool = os.path.basename(sys.argv[0])
+args = sys.argv[1:]
+speed = float(os.environ.get("KHANFAR_FAKE_SPEED", "1"))
+start = time.monotonic()
+received = 0
+first = None
+if tool == "sendiq":
+    opts = dict(zip(args[::2], args[1::2]))
+    rate = int(opts.get("-s", 48000)) * BYTES.get(opts.get("-t", "float"), 8) * speed
+    stdin = sys.stdin.buffer
+    while True:
+        block = stdin.read1(1 << 16)
+        if not block:
+            break
+        if first is None:
+            first = time.monotonic() - start
+        received += len(block)
+        if rate:
+            ahead = received / rate - (time.monotonic() - start)
+            if ahead > 0:
+                time.sleep(ahead)
+elif tool == "pichirp" and len(args) >= 3 and speed:
+    time.sleep(float(args[2]) / speed)
+log = os.environ.get("KHANFAR_FAKE_LOG")
+if log:
+    with open(log, "a") as f:
+        f.write(json.dumps({{"tool": tool, "args": args, "bytes": received, "first_byte": first,
+                            "elapsed": time.monotonic() - start}}) + "\n")
+'''
+
+# Benchmark jobs: mode -> transmit parameters ("{image}" is a generated test card)
+BENCH_JOBS = {
+    "tone": {"duration": 5.0, "tone_freq": 1000.0},
+    "morse": {"text": "CQ CQ CQ DE N0CALL N0CALL K", "wpm": 20},
+    "rtty": {"text": "RYRYRYRY THE QUICK BROWN FOX 0123456789", "baud": 45},
+    "pocsag": {"message": "BENCHMARK PAGE 0123456789"},
+    "ft8": {"message": "CQ N0CALL FN31", "callsign": "N0CALL"},
+    "sstv": {"image_path": "{image}", "mode": "Robot36"},
+    "spectrum": {"image_path": "{image}", "rows": 64},
+    "chirp": {"duration": 1.0, "bandwidth": 100000},
+    "opera": {"callsign": "N0CALL"},
+}
+
+# Narrowband modes that may be rendered at a low rate and upsampled
+RESAMPLED_MODES = ("morse", "rtty", "pocsag")
+
+
+@contextlib.contextmanager
+def fake_tools(speed: float = 0.0, directory: Optional[str] = None) -> Iterator[str]:
+    """Put stand-in rpitx tools first on PATH; yields the JSON-lines log path"""
+    owned = directory is None
+    directory = directory or tempfile.mkdtemp(prefix="khanfar-fake-")
+    script = os.path.join(directory, "fake_rpitx")
+    with open(script, "w") as f:
+        f.write(FAKE_TOOL_SCRIPT.format(python=sys.executable))
+    os.chmod(script, 0o755)
+    for tool in FAKE_TOOLS:
+        link = os.path.join(directory, tool)
+        if not os.path.lexists(link):
+            os.symlink(script, link)
+    log = os.path.join(directory, "calls.jsonl")
+    saved = {k: os.environ.get(k) for k in ("PATH", "KHANFAR_FAKE_SPEED", "KHANFAR_FAKE_LOG")}
+    os.environ["PATH"] = directory + os.pathsep + os.environ.get("PATH", "")
+    os.environ["KHANFAR_FAKE_SPEED"] = str(speed)
+    os.environ["KHANFAR_FAKE_LOG"] = log
+    try:
+        yield log
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        if owned:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def read_calls(log: str) -> List[dict]:
+    """Calls recorded by the stand-in tools, oldest first"""
+    if not os.path.exists(log):
+        return []
+    with open(log) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _test_card(path: str) -> Optional[str]:
+    """Write a colour-bar test image, or return None without Pillow"""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    bars = np.array([[255, 255, 255], [255, 255, 0], [0, 255, 255], [0, 255, 0],
+                     [255, 0, 255], [255, 0, 0], [0, 0, 255], [0, 0, 0]], dtype=np.uint8)
+    pixels = np.repeat(np.repeat(bars[None], 240, axis=0), 40, axis=1)
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+def _jobs(modes: List[str], image: Optional[str]) -> Dict[str, dict]:
+    jobs = {}
+    for mode in modes:
+        params = dict(BENCH_JOBS[mode])
+        if params.get("image_path") == "{image}":
+            if image is None:
+                continue
+            params["image_path"] = image
+        jobs[mode] = params
+    return jobs
+
+
+def bench_render(radio: RpiTX, mode: str, params: dict, repeat: int) -> Optional[dict]:
+    """Synthesis speed of an in-process mode, without any tool attached"""
+    if not hasattr(radio, f"_render_{mode}"):
+        return None
+    times = []
+    samples = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        samples = sum(len(chunk) for chunk in radio.plan(mode, **params).chunks)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        "samples": samples,
+        "render_s": best,
+        "samples_per_s": samples / best,
+        "realtime_factor": samples / SAMPLE_RATE / best,
+    }
+
+
+def bench_resample(config: RadioConfig, mode: str, params: dict, repeat: int) -> dict:
+    """CPU time of rendering at the sendiq rate versus at a low rate plus upsampling"""
+    result = {}
+    for label, resample in (("direct", False), ("resampled", True)):
+        radio = RpiTX(resample=resample)
+        radio.current_config = config
+        times = []
+        for _ in range(repeat):
+            start = time.process_time()
+            for _chunk in radio.plan(mode, **params).chunks:
+                pass
+            times.append(time.process_time() - start)
+        result[f"{label}_cpu_s"] = min(times)
+    direct = result["direct_cpu_s"]
+    result["cpu_saved"] = 1.0 - result["resampled_cpu_s"] / direct if direct else 0.0
+    return result
+
+
+def bench_dispatch(radio: RpiTX, mode: str, params: dict, repeat: int) -> dict:
+    """Phase timings of full transmissions against the stand-in tools"""
+    timings: Dict[str, List[float]] = {}
+    for _ in range(repeat):
+        plan = radio.plan(mode, **params)
+        plan.align = None  # dispatch latency, not the wait for an FT8 slot
+        radio.execute(plan)
+        for phase, seconds in plan.timings.items():
+            timings.setdefault(phase, []).append(seconds)
+    return {phase: {"median": float(np.median(values)), "max": max(values)}
+            for phase, values in timings.items()}
+
+
+def bench_throughput(radio: RpiTX, log: str, seconds: float = 60.0) -> dict:
+    """Sustained sendiq feed rate for a long tone with an unthrottled consumer"""
+    before = len(read_calls(log))
+    plan = radio.plan("tone", duration=seconds, tone_freq=1000.0)
+    radio.execute(plan)
+    call = read_calls(log)[before]
+    elapsed = plan.timings["transmit"]
+    samples = call["bytes"] // 8
+    return {
+        "samples": samples,
+        "bytes": call["bytes"],
+        "elapsed_s": elapsed,
+        "samples_per_s": samples / elapsed,
+        "realtime_factor": samples / SAMPLE_RATE / elapsed,
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(modes: Optional[List[str]] = None, repeat: int = 3, speed: float = 0.0,
+        throughput_seconds: float = 60.0) -> dict:
+    """Run every benchmark against the stand-in tools and return the results"""
+    modes = modes or list(BENCH_JOBS)
+    set_image_cache(ImageCache(None))  # keep results independent of the on-disk cache
+    radio = RpiTX()
+    radio.current_config = RadioConfig(frequency=145500000, modulation="FM", power=1.0,
+                                       bandwidth=12500, name="Benchmark")
+    results: dict = {
+        "commit": _commit(),
+        "time": time.time(),
+        "host": {"machine": platform.machine(), "python": platform.python_version(),
+                 "numpy": np.__version__},
+        "repeat": repeat,
+        "speed": speed,
+        "modes": {},
+    }
+    with tempfile.TemporaryDirectory(prefix="khanfar-bench-") as work, fake_tools(speed) as log:
+        image = _test_card(os.path.join(work, "card.png"))
+        for mode, params in _jobs(modes, image).items():
+            results["modes"][mode] = {
+                "render": bench_render(radio, mode, params, repeat),
+                "dispatch": bench_dispatch(radio, mode, params, repeat),
+            }
+            if mode in RESAMPLED_MODES:
+                results["modes"][mode]["resample"] = bench_resample(radio.current_config, mode,
+                                                                    params, repeat)
+        results["throughput"] = bench_throughput(radio, log, throughput_seconds)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark RpiTX against stand-in rpitx tools')
+    parser.add_argument('--modes', nargs='+', choices=list(BENCH_JOBS),
+                        help='Modes to benchmark (default: all)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Runs per mode; render speed is the best run (default: 3)')
+    parser.add_argument('--speed', type=float, default=0.0,
+                        help='Stand-in playback speed, 1 for real time, 0 for unthrottled (default: 0)')
+    parser.add_argument('--throughput-seconds', type=float, default=60.0,
+                        help='Length of the tone streamed for the throughput test (default: 60)')
+    parser.add_argument('--output', type=str,
+                        help='Write JSON results to this file instead of stdout')
+    args = parser.parse_args()
+
+    results = run(args.modes, args.repeat, args.speed, args.throughput_seconds)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+from rpitx_image import image_cache
+from rpitx_iq import SAMPLE_RATE
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/khanfar-tx/iq")
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024  # bytes
+
+# Stored sample formats: file extension, on-disk dtype and sendiq -t type
+SAMPLE_FORMATS = {
+    "float32": (".cf32", np.complex64, "float"),
+    "int16": (".cs16", np.int16, "i16"),
+}
+
+# RadioConfig fields that do not change the rendered baseband
+_UNRENDERED_FIELDS = ("frequency", "name", "description")
+
+
+def _with_digests(params):
+    """Params with every existing file named by a *_path key paired with its content hash
+
+    A render depends on what is in the file, not on its name, so editing
+    an image in place must not replay the old render.
+    """
+    if isinstance(params, dict):
+        return {k: {"path": v, "sha256": image_cache().digest(v)}
+                if k.endswith("_path") and isinstance(v, str) and os.path.isfile(v) else _with_digests(v)
+                for k, v in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_with_digests(v) for v in params]
+    return params
+
+
+class RenderCache:
+    """Content-addressed on-disk cache of rendered IQ, replayed by memory mapping"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_SIZE,
+                 sample_format: str = "float32"):
+        if sample_format not in SAMPLE_FORMATS:
+            raise Exception(f"Unsupported cache sample format: {sample_format}")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.sample_format = sample_format
+        self.extension, self.dtype, self.iq_type = SAMPLE_FORMATS[sample_format]
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the LRU index from the files on disk, oldest first"""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(self.extension):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-len(self.extension)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._size += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.extension)
+
+    @property
+    def size(self) -> int:
+        """Total bytes currently held in the cache"""
+        return self._size
+
+    def key(self, mode: str, params: dict, config=None, sample_rate: int = SAMPLE_RATE) -> str:
+        """Hash a render request into a cache key"""
+        rendered = {}
+        if config is not None:
+            rendered = {k: v for k, v in asdict(config).items() if k not in _UNRENDERED_FIELDS}
+        blob = json.dumps({
+            "mode": mode,
+            "params": _with_digests(params),
+            "config": rendered,
+            "sample_rate": sample_rate,
+            "format": self.sample_format,
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(blob.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[np.memmap]:
+        """Return a read-only memory map of a cached render, or None on a miss"""
+        with self._lock:
+            if key in self._entries:
+                path = self._path(key)
+                try:
+                    samples = np.memmap(path, dtype=self.dtype, mode="r")
+                    os.utime(path)
+                except (FileNotFoundError, ValueError):
+                    self._size -= self._entries.pop(key)
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return samples
+            self.misses += 1
+            return None
+
+    def store(self, key: str, chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Pass complex64 chunks through while writing them to the cache
+
+        The entry is only committed once the stream is exhausted; renders
+        larger than the cache are passed through without being kept.
+        """
+        tmp_path = self._path(key) + f".{os.getpid()}.tmp"
+        written = 0
+        keep = True
+        try:
+            with open(tmp_path, "wb") as f:
+                for chunk in chunks:
+                    stored = self._encode(chunk)
+                    yield stored
+                    written += stored.nbytes
+                    keep = keep and written <= self.max_bytes
+                    if keep:
+                        f.write(memoryview(stored.view(np.uint8)))
+            if keep:
+                os.replace(tmp_path, self._path(key))
+                self._add(key, written)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _encode(self, chunk: np.ndarray) -> np.ndarray:
+        """Convert a complex64 chunk to the stored sample format"""
+        if self.dtype is np.complex64:
+            return np.ascontiguousarray(chunk, dtype=np.complex64)
+        interleaved = np.ascontiguousarray(chunk, dtype=np.complex64).view(np.float32)
+        return np.clip(interleaved * 32767.0, -32768, 32767).astype(np.int16)
+
+    def _add(self, key: str, size: int):
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        while self._size > self.max_bytes and self._entries:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Remove every cached render"""
+        with self._lock:
+            for key in list(self._entries):
+                try:
+                    os.unlink(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._entries.clear()
+            self._size = 0
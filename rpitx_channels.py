@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+import os
+import json
+import bisect
+from dataclasses import asdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from rpitx_chirp import RadioConfig
+
+COMPACT_MIN = 1000  # journal entries before compaction is considered
+COMPACT_RATIO = 1.0  # compact once the journal outgrows the snapshot by this factor
+
+
+class ChannelStore:
+    """Memory channels indexed by name and kept sorted by frequency
+
+    The snapshot at path is the same JSON list RpiTX.save_config writes.
+    Changes are appended to path + ".journal" as JSON lines and replayed on
+    load, and a final entry torn by a crash is cut off so later ones are
+    not appended to it; once the journal grows past the snapshot it is
+    folded back in with one atomic rewrite. A store opened read_only never
+    writes and loads what it can of damaged files, listing the problems in
+    errors.
+    """
+
+    def __init__(self, path: str, fsync: bool = False, read_only: bool = False):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.fsync = fsync
+        self.read_only = read_only
+        self.errors: List[str] = []  # what a read-only load had to skip
+        self._by_name: Dict[str, RadioConfig] = {}
+        self._keys: List[Tuple[int, str]] = []  # (frequency, name), sorted
+        self._journal_entries = 0
+        self._journal = None
+        self._load()
+
+    def _load(self):
+        snapshot = []
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                try:
+                    snapshot = json.load(f)
+                except ValueError as e:
+                    self._damaged(f"{self.path} is not valid JSON: {e}")
+        if not isinstance(snapshot, list):
+            self._damaged(f"{self.path} does not hold a JSON list of channels")
+            snapshot = []
+        for settings in snapshot:
+            try:
+                self._put(RadioConfig(**settings))
+            except TypeError:
+                self._damaged(f"Bad channel in {self.path}: {settings}")
+        if os.path.exists(self.journal_path):
+            complete = 0  # bytes up to the end of the last whole entry
+            with open(self.journal_path, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("no newline")
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn final write
+                    try:
+                        if entry["op"] == "put":
+                            self._put(RadioConfig(**entry["config"]))
+                        else:
+                            self._remove(entry["name"])
+                    except (KeyError, TypeError):
+                        self._damaged(f"Bad entry in {self.journal_path}: "
+                                      f"{line.decode(errors='replace').strip()}")
+                    self._journal_entries += 1
+                    complete += len(line)
+            if complete < os.path.getsize(self.journal_path) and not self.read_only:
+                # Cut the torn write off, or the next entry would be appended to it and lost
+                with open(self.journal_path, "r+b") as f:
+                    f.truncate(complete)
+                    if self.fsync:
+                        os.fsync(f.fileno())
+
+    def _damaged(self, problem: str):
+        if not self.read_only:
+            raise Exception(problem)
+        self.errors.append(problem)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise Exception(f"{self.path} is open read-only")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[RadioConfig]:
+        """Channels in frequency order"""
+        return (self._by_name[name] for _, name in self._keys)
+
+    def __getitem__(self, position: int) -> RadioConfig:
+        """The channel at a position in frequency order"""
+        return self._by_name[self._keys[position][1]]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def get(self, name: str) -> Optional[RadioConfig]:
+        return self._by_name.get(name)
+
+    def index(self, name: str) -> int:
+        """Position of a named channel in frequency order"""
+        config = self._by_name[name]
+        return bisect.bisect_left(self._keys, (config.frequency, name))
+
+    def span(self, low_hz: float, high_hz: float) -> Tuple[int, int]:
+        """Positions [start, stop) of the channels with low_hz <= frequency <= high_hz"""
+        start = bisect.bisect_left(self._keys, (low_hz,))
+        stop = bisect.bisect_right(self._keys, (high_hz, "\U0010ffff"))
+        return start, max(start, stop)
+
+    def range(self, low_hz: float, high_hz: float) -> List[RadioConfig]:
+        """Channels between two frequencies in Hz, inclusive, in frequency order"""
+        start, stop = self.span(low_hz, high_hz)
+        return [self[i] for i in range(start, stop)]
+
+    def unique_name(self, prefix: str = "Channel") -> str:
+        """The first "<prefix> N" not already in use, counting from len + 1"""
+        n = len(self) + 1
+        while f"{prefix} {n}" in self._by_name:
+            n += 1
+        return f"{prefix} {n}"
+
+    def put(self, config: RadioConfig):
+        """Add a channel, replacing any channel with the same name"""
+        self._check_writable()
+        self._put(config)
+        self._append({"op": "put", "config": asdict(config)})
+
+    def remove(self, name: str):
+        """Delete a channel by name"""
+        self._check_writable()
+        if name not in self._by_name:
+            raise Exception(f"No channel named {name}")
+        self._remove(name)
+        self._append({"op": "delete", "name": name})
+
+    def _put(self, config: RadioConfig):
+        if config.name in self._by_name:
+            self._remove(config.name)
+        self._by_name[config.name] = config
+        bisect.insort(self._keys, (config.frequency, config.name))
+
+    def _remove(self, name: str):
+        config = self._by_name.pop(name, None)
+        if config is not None:
+            del self._keys[bisect.bisect_left(self._keys, (config.frequency, name))]
+
+    def _append(self, entry: dict):
+        if self._journal is None:
+            self._journal = open(self.journal_path, "a")
+        self._journal.write(json.dumps(entry) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._journal_entries += 1
+        if self._journal_entries >= max(COMPACT_MIN, COMPACT_RATIO * len(self)):
+            self.compact()
+
+    def compact(self):
+        """Rewrite the snapshot from memory and empty the journal"""
+        self._check_writable()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump([asdict(config) for config in self], f, indent=2)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        # Replaying the old journal over the new snapshot is harmless, so a
+        # crash before this truncation loses nothing
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        open(self.journal_path, "w").close()
+        self._journal_entries = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
@@ -5,8 +5,33 @@ import json
 import subprocess
 import time
 import math
-from dataclasses import dataclass
-from typing import List, Optional
+import asyncio
+import inspect
+import tempfile
+import functools
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from rpitx_async import TransmissionHandle
+from rpitx_cache import RenderCache
+from rpitx_chirptrain import ChirpTrain
+from rpitx_composite import ChannelLike, as_channel, channel_span, check_offsets, combine, mix
+from rpitx_export import export_chunks
+from rpitx_ft8 import FT8_OFFSET, render_ft8, slot_chunks, wait_for_slot, with_callsign
+from rpitx_hopping import HopLike, HopNCO, hop_span
+from rpitx_metrics import TransmissionMetrics, timed_chunks
+from rpitx_morse import MORSE_TONE, MorseKeyer
+from rpitx_occupancy import OCCUPANCY_MODES, OccupancyAnalyzer, OccupancyReport
+from rpitx_pocsag import DEFAULT_CAPCODE, FUNCTION_ALPHA, PageLike, pocsag_bandwidth, render_pocsag
+from rpitx_resample import natural_rate, resample_chunks
+from rpitx_ring import RING_SLOTS, IQRing
+from rpitx_rtty import BAUD_ALIASES, RTTY_SHIFT, RTTY_STOP_BITS, fsk_bandwidth, render_rtty
+from rpitx_spectrum import FFT_SIZE, ROW_TIME, SpectrumPainter
+from rpitx_sstv import SSTVEncoder
+from rpitx_supervisor import SupervisedProcess, deadline_chunks, deadline_for
+from rpitx_iq import CHUNK_SIZE, SAMPLE_RATE, iter_chunks, prefetch_chunks, tone_chunks
 
 @dataclass
 class RadioConfig:
@@ -17,10 +42,87 @@ class RadioConfig:
     name: str
     description: str = ""
 
+@dataclass
+class TransmissionPlan:
+    """A transmission bound to its config: the tool command and, for IQ modes, the samples"""
+    mode: str
+    config: RadioConfig
+    command: List[str]
+    chunks: Optional[Iterator[np.ndarray]] = None  # streamed to the tool's stdin
+    sample_rate: int = SAMPLE_RATE
+    iq_type: str = "float"
+    duration: Optional[float] = None  # expected time on air in seconds, if known
+    started: Optional[float] = None  # time.monotonic() once the tool is running
+    finished: Optional[float] = None  # time.monotonic() once the tool has exited
+    timings: Dict[str, float] = field(default_factory=dict)  # phase -> seconds, see rpitx_metrics
+    stream_stats: Dict[str, int] = field(default_factory=dict)  # IQRing counters once streamed
+    analyzer: Optional[OccupancyAnalyzer] = None  # spectrum of the samples streamed so far
+    process: Optional[SupervisedProcess] = None  # the tool, once started
+    resources: Dict[str, float] = field(default_factory=dict)  # the tool's ResourceUsage once reaped
+    release: Optional[Callable[[], None]] = None  # frees a pooled render, streamed or not
+    align: Optional[Callable[[], None]] = None  # waits for the moment the tool must start
+    
+    @property
+    def tool(self) -> str:
+        return self.command[0]
+        
+    def close(self):
+        """Free what the samples hold (a pooled render's shared memory) even if they were never sent"""
+        if self.release is not None:
+            release, self.release = self.release, None
+            release()
+
 class RpiTX:
-    def __init__(self):
+    def __init__(self, render_cache: Optional[RenderCache] = None,
+                 metrics: Optional[TransmissionMetrics] = None, iq_type: str = "float",
+                 dither: bool = False, ring_slots: int = RING_SLOTS, render_pool=None,
+                 resample: bool = True, occupancy: str = "report"):
         self.configs: List[RadioConfig] = []
         self.current_config: Optional[RadioConfig] = None
+        self.render_cache = render_cache
+        self.metrics = metrics or TransmissionMetrics()
+        self.iq_type = iq_type  # sendiq -t format for rendered modes: float, i16 or u8
+        self.dither = dither
+        self.ring_slots = ring_slots
+        self.render_pool = render_pool  # rpitx_pool.RenderPool for jobs queued ahead
+        self.resample = resample  # render narrowband modes at a low rate and upsample
+        if occupancy not in OCCUPANCY_MODES:
+            raise Exception(f"Unsupported occupancy mode: {occupancy}")
+        self.occupancy = occupancy  # off, report, or enforce to stop out-of-mask signals
+        self.last_occupancy: Optional[OccupancyReport] = None
+        self.taps: List[Callable[[np.ndarray], None]] = []
+        self.process: Optional[SupervisedProcess] = None  # tool of the latest transmission
+        self.clock: Callable[[], float] = time.time  # wall clock for slotted modes such as FT8
+        self.sleep: Callable[[float], None] = time.sleep
+        self.underruns = 0
+        self.overruns = 0
+        
+    def render_settings(self) -> dict:
+        """Constructor arguments that shape rendered samples, for render workers"""
+        return {"iq_type": self.iq_type, "dither": self.dither, "resample": self.resample,
+                "occupancy": self.occupancy}
+        
+    def add_hook(self, hook: Callable[[dict], None]):
+        """Call hook with the timing record of every finished transmission"""
+        self.metrics.hooks.append(hook)
+        
+    def add_tap(self, tap: Callable[[np.ndarray], None]):
+        """Call tap with every IQ chunk of rendered modes as it is streamed
+        
+        Taps run on the streaming thread, ahead of sendiq, so they must
+        return quickly (e.g. rpitx_waterfall.WaterfallFeed.feed).
+        """
+        self.taps.append(tap)
+        
+    @property
+    def cache_hits(self) -> int:
+        """Number of transmissions replayed from the render cache"""
+        return self.render_cache.hits if self.render_cache else 0
+        
+    @property
+    def cache_misses(self) -> int:
+        """Number of transmissions that had to be rendered"""
+        return self.render_cache.misses if self.render_cache else 0
         
     def add_config(self, config: RadioConfig):
         """Add a new radio configuration"""
@@ -28,99 +130,427 @@ class RpiTX:
         
     def transmit_chirp(self, duration: float, bandwidth: float):
         """Transmit chirp signal using native rpitx"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
-            
-        cmd = f"pichirp {self.current_config.frequency} {int(bandwidth)} {duration}"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"pichirp error: {result.stderr}")
-            
+        self.prepare("chirp", duration=duration, bandwidth=bandwidth)()
+        
+    def _command_chirp(self, config: RadioConfig, duration: float, bandwidth: float) -> List[str]:
+        return ["pichirp", str(config.frequency), str(int(bandwidth)), str(duration)]
+        
+    def transmit_chirp_train(self, bandwidth: float, pri: float, pulse: float = 0.0,
+                             shape: str = "up", duration: float = 1.0):
+        """Transmit repeated chirps: a sweep of pulse seconds every pri seconds
+        
+        shape is up, down, triangle or exp; pulse defaults to the whole PRI.
+        """
+        self.prepare("chirp_train", bandwidth=bandwidth, pri=pri, pulse=pulse, shape=shape,
+                     duration=duration)()
+        
+    def _render_chirp_train(self, config: RadioConfig, bandwidth: float, pri: float,
+                            pulse: float = 0.0, shape: str = "up", duration: float = 1.0):
+        """Render one chirp period and stream it repeatedly"""
+        train = ChirpTrain(bandwidth, pri, pulse, shape, amplitude=config.power)
+        return train.chunks(duration)
+        
     def transmit_tone(self, duration: float, tone_freq: float):
         """Transmit tone using sendiq"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
-            
-        cmd = f"sendiq -f {self.current_config.frequency} -t {duration} -s 48000"
-        if self.current_config.power != 1.0:
-            cmd += f" -a {self.current_config.power}"
-            
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"sendiq error: {result.stderr}")
-            
-    def transmit_morse(self, text: str, wpm: int = 20):
+        self.prepare("tone", duration=duration, tone_freq=tone_freq)()
+        
+    def _render_tone(self, config: RadioConfig, duration: float, tone_freq: float):
+        """Render a tone as IQ chunks"""
+        return tone_chunks(duration, tone_freq, modulation=config.modulation,
+                           amplitude=config.power)
+        
+    def transmit_morse(self, text: str, wpm: int = 20, tone_freq: float = MORSE_TONE,
+                       farnsworth_wpm: Optional[float] = None):
         """Transmit morse code"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
-            
-        cmd = f"morse {self.current_config.frequency} {text} {wpm}"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"morse error: {result.stderr}")
-            
-    def transmit_rtty(self, text: str, baud: int = 45):
+        self.prepare("morse", text=text, wpm=wpm, tone_freq=tone_freq,
+                     farnsworth_wpm=farnsworth_wpm)()
+        
+    def _render_morse(self, config: RadioConfig, text: str, wpm: int = 20,
+                      tone_freq: float = MORSE_TONE, farnsworth_wpm: Optional[float] = None):
+        """Render morse code as keyed IQ buffers"""
+        keyer = MorseKeyer(wpm, tone_freq, modulation=config.modulation,
+                           amplitude=config.power, farnsworth_wpm=farnsworth_wpm)
+        return keyer.buffers(text)
+        
+    def transmit_rtty(self, text: str, baud: float = 45, shift: float = RTTY_SHIFT,
+                      stop_bits: float = RTTY_STOP_BITS, reverse: bool = False):
         """Transmit RTTY"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
-            
-        cmd = f"pirtty {self.current_config.frequency} {text} {baud}"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"pirtty error: {result.stderr}")
-            
+        self.prepare("rtty", text=text, baud=baud, shift=shift, stop_bits=stop_bits,
+                     reverse=reverse)()
+        
+    def _render_rtty(self, config: RadioConfig, text: str, baud: float = 45,
+                     shift: float = RTTY_SHIFT, stop_bits: float = RTTY_STOP_BITS,
+                     reverse: bool = False):
+        """Render RTTY as continuous-phase FSK IQ chunks"""
+        rate = self._render_rate(fsk_bandwidth(BAUD_ALIASES.get(baud, baud), shift))
+        iq = render_rtty(text, baud, shift, stop_bits, reverse, amplitude=config.power,
+                         sample_rate=rate)
+        return resample_chunks(iter_chunks(iq), rate)
+        
     def transmit_sstv(self, image_path: str, mode: str = "Martin1"):
         """Transmit SSTV image"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
-            
-        cmd = f"pisstv {self.current_config.frequency} {image_path} {mode}"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"pisstv error: {result.stderr}")
-            
-    def transmit_pocsag(self, message: str, bitrate: int = 1200):
+        self.prepare("sstv", image_path=image_path, mode=mode)()
+        
+    def _render_sstv(self, config: RadioConfig, image_path: str, mode: str = "Martin1"):
+        """Render an SSTV image line by line as IQ chunks"""
+        return SSTVEncoder(mode, amplitude=config.power).encode(image_path)
+        
+    def transmit_pocsag(self, message: str, bitrate: int = 1200, capcode: int = DEFAULT_CAPCODE,
+                        function: int = FUNCTION_ALPHA):
         """Transmit POCSAG pager message"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
-            
-        cmd = f"pocsag {self.current_config.frequency} {message} {bitrate}"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"pocsag error: {result.stderr}")
-            
+        self.prepare("pocsag", message=message, bitrate=bitrate, capcode=capcode,
+                     function=function)()
+        
+    def _render_pocsag(self, config: RadioConfig, message: str, bitrate: int = 1200,
+                       capcode: int = DEFAULT_CAPCODE, function: int = FUNCTION_ALPHA):
+        """Render a single POCSAG page as IQ chunks"""
+        return self._render_pocsag_batch(config, [(capcode, function, message)], bitrate)
+        
+    def transmit_pocsag_batch(self, pages: List[PageLike], bitrate: int = 1200):
+        """Transmit many POCSAG pages behind one preamble
+        
+        pages holds Page objects or (capcode, function, message) tuples.
+        """
+        self.prepare("pocsag_batch", pages=pages, bitrate=bitrate)()
+        
+    def _render_pocsag_batch(self, config: RadioConfig, pages: List[PageLike],
+                             bitrate: int = 1200):
+        """Render a batch of POCSAG pages as IQ chunks"""
+        rate = self._render_rate(pocsag_bandwidth(bitrate))
+        return resample_chunks(iter_chunks(render_pocsag(pages, bitrate, config.power, rate)), rate)
+        
     def transmit_opera(self, callsign: str, locator: str = ""):
         """Transmit Opera beacon"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
-            
-        cmd = f"piopera {self.current_config.frequency} {callsign}"
+        self.prepare("opera", callsign=callsign, locator=locator)()
+        
+    def _command_opera(self, config: RadioConfig, callsign: str, locator: str = "") -> List[str]:
+        cmd = ["piopera", str(config.frequency), callsign]
         if locator:
-            cmd += f" {locator}"
-            
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"piopera error: {result.stderr}")
-            
-    def transmit_ft8(self, message: str, callsign: str):
-        """Transmit FT8 digital mode"""
-        if not self.current_config:
+            cmd.append(locator)
+        return cmd
+        
+    def transmit_ft8(self, message: str, callsign: str, offset: float = FT8_OFFSET):
+        """Transmit FT8 digital mode
+        
+        A bare "CQ" or "CQ GRID" message gets callsign inserted after CQ.
+        """
+        self.prepare("ft8", message=message, callsign=callsign, offset=offset)()
+        
+    def _align_ft8(self):
+        """FT8 starts half a second into a UTC 15 s slot"""
+        wait_for_slot(self.clock, self.sleep)
+        
+    _align_ft8_batch = _align_ft8
+        
+    def _render_ft8(self, config: RadioConfig, message: str, callsign: str,
+                    offset: float = FT8_OFFSET):
+        """Render one FT8 message as IQ chunks"""
+        return self._render_ft8_batch(config, [message], callsign, offset)
+        
+    def transmit_ft8_batch(self, messages: List[str], callsign: str = "",
+                           offset: float = FT8_OFFSET):
+        """Transmit FT8 messages in consecutive 15 s slots, all rendered up front"""
+        self.prepare("ft8_batch", messages=messages, callsign=callsign, offset=offset)()
+        
+    def _render_ft8_batch(self, config: RadioConfig, messages: List[str], callsign: str = "",
+                          offset: float = FT8_OFFSET):
+        """Render FT8 messages, each padded to its slot, as IQ chunks"""
+        waveforms = render_ft8([with_callsign(m, callsign) for m in messages], offset,
+                               amplitude=config.power)
+        return (chunk for waveform in slot_chunks(waveforms) for chunk in iter_chunks(waveform))
+        
+    def transmit_spectrum(self, image_path: str, row_time: float = ROW_TIME,
+                          fft_size: int = FFT_SIZE, rows: Optional[int] = None):
+        """Transmit spectrum from image
+        
+        The painting spans the configured bandwidth; rows defaults to
+        keeping the image's aspect ratio.
+        """
+        self.prepare("spectrum", image_path=image_path, row_time=row_time, fft_size=fft_size,
+                     rows=rows)()
+        
+    def _render_spectrum(self, config: RadioConfig, image_path: str, row_time: float = ROW_TIME,
+                         fft_size: int = FFT_SIZE, rows: Optional[int] = None):
+        """Render a spectrum painting as IQ chunks, one block of rows at a time"""
+        painter = SpectrumPainter(config.bandwidth, row_time, fft_size, amplitude=config.power)
+        return painter.encode(image_path, rows)
+        
+    def transmit_composite(self, channels: List[ChannelLike], headroom_db: float = 0.0):
+        """Transmit several payloads at once, each offset from the carrier
+        
+        channels holds Channel objects or dicts such as {"mode": "morse",
+        "offset": -3000, "text": "N0CALL"}; every channel must be a mode
+        rendered in-process. All of them share one sendiq stream.
+        """
+        self.prepare("composite", channels=channels, headroom_db=headroom_db)()
+        
+    def _render_composite(self, config: RadioConfig, channels: List[ChannelLike],
+                          headroom_db: float = 0.0):
+        """Render each channel at full scale, shift it to its offset and sum them"""
+        channels = [as_channel(c) for c in channels]
+        if not channels:
+            raise Exception("Composite transmission needs at least one channel")
+        check_offsets(channels, config.bandwidth)
+        streams = []
+        for channel in channels:
+            render = getattr(self, f"_render_{channel.mode}", None)
+            if render is None or channel.mode == "composite":
+                raise Exception(f"Mode {channel.mode} cannot be part of a composite transmission")
+            params = dict(channel.params)
+            if channel.bandwidth and "bandwidth" in inspect.signature(render).parameters:
+                params.setdefault("bandwidth", channel.bandwidth)  # e.g. a chirp train's sweep
+            inspect.signature(render).bind(config, **params)
+            channel_config = replace(config, power=1.0, bandwidth=channel.bandwidth or config.bandwidth,
+                                     modulation=channel.modulation or config.modulation)
+            streams.append(mix(render(channel_config, **params), channel.offset))
+        return combine(streams, [c.gain for c in channels], config.power, headroom_db)
+        
+    def _bandwidth_composite(self, config: RadioConfig, channels: List[ChannelLike], **params) -> float:
+        """A composite spreads over the span its channels cover"""
+        return channel_span([as_channel(c) for c in channels], config.bandwidth)
+        
+    def transmit_hop(self, hops: List[HopLike], duration: float = 1.0, mode: str = "",
+                     params: Optional[dict] = None):
+        """Hop within the sample bandwidth while the carrier frequency stays fixed
+        
+        hops holds Hop objects, {"offset": Hz, "dwell": s} dicts or (offset,
+        dwell) pairs and repeats until the payload ends. Without a mode an
+        unmodulated carrier hops for duration seconds; otherwise the render
+        of transmit_<mode>(**params) is hopped.
+        """
+        self.prepare("hop", hops=hops, duration=duration, mode=mode, params=params)()
+        
+    def _render_hop(self, config: RadioConfig, hops: List[HopLike], duration: float = 1.0,
+                    mode: str = "", params: Optional[dict] = None):
+        """Mix a carrier or a payload render with the hop schedule's NCO"""
+        nco = HopNCO(hops)
+        if not mode:
+            return nco.carrier(duration, config.power)
+        render = getattr(self, f"_render_{mode}", None)
+        if render is None or mode == "hop":
+            raise Exception(f"Mode {mode} cannot be hopped")
+        params = params or {}
+        inspect.signature(render).bind(config, **params)
+        return nco.apply(render(config, **params))
+        
+    def _bandwidth_hop(self, config: RadioConfig, hops: List[HopLike], **params) -> float:
+        """A hopped signal spreads over the hop span plus its own channel"""
+        return hop_span(hops) + config.bandwidth if config.bandwidth else 0.0
+        
+    def plan(self, tx_mode: str, config: Optional[RadioConfig] = None, prefetch: int = 0,
+             **params) -> TransmissionPlan:
+        """Resolve a mode and its parameters into a TransmissionPlan
+        
+        Modes rendered in-process (those with a _render_<mode> method) start
+        their render here and, with prefetch > 0, synthesize that many chunks
+        up front so the transmitter starts without waiting for samples.
+        Other modes map to an rpitx tool through _command_<mode>.
+        """
+        config = config or self.current_config
+        if not config:
             raise Exception("No radio configuration set")
             
-        cmd = f"pift8 {self.current_config.frequency} {callsign} {message}"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"pift8 error: {result.stderr}")
-            
-    def transmit_spectrum(self, image_path: str):
-        """Transmit spectrum from image"""
-        if not self.current_config:
-            raise Exception("No radio configuration set")
+        start = time.monotonic()
+        render = getattr(self, f"_render_{tx_mode}", None)
+        if render is None:
+            command = getattr(self, f"_command_{tx_mode}", None)
+            if command is None:
+                raise Exception(f"Unknown transmission mode: {tx_mode}")
+            inspect.signature(command).bind(config, **params)
+            plan = TransmissionPlan(tx_mode, config, command(config, **params),
+                                    duration=params.get("duration"))
+        else:
+            inspect.signature(render).bind(config, **params)
+            pooled = None
+            if self.render_pool is not None:
+                pooled = self.render_pool.take(tx_mode, params, config, lambda: render(config, **params))
+            if pooled is not None:
+                # Already rendering in a worker; prefetching here would only wait for it
+                chunks, iq_type, prefetch = pooled, self.iq_type, 0
+            else:
+                chunks, iq_type = self._render(tx_mode, params, config, lambda: render(config, **params))
+            try:
+                analyzer = None
+                # A mode that spreads past its channel (hopping) says how far
+                bandwidth = getattr(self, f"_bandwidth_{tx_mode}", None)
+                bandwidth = bandwidth(config, **params) if bandwidth else config.bandwidth
+                if self.occupancy != "off" and bandwidth:
+                    # Ahead of the prefetch, so an enforced mask can refuse before the tool starts
+                    analyzer = OccupancyAnalyzer(bandwidth, enforce=self.occupancy == "enforce")
+                    chunks = analyzer.analyze(chunks)
+                chunks = prefetch_chunks(chunks, prefetch)
+                if self.taps:
+                    # After the prefetch, so taps see chunks as they are sent
+                    chunks = tapped_chunks(chunks, list(self.taps))
+            except BaseException:
+                if pooled is not None:
+                    pooled.close()
+                raise
+            plan = TransmissionPlan(tx_mode, config, self._sendiq_command(config, SAMPLE_RATE, iq_type),
+                                    chunks, iq_type=iq_type, duration=params.get("duration"),
+                                    analyzer=analyzer, release=pooled.close if pooled else None)
+        plan.align = getattr(self, f"_align_{tx_mode}", None)
+        plan.timings["plan"] = time.monotonic() - start
+        return plan
+        
+    def prerender(self, tx_mode: str, config: Optional[RadioConfig] = None, **params) -> bool:
+        """Queue a render on the render pool so a later plan() of the same job can use it
+        
+        Returns False, doing nothing, without a pool or for modes that run an
+        external tool. May block while the pool is at its limits.
+        """
+        config = config or self.current_config
+        render = getattr(self, f"_render_{tx_mode}", None)
+        if self.render_pool is None or not config or render is None:
+            return False
+        # Bad parameters must fail here, not after a render is queued that plan() never claims
+        inspect.signature(render).bind(config, **params)
+        self.render_pool.submit(tx_mode, config, params)
+        return True
+        
+    def prepare(self, tx_mode: str, config: Optional[RadioConfig] = None, prefetch: int = 0,
+                **params) -> Callable[[], None]:
+        """Plan a transmission ahead of time and return a callable that sends it"""
+        plan = self.plan(tx_mode, config, prefetch, **params)
+        return lambda: self.execute(plan)
+        
+    async def transmit_async(self, tx_mode: str, config: Optional[RadioConfig] = None,
+                             **params) -> TransmissionHandle:
+        """Start a transmission on the running event loop and return its handle
+        
+        The handle is awaitable and offers progress, cancel() and stderr()
+        streaming, e.g. ``handle = await radio.transmit_async("tone", duration=5,
+        tone_freq=1000)`` followed by ``await handle``.
+        """
+        # Planning may decode images or start a render, so keep it off the loop too
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(None, functools.partial(self.plan, tx_mode, config, **params))
+        try:
+            return await TransmissionHandle.start(plan, self.metrics, self.dither)
+        except BaseException:
+            plan.close()
+            raise
+        
+    def execute(self, plan: TransmissionPlan):
+        """Run a planned transmission to completion, recording its phase timings"""
+        self.current_config = plan.config
+        try:
+            self._execute(plan)
+        except Exception as e:
+            process = plan.process
+            status = "error"
+            if process is not None and process.timed_out:
+                status = "timeout"
+            elif process is not None and process.cancelled:
+                status = "cancelled"
+            self.metrics.record(plan, status, str(e))
+            raise
+        finally:
+            plan.close()
+            self.last_occupancy = plan.analyzer.report() if plan.analyzer else None
+        self.metrics.record(plan)
+        
+    def _execute(self, plan: TransmissionPlan):
+        if plan.align is not None:
+            plan.align()
+        timings = plan.timings
+        origin = time.monotonic()
+        streamed = plan.chunks is not None
+        # stderr goes to a file so a chatty tool can never block our writes
+        with tempfile.TemporaryFile() as errors:
+            # A streamed tool's deadline grows with the samples fed to it
+            expected = (plan.duration or 0.0) if streamed else plan.duration
+            proc = SupervisedProcess(plan.command, deadline_for(expected),
+                                     stdin=subprocess.PIPE if streamed else subprocess.DEVNULL,
+                                     stdout=subprocess.DEVNULL, stderr=errors)
+            plan.process = self.process = proc
+            plan.started = time.monotonic()
+            timings["spawn"] = plan.started - origin
+            if streamed:
+                ring = IQRing(plan.iq_type, self.ring_slots, dither=self.dither)
+                chunks = deadline_chunks(timed_chunks(plan.chunks, timings), proc, plan.sample_rate)
+                try:
+                    ring.stream(chunks, proc.proc.stdin)
+                    proc.proc.stdin.close()
+                except BrokenPipeError:
+                    pass
+                except BaseException:
+                    proc.kill()
+                    proc.wait()
+                    raise
+                finally:
+                    plan.stream_stats = ring.stats()
+                    self.underruns += ring.underruns
+                    self.overruns += ring.overruns
+                written = time.monotonic()
+                if ring.first_write is not None:
+                    timings["first_sample"] = ring.first_write - origin
+                timings["transmit"] = written - plan.started
+            proc.wait()
+            plan.finished = time.monotonic()
+            plan.resources = proc.usage.as_dict()
+            if streamed:
+                timings["teardown"] = plan.finished - written
+            else:
+                timings["transmit"] = plan.finished - plan.started
+            timings["total"] = plan.finished - origin
+            errors.seek(0)
+            failure = proc.failure(errors.read().decode(errors="replace"))
+            if failure:
+                raise Exception(failure)
+                
+    def cancel(self) -> bool:
+        """Stop the running transmission, killing its tool's whole process group
+        
+        Returns False when nothing is running. The transmit_* call that was
+        interrupted raises "<tool> was cancelled".
+        """
+        process = self.process
+        if process is None or process.returncode is not None:
+            return False
+        process.cancel()
+        return True
+        
+    def export(self, tx_mode: str, path: str, config: Optional[RadioConfig] = None,
+               **params) -> int:
+        """Render a mode to a .cf32, .cs16 or .wav file instead of transmitting it
+        
+        Returns the number of samples written. Modes that run their own rpitx
+        tool have no samples to export.
+        """
+        plan = self.plan(tx_mode, config, **params)
+        if plan.chunks is None:
+            raise Exception(f"Mode {tx_mode} runs {plan.tool} and cannot be exported")
+        try:
+            return export_chunks(plan.chunks, path, plan.sample_rate)
+        finally:
+            plan.close()
+            self.last_occupancy = plan.analyzer.report() if plan.analyzer else None
+        
+    def _render(self, mode: str, params: dict, config: RadioConfig,
+                render: Callable[[], Iterable[np.ndarray]]) -> Tuple[Iterator[np.ndarray], str]:
+        """Return IQ chunks and their sendiq type, going through the render cache if set"""
+        cache = self.render_cache
+        if cache is None:
+            return iter(render()), self.iq_type
             
-        cmd = f"spectrumpaint {self.current_config.frequency} {image_path}"
-        result = subprocess.run(cmd.split(), capture_output=True, text=True)
-        if result.returncode != 0:
-            raise Exception(f"spectrumpaint error: {result.stderr}")
+        # Cached int16 is streamed as stored; cached complex64 is converted to iq_type
+        iq_type = self.iq_type if cache.iq_type == "float" else cache.iq_type
+        key = cache.key(mode, params, config)
+        samples = cache.get(key)
+        if samples is None:
+            return cache.store(key, render()), iq_type
+        # int16 renders are stored flat, two values per sample
+        step = CHUNK_SIZE if samples.dtype == np.complex64 else CHUNK_SIZE * 2
+        return iter_chunks(samples, step), iq_type
+        
+    def _render_rate(self, bandwidth: float) -> int:
+        """Rate to synthesize a signal bandwidth Hz wide at before upsampling to SAMPLE_RATE"""
+        return natural_rate(bandwidth) if self.resample else SAMPLE_RATE
+        
+    def _sendiq_command(self, config: RadioConfig, sample_rate: int, iq_type: str) -> List[str]:
+        return ["sendiq", "-i", "/dev/stdin", "-s", str(sample_rate),
+                "-f", str(config.frequency), "-t", iq_type]
             
     def set_frequency(self, freq_hz: int):
         """Set transmission frequency in Hz"""
@@ -143,6 +573,14 @@ class RpiTX:
             configs = json.load(f)
             self.configs = [RadioConfig(**c) for c in configs]
             
+def tapped_chunks(chunks: Iterable[np.ndarray],
+                  taps: List[Callable[[np.ndarray], None]]) -> Iterator[np.ndarray]:
+    """Pass chunks through, showing each to every tap"""
+    for chunk in chunks:
+        for tap in taps:
+            tap(chunk)
+        yield chunk
+
 def main():
     # Example usage
     radio = RpiTX()
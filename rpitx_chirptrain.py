@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+from typing import Iterator
+
+import numpy as np
+
+from rpitx_iq import CHUNK_SIZE, SAMPLE_RATE, TWO_PI
+
+SWEEP_SHAPES = ("up", "down", "triangle", "exp")
+EXP_RATE = 4.0  # curvature of the exponential sweep
+MAX_OCCUPANCY = 0.9  # widest sweep as a fraction of the sample rate
+
+
+def sweep_phase(t: np.ndarray, bandwidth: float, pulse: float, shape: str) -> np.ndarray:
+    """Phase in radians at times t (0 <= t < pulse) of a sweep across ±bandwidth/2
+
+    Each shape's phase is the closed-form integral of its instantaneous
+    frequency, evaluated in float64.
+    """
+    half = bandwidth / 2.0
+    if shape == "up":
+        cycles = -half * t + half / pulse * t * t
+    elif shape == "down":
+        cycles = half * t - half / pulse * t * t
+    elif shape == "triangle":
+        # Up over the first half, down over the second; the two halves
+        # cancel so the phase returns to where it started
+        mid = pulse / 2.0
+        rise = np.minimum(t, mid)
+        fall = np.maximum(t - mid, 0.0)
+        cycles = (-half * rise + half / mid * rise * rise) + (half * fall - half / mid * fall * fall)
+    elif shape == "exp":
+        # f(t) = -B/2 + B * (exp(k t / T) - 1) / (exp(k) - 1)
+        k = EXP_RATE
+        scale = bandwidth / np.expm1(k)
+        cycles = -half * t + scale * (pulse / k * np.expm1(k * t / pulse) - t)
+    else:
+        raise Exception(f"Unsupported sweep shape: {shape}")
+    return TWO_PI * cycles
+
+
+class ChirpTrain:
+    """Repeated chirps rendered once and streamed as views of one buffer
+
+    One pulse repetition interval is synthesized in float64 phase: a sweep
+    of pulse seconds followed by silence up to pri. When the sweeps are
+    back to back (pulse == pri) any leftover phase at the end of the period
+    is spread over it as a sub-hertz offset, so the tiled stream has no
+    phase step at the seams. Every period is bit-identical, so hours of
+    output cannot drift.
+    """
+
+    def __init__(self, bandwidth: float, pri: float, pulse: float = 0.0, shape: str = "up",
+                 sample_rate: int = SAMPLE_RATE, amplitude: float = 1.0):
+        if bandwidth > MAX_OCCUPANCY * sample_rate:
+            raise Exception(f"Chirp bandwidth {bandwidth:g} Hz does not fit in "
+                            f"{sample_rate} samples/s (max {MAX_OCCUPANCY * sample_rate:g} Hz)")
+        pulse = pulse or pri
+        if pulse > pri:
+            raise Exception(f"Chirp pulse ({pulse}s) is longer than its PRI ({pri}s)")
+        self.sample_rate = sample_rate
+        self.period = max(int(round(pri * sample_rate)), 1)
+        on = max(int(round(pulse * sample_rate)), 1)
+        t = np.arange(on, dtype=np.float64) / sample_rate
+        phase = sweep_phase(t, bandwidth, on / sample_rate, shape)
+        if on == self.period:
+            end = sweep_phase(np.array([on / sample_rate]), bandwidth, on / sample_rate, shape)[0]
+            residual = (end + np.pi) % TWO_PI - np.pi
+            phase -= residual * (np.arange(on) / on)
+        self.buffer = np.zeros(self.period, dtype=np.complex64)
+        self.buffer[:on] = amplitude * np.exp(1j * phase)
+        # Short periods are tiled once so each streamed view is at least a chunk long
+        repeats = max(-(-CHUNK_SIZE // self.period), 1)
+        self.tiled = np.tile(self.buffer, repeats)
+        self.tiled.setflags(write=False)
+
+    def chunks(self, duration: float) -> Iterator[np.ndarray]:
+        """Yield views of the rendered periods until duration seconds are covered"""
+        remaining = int(round(duration * self.sample_rate))
+        tiled = self.tiled
+        position = 0
+        while remaining > 0:
+            n = min(CHUNK_SIZE, remaining, len(tiled) - position)
+            yield tiled[position:position + n]
+            position = (position + n) % len(tiled)
+            remaining -= n
@@ -1,13 +1,120 @@
 #!/usr/bin/env python3
 from rpitx_chirp import RpiTX, RadioConfig
+from rpitx_cache import RenderCache
+from rpitx_composite import load_channels
+from rpitx_hopping import load_hops, parse_hops
+from rpitx_metrics import TransmissionMetrics
+from rpitx_occupancy import OCCUPANCY_MODES
+from rpitx_daemon import DEFAULT_SOCKET, submit
+from rpitx_playlist import PlaylistPlayer, load_playlist
+from rpitx_pool import DEFAULT_MAX_PENDING, RenderPool
+from rpitx_pocsag import encode_rate, load_pages_csv
+from rpitx_chirptrain import SWEEP_SHAPES
+from rpitx_iq import SAMPLE_RATE
+from rpitx_sstv import SSTV_MODES
 import argparse
+import re
 import sys
 
+def sweep_spec(value):
+    """Parse --sweep WIDTH[:SHAPE] into (width in MHz, shape or None for a single pichirp sweep)"""
+    width, _, shape = value.partition(":")
+    if shape and shape not in SWEEP_SHAPES:
+        raise argparse.ArgumentTypeError(f"sweep shape must be one of {', '.join(SWEEP_SHAPES)}")
+    try:
+        return float(width), shape or None
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid sweep width: {width}")
+
+def attach_negative_values(argv, options):
+    """Join options to values like -5000:5, which argparse would take for options"""
+    attached = []
+    for arg in argv:
+        if attached and attached[-1] in options and re.match(r"-[\d.]", arg):
+            attached[-1] = f"{attached[-1]}={arg}"
+        else:
+            attached.append(arg)
+    return attached
+
+def hops_from_args(args):
+    """--hop is either a JSON file of hops or OFFSET_HZ:DWELL_MS,..."""
+    if args.hop.endswith(".json"):
+        return load_hops(args.hop)
+    return parse_hops(args.hop)
+
+def job_from_args(args):
+    """Map parsed arguments to a transmission mode and its transmit_* keyword arguments"""
+    job = payload_from_args(args)
+    if args.hop:
+        hops = [(hop.offset, hop.dwell) for hop in hops_from_args(args)]
+        if job is None:
+            return "hop", {"hops": hops, "duration": args.duration}
+        return "hop", {"hops": hops, "mode": job[0], "params": job[1]}
+    if job is None:
+        raise Exception("No transmission mode selected")
+    return job
+
+def payload_from_args(args):
+    """The selected mode and its parameters, before any hopping; None without a mode"""
+    if args.chirp:
+        width, shape = args.sweep
+        if shape:
+            return "chirp_train", {"bandwidth": width * 1e6, "pri": args.pri / 1e3,
+                                   "pulse": (args.pulse or 0) / 1e3, "shape": shape,
+                                   "duration": args.duration}
+        return "chirp", {"duration": args.duration, "bandwidth": width * 1e6}
+    if args.tone is not None:
+        return "tone", {"duration": args.duration, "tone_freq": args.tone}
+    if args.morse:
+        return "morse", {"text": args.morse, "wpm": args.wpm, "farnsworth_wpm": args.farnsworth}
+    if args.rtty:
+        return "rtty", {"text": args.rtty, "baud": args.baud, "shift": args.shift,
+                        "stop_bits": args.stop_bits, "reverse": args.reverse}
+    if args.sstv:
+        return "sstv", {"image_path": args.sstv, "mode": args.sstv_mode}
+    if args.pocsag:
+        return "pocsag", {"message": args.pocsag, "bitrate": args.bitrate,
+                          "capcode": args.capcode, "function": args.function}
+    if args.pocsag_csv:
+        pages = [(p.capcode, p.function, p.message) for p in load_pages_csv(args.pocsag_csv)]
+        return "pocsag_batch", {"pages": pages, "bitrate": args.bitrate}
+    if args.opera:
+        return "opera", {"callsign": args.opera, "locator": args.grid or ""}
+    if args.ft8:
+        return "ft8", {"message": args.ft8, "callsign": args.callsign}
+    if args.spectrum:
+        return "spectrum", {"image_path": args.spectrum, "row_time": args.row_time,
+                            "fft_size": args.fft_size, "rows": args.rows}
+    if args.composite:
+        return "composite", {"channels": [vars(c) for c in load_channels(args.composite)],
+                             "headroom_db": args.headroom}
+    return None
+
+def play_playlist(radio, args):
+    """Transmit every item of --playlist back to back"""
+    defaults = None
+    if args.frequency is not None:
+        defaults = RadioConfig(
+            frequency=int(args.frequency * 1e6),
+            modulation=args.modulation,
+            power=args.power,
+            bandwidth=12500,
+            name="Playlist Transmission"
+        )
+    items = load_playlist(args.playlist, defaults)
+    player = PlaylistPlayer(radio)
+    player.play(items, lambda i, item: print(f"[{i + 1}/{len(items)}] {item.describe()}"))
+    if player.gaps:
+        gaps_ms = [gap * 1e3 for gap in player.gaps]
+        print(f"Inter-item gap: max {max(gaps_ms):.2f}ms, "
+              f"mean {sum(gaps_ms) / len(gaps_ms):.2f}ms")
+    print("Playlist complete")
+
 def main():
     parser = argparse.ArgumentParser(description='RpiTX Command Line Interface')
     
     # Basic parameters
-    parser.add_argument('-f', '--frequency', type=float, required=True,
+    parser.add_argument('-f', '--frequency', type=float,
                        help='Center frequency in MHz (e.g., 145.500)')
     parser.add_argument('-m', '--modulation', choices=['FM', 'AM'], default='FM',
                        help='Modulation type (default: FM)')
@@ -17,7 +124,7 @@ def main():
                        help='Duration of transmission in seconds (default: 1.0)')
     
     # Mode selection
-    mode_group = parser.add_mutually_exclusive_group(required=True)
+    mode_group = parser.add_mutually_exclusive_group()
     mode_group.add_argument('--tone', type=float, const=1000, nargs='?',
                           help='Generate tone signal (frequency in Hz, default: 1000)')
     mode_group.add_argument('--chirp', action='store_true',
@@ -30,88 +137,202 @@ def main():
                           help='Transmit SSTV image (specify image path)')
     mode_group.add_argument('--pocsag', type=str,
                           help='Transmit POCSAG pager message')
+    mode_group.add_argument('--pocsag-csv', type=str,
+                          help='Transmit many POCSAG pages from a capcode,function,message CSV')
     mode_group.add_argument('--opera', type=str,
                           help='Transmit Opera beacon (specify callsign)')
     mode_group.add_argument('--ft8', type=str,
                           help='Transmit FT8 message')
     mode_group.add_argument('--spectrum', type=str,
                           help='Transmit spectrum from image (specify image path)')
+    mode_group.add_argument('--composite', type=str,
+                          help='Transmit several channels at once from a JSON array of {mode, offset, ...}')
+    mode_group.add_argument('--playlist', type=str,
+                          help='Transmit a sequence of items from a JSON-lines or YAML file')
     
     # Mode-specific parameters
-    parser.add_argument('-s', '--sweep', type=float, default=6.0,
-                       help='Frequency sweep range in MHz for chirp (default: 6.0)')
+    parser.add_argument('-s', '--sweep', type=sweep_spec, default=(6.0, None),
+                       help='Chirp sweep width in MHz, optionally with a shape for a repeated '
+                            f'chirp train: WIDTH[:{"|".join(SWEEP_SHAPES)}], e.g. 0.02:triangle (default: 6.0)')
+    parser.add_argument('--pri', type=float, default=10.0,
+                       help='Chirp train pulse repetition interval in ms (default: 10)')
+    parser.add_argument('--pulse', type=float,
+                       help='Chirp train sweep length in ms (default: the whole PRI)')
+    parser.add_argument('--hop', type=str,
+                       help='Hop within the sample bandwidth, carrier fixed: OFFSET_HZ:DWELL_MS,... '
+                            '(e.g. -5000:5,5000:5) or a JSON file of {offset, dwell} (seconds); hops the '
+                            'selected mode, or a plain carrier for --duration without one')
     parser.add_argument('--wpm', type=int, default=20,
                        help='Words per minute for morse code (default: 20)')
-    parser.add_argument('--baud', type=int, default=45,
-                       help='Baud rate for RTTY (default: 45)')
+    parser.add_argument('--farnsworth', type=int,
+                       help='Overall morse speed in WPM with Farnsworth spacing (characters stay at --wpm)')
+    parser.add_argument('--baud', type=float, default=45,
+                       help='Baud rate for RTTY, 45 means 45.45 (default: 45)')
+    parser.add_argument('--shift', type=float, default=170,
+                       help='RTTY mark/space shift in Hz (default: 170)')
+    parser.add_argument('--stop-bits', type=float, default=1.5, choices=[1, 1.5, 2],
+                       help='RTTY stop bits (default: 1.5)')
+    parser.add_argument('--reverse', action='store_true',
+                       help='Swap RTTY mark and space')
+    parser.add_argument('--capcode', type=int, default=1234,
+                       help='POCSAG pager address (default: 1234)')
+    parser.add_argument('--function', type=int, default=3, choices=[0, 1, 2, 3],
+                       help='POCSAG function bits, 0 sends a numeric page (default: 3)')
+    parser.add_argument('--bitrate', type=int, default=1200, choices=[512, 1200, 2400],
+                       help='POCSAG bit rate (default: 1200)')
     parser.add_argument('--sstv-mode', type=str, default="Martin1",
-                       choices=["Martin1", "Martin2", "Scottie1", "Scottie2"],
+                       choices=list(SSTV_MODES),
                        help='SSTV mode (default: Martin1)')
+    parser.add_argument('--row-time', type=float, default=0.1,
+                       help='Seconds per image row for spectrum painting (default: 0.1)')
+    parser.add_argument('--fft-size', type=int, default=512,
+                       help='FFT size for spectrum painting; larger gives finer columns (default: 512)')
+    parser.add_argument('--rows', type=int,
+                       help='Image rows to paint (default: keep aspect ratio)')
+    parser.add_argument('--bandwidth', type=float,
+                       help='Channel bandwidth in kHz, checked by --occupancy and used by spectrum painting (default: 12.5)')
+    parser.add_argument('--headroom', type=float, default=0.0,
+                       help='Extra back-off in dB for composite transmissions (default: 0)')
     parser.add_argument('--callsign', type=str, default="N0CALL",
                        help='Callsign for FT8/Opera (default: N0CALL)')
     parser.add_argument('--grid', type=str,
                        help='Grid locator for Opera beacon')
+    parser.add_argument('--cache-dir', type=str,
+                       help='Cache rendered IQ in this directory and replay it on repeats')
+    parser.add_argument('--iq-format', choices=['float', 'i16', 'u8'], default='float',
+                       help='Sample format streamed to sendiq for rendered modes (default: float)')
+    parser.add_argument('--dither', action='store_true',
+                       help='Add triangular dither when quantizing to i16 or u8')
+    parser.add_argument('--occupancy', choices=OCCUPANCY_MODES, default='report',
+                       help='Measure the rendered signal against --bandwidth; enforce refuses to '
+                            'transmit out-of-mask signals (default: report)')
+    parser.add_argument('--metrics-prom', type=str,
+                       help='Write per-phase latency histograms to this Prometheus text file')
+    parser.add_argument('--metrics-jsonl', type=str,
+                       help='Append one JSON line of phase timings per transmission to this file')
+    parser.add_argument('--render-workers', type=int,
+                       help='Render upcoming playlist items in this many worker processes (default: off)')
+    parser.add_argument('--render-memory', type=int, default=256,
+                       help='MB of rendered IQ the workers may hold in shared memory (default: 256)')
+    parser.add_argument('--render-pending', type=int, default=DEFAULT_MAX_PENDING,
+                       help=f'Playlist items rendered ahead (default: {DEFAULT_MAX_PENDING})')
+    parser.add_argument('-o', '--output', type=str,
+                       help='Render to a .cf32, .cs16 or .wav file instead of transmitting')
+    parser.add_argument('--daemon', type=str, nargs='?', const=DEFAULT_SOCKET,
+                       help=f'Submit the job to a running rpitx_daemon.py (socket, default: {DEFAULT_SOCKET})')
+    parser.add_argument('--priority', type=int, default=0,
+                       help='Job priority when submitting to the daemon, higher first (default: 0)')
     
-    args = parser.parse_args()
+    # "--hop -5000:5,..." must not read the negative offset as an option
+    args = parser.parse_args(attach_negative_values(sys.argv[1:], ("--hop",)))
+    if args.frequency is None and not args.playlist:
+        parser.error("the following arguments are required: -f/--frequency")
+    if not args.hop and not args.playlist and payload_from_args(args) is None:
+        parser.error("one of the mode arguments is required unless --hop is given")
     
     try:
-        radio = RpiTX()
+        radio = RpiTX(render_cache=RenderCache(args.cache_dir) if args.cache_dir else None,
+                      metrics=TransmissionMetrics(args.metrics_prom, args.metrics_jsonl),
+                      iq_type=args.iq_format, dither=args.dither, occupancy=args.occupancy)
+        if args.playlist:
+            if args.render_workers:
+                radio.render_pool = RenderPool(args.render_workers, args.render_memory * 1024 * 1024,
+                                               args.render_pending, radio_settings=radio.render_settings())
+            try:
+                play_playlist(radio, args)
+            finally:
+                if radio.render_pool:
+                    radio.render_pool.close()
+            return
+            
         config = RadioConfig(
             frequency=int(args.frequency * 1e6),  # Convert MHz to Hz
             modulation=args.modulation,
             power=args.power,
-            bandwidth=int(args.sweep * 1e6) if args.chirp else 12500,
+            bandwidth=int(args.sweep[0] * 1e6) if args.chirp else int((args.bandwidth or 12.5) * 1e3),
             name="CLI Transmission"
         )
         radio.current_config = config
         
         # Handle different transmission modes
         if args.chirp:
-            sweep_hz = args.sweep * 1e6  # Convert MHz to Hz
             print(f"Generating {args.duration}s chirp signal at {args.frequency}MHz")
-            print(f"Sweeping ±{args.sweep/2}MHz (total {args.sweep}MHz)")
-            radio.transmit_chirp(args.duration, sweep_hz)
+            width, shape = args.sweep
+            print(f"Sweeping ±{width/2}MHz (total {width}MHz)")
+            if shape:
+                print(f"{shape} chirps every {args.pri}ms")
             
         elif args.tone is not None:
             print(f"Generating {args.duration}s tone at {args.frequency}MHz using {args.modulation}")
             print(f"Tone frequency: {args.tone}Hz")
-            radio.transmit_tone(args.duration, args.tone)
             
         elif args.morse:
             print(f"Transmitting morse code at {args.frequency}MHz")
             print(f"Message: {args.morse}")
-            radio.transmit_morse(args.morse, args.wpm)
             
         elif args.rtty:
             print(f"Transmitting RTTY at {args.frequency}MHz")
             print(f"Message: {args.rtty}")
-            radio.transmit_rtty(args.rtty, args.baud)
             
         elif args.sstv:
             print(f"Transmitting SSTV image at {args.frequency}MHz")
             print(f"Image: {args.sstv}")
-            radio.transmit_sstv(args.sstv, args.sstv_mode)
             
         elif args.pocsag:
             print(f"Transmitting POCSAG message at {args.frequency}MHz")
             print(f"Message: {args.pocsag}")
-            radio.transmit_pocsag(args.pocsag)
+            
+        elif args.pocsag_csv:
+            pages = load_pages_csv(args.pocsag_csv)
+            rate, codewords = encode_rate(pages)
+            print(f"Transmitting {len(pages)} POCSAG pages at {args.frequency}MHz")
+            print(f"Encoded {codewords} codewords at {rate:.0f} pages/s")
             
         elif args.opera:
             print(f"Transmitting Opera beacon at {args.frequency}MHz")
             print(f"Callsign: {args.opera}")
-            radio.transmit_opera(args.opera, args.grid)
             
         elif args.ft8:
             print(f"Transmitting FT8 at {args.frequency}MHz")
             print(f"Message: {args.ft8}")
-            radio.transmit_ft8(args.ft8, args.callsign)
             
         elif args.spectrum:
             print(f"Transmitting spectrum image at {args.frequency}MHz")
             print(f"Image: {args.spectrum}")
-            radio.transmit_spectrum(args.spectrum)
             
+        elif args.composite:
+            print(f"Transmitting composite at {args.frequency}MHz")
+            for channel in load_channels(args.composite):
+                print(f"  {channel.offset:+g}Hz {channel.mode}")
+                
+        if args.hop:
+            hops = hops_from_args(args)
+            if payload_from_args(args) is None:
+                print(f"Hopping a carrier for {args.duration}s around {args.frequency}MHz")
+            print(f"Hopping over {len(hops)} offsets: "
+                  + ", ".join(f"{hop.offset:+g}Hz/{hop.dwell * 1e3:g}ms" for hop in hops))
+            
+        mode, params = job_from_args(args)
+        if args.output:
+            samples = radio.export(mode, args.output, **params)
+            print(f"Wrote {samples} samples ({samples / SAMPLE_RATE:.1f}s) to {args.output}")
+            if radio.last_occupancy:
+                print(f"Spectrum: {radio.last_occupancy.describe()}")
+            return
+        if args.daemon:
+            reply = submit({
+                "mode": mode,
+                "params": params,
+                "config": {k: v for k, v in vars(config).items() if k != "name"},
+                "priority": args.priority,
+            }, args.daemon)
+            if reply.get("status") != "done":
+                raise Exception(reply.get("error", "daemon rejected the job"))
+        else:
+            getattr(radio, f"transmit_{mode}")(**params)
+            
+        if radio.last_occupancy:
+            print(f"Spectrum: {radio.last_occupancy.describe()}")
         print("Transmission complete")
         
     except Exception as e:
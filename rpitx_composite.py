@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+import json
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+from rpitx_iq import CHUNK_SIZE, SAMPLE_RATE, PhaseAccumulator, expj
+
+MAX_OFFSET = 0.45  # largest channel offset as a fraction of the sample rate
+
+
+@dataclass
+class Channel:
+    """One payload of a composite transmission, offset from the carrier"""
+    mode: str
+    offset: float  # Hz from the carrier, negative below it
+    params: dict = field(default_factory=dict)  # transmit_<mode> keyword arguments
+    gain: float = 1.0  # relative level before headroom scaling
+    modulation: str = ""  # overrides RadioConfig.modulation for tone/morse
+    bandwidth: float = 0.0  # Hz occupied around the offset, 0 for RadioConfig.bandwidth
+
+
+ChannelLike = Union[Channel, dict]
+
+
+def as_channel(channel: ChannelLike) -> Channel:
+    """Accept a Channel or a dict with mode, offset, gain, modulation, bandwidth and mode parameters"""
+    if isinstance(channel, Channel):
+        return channel
+    spec = dict(channel)
+    try:
+        mode = spec.pop("mode")
+        offset = float(spec.pop("offset"))
+    except KeyError as e:
+        raise Exception(f"Composite channel needs {e.args[0]}: {channel}")
+    gain = float(spec.pop("gain", 1.0))
+    modulation = spec.pop("modulation", "")
+    bandwidth = float(spec.pop("bandwidth", 0.0))
+    params = spec.pop("params", {})
+    params.update(spec)
+    return Channel(mode, offset, params, gain, modulation, bandwidth)
+
+
+def load_channels(path: str) -> List[Channel]:
+    """Read a JSON array of channel objects"""
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise Exception(f"Composite file must hold a JSON array of channels: {path}")
+    return [as_channel(spec) for spec in specs]
+
+
+def rechunk(chunks: Iterable[np.ndarray], size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Regroup a chunk stream into blocks of exactly size samples (the last may be short)"""
+    pending: List[np.ndarray] = []
+    held = 0
+    for chunk in chunks:
+        while len(chunk):
+            take = min(size - held, len(chunk))
+            pending.append(chunk[:take])
+            held += take
+            chunk = chunk[take:]
+            if held == size:
+                yield pending[0] if len(pending) == 1 else np.concatenate(pending)
+                pending, held = [], 0
+    if held:
+        yield np.concatenate(pending)
+
+
+def mix(chunks: Iterable[np.ndarray], offset: float,
+        sample_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """Shift a chunk stream by offset Hz with a continuous-phase complex mixer"""
+    if not offset:
+        yield from chunks
+        return
+    osc = PhaseAccumulator(sample_rate)
+    for chunk in chunks:
+        shifted = expj(osc.ramp(offset, len(chunk)))
+        shifted *= chunk
+        yield shifted
+
+
+def combine(streams: Sequence[Iterable[np.ndarray]], gains: Sequence[float],
+            amplitude: float = 1.0, headroom_db: float = 0.0,
+            chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Sum unit-amplitude channel streams into one, block by block
+
+    The sum is scaled by amplitude / sum(gains), so even when every channel
+    peaks in phase the composite stays within amplitude; headroom_db backs
+    it off further. Channels that end early drop out of the sum and the
+    composite lasts as long as the longest channel.
+    """
+    scale = amplitude * 10 ** (-headroom_db / 20.0) / max(sum(abs(g) for g in gains), 1e-12)
+    active = [(iter(rechunk(stream, chunk_size)), np.float32(gain * scale))
+              for stream, gain in zip(streams, gains)]
+    while active:
+        out = np.zeros(chunk_size, dtype=np.complex64)
+        length = 0
+        remaining = []
+        for blocks, gain in active:
+            block = next(blocks, None)
+            if block is None:
+                continue
+            out[:len(block)] += block * gain
+            length = max(length, len(block))
+            remaining.append((blocks, gain))
+        active = remaining
+        if length:
+            yield out[:length]
+
+
+def channel_span(channels: Sequence[Channel], bandwidth: float = 0.0) -> float:
+    """Width in Hz, centred on the carrier, that the channels cover"""
+    return 2 * max((abs(c.offset) + (c.bandwidth or bandwidth) / 2.0 for c in channels), default=0.0)
+
+
+def check_offsets(channels: Sequence[Channel], bandwidth: float = 0.0,
+                  sample_rate: int = SAMPLE_RATE):
+    """Reject channels that would fold over the edge of the sample bandwidth or overlap
+
+    Each channel occupies its bandwidth (or the default bandwidth) centred
+    on its offset; channels may touch but not overlap.
+    """
+    limit = MAX_OFFSET * sample_rate
+    nyquist = sample_rate / 2.0
+    edges = []
+    for channel in channels:
+        if abs(channel.offset) > limit:
+            raise Exception(f"Composite channel offset {channel.offset:g} Hz is outside "
+                            f"±{limit:g} Hz at {sample_rate} samples/s")
+        half = (channel.bandwidth or bandwidth) / 2.0
+        if abs(channel.offset) + half > nyquist:
+            raise Exception(f"Composite {channel.mode} channel at {channel.offset:g} Hz is "
+                            f"{2 * half:g} Hz wide and runs past ±{nyquist:g} Hz "
+                            f"at {sample_rate} samples/s")
+        edges.append((channel.offset - half, channel.offset + half, channel))
+    edges.sort(key=lambda e: e[0])
+    for (_, high, lower), (low, _, upper) in zip(edges, edges[1:]):
+        if low < high:
+            raise Exception(f"Composite channels overlap: {lower.mode} at {lower.offset:g} Hz "
+                            f"and {upper.mode} at {upper.offset:g} Hz")
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import queue
+import signal
+import socket
+import argparse
+import itertools
+import threading
+import socketserver
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from rpitx_chirp import RpiTX, RadioConfig
+from rpitx_cache import RenderCache
+from rpitx_metrics import TransmissionMetrics
+from rpitx_occupancy import OCCUPANCY_MODES
+from rpitx_pool import DEFAULT_MAX_PENDING, RenderPool
+
+DEFAULT_SOCKET = "/tmp/khanfar-tx.sock"
+PREFETCH_CHUNKS = 4  # chunks rendered ahead for the next queued job
+
+
+@dataclass(order=True)
+class TransmitJob:
+    """A queued transmission; higher priority runs first, then FIFO"""
+    sort_key: tuple = field(init=False, repr=False)
+    priority: int = field(compare=False)
+    seq: int = field(compare=False)
+    mode: str = field(compare=False)
+    params: dict = field(compare=False)
+    config: RadioConfig = field(compare=False)
+    run: Optional[Callable[[], None]] = field(default=None, compare=False)
+    result: dict = field(default_factory=dict, compare=False)
+    done: threading.Event = field(default_factory=threading.Event, compare=False)
+
+    def __post_init__(self):
+        self.sort_key = (-self.priority, self.seq)
+
+    def finish(self, status: str, **details):
+        self.result = {"id": self.seq, "status": status, **details}
+        self.done.set()
+
+
+class TransmitDaemon:
+    """Owns the transmitter and runs JSON jobs received over a Unix socket
+
+    One thread prepares the next job (argument validation, config, and the
+    first rendered chunks) while another keeps the transmitter busy, so the
+    two stages overlap.
+    """
+
+    def __init__(self, radio: RpiTX, socket_path: str = DEFAULT_SOCKET,
+                 prefetch: int = PREFETCH_CHUNKS):
+        self.radio = radio
+        self.socket_path = socket_path
+        self.prefetch = prefetch
+        self.jobs: "queue.PriorityQueue[TransmitJob]" = queue.PriorityQueue()
+        # With a render pool, jobs up to its pending limit render on other cores
+        depth = radio.render_pool.max_pending if radio.render_pool else 1
+        self.ready: "queue.Queue[TransmitJob]" = queue.Queue(maxsize=depth)
+        self.completed = 0
+        self.failed = 0
+        self._seq = itertools.count(1)
+        self._server: Optional[socketserver.UnixStreamServer] = None
+
+    def submit(self, request: dict) -> TransmitJob:
+        """Validate a JSON request and queue it"""
+        mode = request.get("mode")
+        if not isinstance(mode, str):
+            raise ValueError("Job has no mode")
+        params = request.get("params", {})
+        if not isinstance(params, dict):
+            raise ValueError("Job params must be an object")
+        settings = dict(request.get("config", {}))
+        settings.setdefault("name", "Daemon Transmission")
+        job = TransmitJob(
+            priority=int(request.get("priority", 0)),
+            seq=next(self._seq),
+            mode=mode,
+            params=params,
+            config=RadioConfig(**settings),
+        )
+        self.jobs.put(job)
+        return job
+
+    def _prepare_loop(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                self.radio.prerender(job.mode, job.config, **job.params)
+                job.run = self.radio.prepare(job.mode, job.config, self.prefetch, **job.params)
+            except Exception as e:
+                self.failed += 1
+                job.finish("error", error=str(e))
+                continue
+            self.ready.put(job)
+
+    def _execute_loop(self):
+        while True:
+            job = self.ready.get()
+            start = time.monotonic()
+            try:
+                job.run()
+            except Exception as e:
+                self.failed += 1
+                job.finish("error", error=str(e), elapsed=time.monotonic() - start)
+            else:
+                self.completed += 1
+                details = {"elapsed": time.monotonic() - start}
+                if self.radio.last_occupancy is not None:
+                    details["occupancy"] = self.radio.last_occupancy.as_dict()
+                job.finish("done", **details)
+
+    def status(self) -> dict:
+        return {
+            "status": "ok",
+            "queued": self.jobs.qsize() + self.ready.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "cache_hits": self.radio.cache_hits,
+            "cache_misses": self.radio.cache_misses,
+            "underruns": self.radio.underruns,
+            "overruns": self.radio.overruns,
+            "latency": self.radio.metrics.summary(),
+        }
+
+    def serve_forever(self):
+        """Start the worker threads and accept jobs until interrupted"""
+        for target in (self._prepare_loop, self._execute_loop):
+            threading.Thread(target=target, daemon=True).start()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        request = json.loads(line)
+                        if not isinstance(request, dict):
+                            raise ValueError("Request must be a JSON object")
+                        if request.get("command") == "status":
+                            reply = daemon.status()
+                        elif request.get("command") == "cancel":
+                            reply = {"status": "ok", "cancelled": daemon.radio.cancel()}
+                        else:
+                            job = daemon.submit(request)
+                            self.send({"id": job.seq, "status": "queued"})
+                            if not request.get("wait", True):
+                                continue
+                            job.done.wait()
+                            reply = job.result
+                    except Exception as e:
+                        reply = {"status": "error", "error": str(e)}
+                    self.send(reply)
+
+            def send(self, reply: dict):
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+                self.wfile.flush()
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            os.unlink(self.socket_path)
+
+    def shutdown(self):
+        """Stop accepting jobs and cancel the one on air; serve_forever() then returns"""
+        self.radio.cancel()
+        if self._server:
+            self._server.shutdown()
+
+
+def submit(request: dict, socket_path: str = DEFAULT_SOCKET) -> dict:
+    """Send one job to a running daemon and return its final reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        with sock.makefile("rb") as replies:
+            for line in replies:
+                reply = json.loads(line)
+                if reply.get("status") != "queued" or not request.get("wait", True):
+                    return reply
+    raise Exception("Daemon closed the connection before the job finished")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RpiTX transmitter daemon')
+    parser.add_argument('--socket', type=str, default=DEFAULT_SOCKET,
+                        help=f'Unix socket to listen on (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--cache-dir', type=str,
+                        help='Cache rendered IQ in this directory and replay it on repeats')
+    parser.add_argument('--iq-format', choices=['float', 'i16', 'u8'], default='float',
+                        help='Sample format streamed to sendiq for rendered modes (default: float)')
+    parser.add_argument('--dither', action='store_true',
+                        help='Add triangular dither when quantizing to i16 or u8')
+    parser.add_argument('--metrics-prom', type=str,
+                        help='Keep per-phase latency histograms in this Prometheus text file')
+    parser.add_argument('--metrics-jsonl', type=str,
+                        help='Append one JSON line of phase timings per transmission to this file')
+    parser.add_argument('--render-workers', type=int,
+                        help='Render queued jobs in this many worker processes (default: off)')
+    parser.add_argument('--render-memory', type=int, default=256,
+                        help='MB of rendered IQ the workers may hold in shared memory (default: 256)')
+    parser.add_argument('--render-pending', type=int, default=DEFAULT_MAX_PENDING,
+                        help=f'Jobs rendered ahead of the transmitter (default: {DEFAULT_MAX_PENDING})')
+    parser.add_argument('--occupancy', choices=OCCUPANCY_MODES, default='report',
+                        help='Measure each rendered signal against its bandwidth; enforce refuses '
+                             'out-of-mask signals (default: report)')
+    args = parser.parse_args()
+
+    radio = RpiTX(render_cache=RenderCache(args.cache_dir) if args.cache_dir else None,
+                  metrics=TransmissionMetrics(args.metrics_prom, args.metrics_jsonl),
+                  iq_type=args.iq_format, dither=args.dither, occupancy=args.occupancy)
+    if args.render_workers:
+        radio.render_pool = RenderPool(args.render_workers, args.render_memory * 1024 * 1024,
+                                       args.render_pending, radio_settings=radio.render_settings())
+    daemon = TransmitDaemon(radio, args.socket)
+    # shutdown() waits for serve_forever() on this thread, so it runs on another
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=daemon.shutdown).start())
+    print(f"Listening on {args.socket}")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down", file=sys.stderr)
+    finally:
+        radio.cancel()  # tools run in their own session and miss the terminal's SIGINT
+        if radio.render_pool:
+            radio.render_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+import os
+import mmap
+import struct
+from typing import Iterable
+
+import numpy as np
+
+from rpitx_iq import SAMPLE_RATE, encode_samples
+
+WINDOW_BYTES = 16 * 1024 * 1024  # file region mapped at a time
+WAV_HEADER_BYTES = 44
+WAV_MAX_DATA = 0xFFFFFFFF - 36  # RIFF sizes are 32-bit
+
+# File extension -> sendiq-style sample type written
+EXPORT_FORMATS = {".cf32": "float", ".cs16": "i16", ".wav": "i16"}
+
+
+def export_format(path: str) -> str:
+    """Sample type for an output file, chosen by its extension"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORT_FORMATS:
+        raise Exception(f"Unsupported output format {ext or path}, use .cf32, .cs16 or .wav")
+    return EXPORT_FORMATS[ext]
+
+
+def as_complex(chunk: np.ndarray) -> np.ndarray:
+    """complex64 view of a chunk, converting flat int16 I/Q (e.g. cache replays)"""
+    if chunk.dtype == np.int16:
+        return (chunk.astype(np.float32) / np.float32(32767.0)).view(np.complex64)
+    return np.asarray(chunk, dtype=np.complex64)
+
+
+def wav_header(data_bytes: int, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Header of a 16-bit stereo PCM WAV file, I on the left channel and Q on the right"""
+    channels, bits = 2, 16
+    block_align = channels * bits // 8
+    return struct.pack("<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_bytes, b"WAVE", b"fmt ", 16, 1,
+                       channels, sample_rate, sample_rate * block_align, block_align, bits,
+                       b"data", data_bytes)
+
+
+class MappedWriter:
+    """Appends to a file through a sliding memory-mapped window
+
+    Space for each window is reserved up front (fallocate where available),
+    so running out of disk fails with an OSError here rather than a SIGBUS
+    while writing through the map. Memory use is one window regardless of
+    the file's length.
+    """
+
+    def __init__(self, path: str, start: int = 0, window: int = WINDOW_BYTES):
+        self.window = max(window // mmap.ALLOCATIONGRANULARITY, 1) * mmap.ALLOCATIONGRANULARITY
+        self.file = open(path, "w+b")
+        self.position = start  # next byte to write
+        self._map = None
+        self._base = 0
+
+    def _map_window(self):
+        if self._map is not None:
+            self._map.close()
+        self._base = self.position // self.window * self.window
+        end = self._base + self.window
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(self.file.fileno(), self._base, self.window)
+        else:
+            self.file.truncate(end)
+        self._map = mmap.mmap(self.file.fileno(), self.window, offset=self._base)
+
+    def write(self, data: np.ndarray):
+        view = memoryview(np.ascontiguousarray(data)).cast("B")
+        while len(view):
+            if self._map is None or self.position >= self._base + self.window:
+                self._map_window()
+            offset = self.position - self._base
+            n = min(len(view), self.window - offset)
+            self._map[offset:offset + n] = view[:n]
+            view = view[n:]
+            self.position += n
+
+    def close(self, header: bytes = b""):
+        """Unmap, trim the file to what was written and write header at offset 0"""
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        self.file.truncate(self.position)
+        if header:
+            self.file.seek(0)
+            self.file.write(header)
+        self.file.close()
+
+
+def export_chunks(chunks: Iterable[np.ndarray], path: str, sample_rate: int = SAMPLE_RATE) -> int:
+    """Write IQ chunks to a .cf32, .cs16 or .wav file; returns the number of samples"""
+    iq_type = export_format(path)
+    wav = path.lower().endswith(".wav")
+    start = WAV_HEADER_BYTES if wav else 0
+    writer = MappedWriter(path, start)
+    try:
+        for chunk in chunks:
+            writer.write(encode_samples(as_complex(chunk), iq_type))
+            if wav and writer.position - start > WAV_MAX_DATA:
+                raise Exception("WAV output is limited to 4 GB, use .cs16 or .cf32 for longer renders")
+    except BaseException:
+        writer.close()
+        os.unlink(path)
+        raise
+    data_bytes = writer.position - start
+    writer.close(wav_header(data_bytes, sample_rate) if wav else b"")
+    return data_bytes // (8 if iq_type == "float" else 4)
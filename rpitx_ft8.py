@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+import math
+import time
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+from rpitx_iq import SAMPLE_RATE, PhaseAccumulator, expj
+
+FT8_BAUD = 6.25  # symbols per second, also the tone spacing in Hz
+FT8_OFFSET = 1500.0  # audio offset of tone 0 above the dial frequency in Hz
+FT8_BT = 2.0  # Gaussian bandwidth-time product
+FT8_SLOT = 15.0  # seconds per transmit slot, starting on UTC multiples of it
+FT8_START_DELAY = 0.5  # seconds into its slot at which a transmission starts
+COSTAS = (3, 1, 4, 0, 6, 5, 2)
+GRAY_MAP = (0, 1, 3, 2, 5, 6, 4, 7)
+
+NTOKENS = 2063592
+MAX22 = 4194304
+MAXGRID4 = 32400
+CRC_POLY = 0x2757
+TOKENS = {"DE": 0, "QRZ": 1, "CQ": 2}
+FREE_TEXT_CHARS = " 0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ+-./?"
+HASH_CHARS = " 0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ/"
+
+# LDPC(174,91) generator: row k gives the 91 message bits feeding parity bit k
+GENERATOR_ROWS = (
+    "8329ce11bf31eaf509f27fc", "761c264e25c259335493132", "dc265902fb277c6410a1bdc", "1b3f417858cd2dd33ec7f62",
+    "09fda4fee04195fd034783a", "077cccc11b8873ed5c3d48a", "29b62afe3ca036f4fe1a9da", "6054faf5f35d96d3b0c8c3e",
+    "e20798e4310eed27884ae90", "775c9c08e80e26ddae56318", "b0b811028c2bf997213487c", "18a0c9231fc60adf5c5ea32",
+    "76471e8302a0721e01b12b8", "ffbccb80ca8341fafb47b2e", "66a72a158f9325a2bf67170", "c4243689fe85b1c51363a18",
+    "0dff739414d1a1b34b1c270", "15b48830636c8b99894972e", "29a89c0d3de81d665489b0e", "4f126f37fa51cbe61bd6b94",
+    "99c47239d0d97d3c84e0940", "1919b75119765621bb4f1e8", "09db12d731faee0b86df6b8", "488fc33df43fbdeea4eafb4",
+    "827423ee40b675f756eb5fe", "abe197c484cb74757144a9a", "2b500e4bc0ec5a6d2bdbdd0", "c474aa53d70218761669360",
+    "8eba1a13db3390bd6718cec", "753844673a27782cc42012e", "06ff83a145c37035a5c1268", "3b37417858cc2dd33ec3f62",
+    "9a4a5a28ee17ca9c324842c", "bc29f465309c977e89610a4", "2663ae6ddf8b5ce2bb29488", "46f231efe457034c1814418",
+    "3fb2ce85abe9b0c72e06fbe", "de87481f282c153971a0a2e", "fcd7ccf23c69fa99bba1412", "f0261447e9490ca8e474cec",
+    "4410115818196f95cdd7012", "088fc31df4bfbde2a4eafb4", "b8fef1b6307729fb0a078c0", "5afea7acccb77bbc9d99a90",
+    "49a7016ac653f65ecdc9076", "1944d085be4e7da8d6cc7d0", "251f62adc4032f0ee714002", "56471f8702a0721e00b12b8",
+    "2b8e4923f2dd51e2d537fa0", "6b550a40a66f4755de95c26", "a18ad28d4e27fe92a4f6c84", "10c2e586388cb82a3d80758",
+    "ef34a41817ee02133db2eb0", "7e9c0c54325a9c15836e000", "3693e572d1fde4cdf079e86", "bfb2cec5abe1b0c72e07fbe",
+    "7ee18230c583cccc57d4b08", "a066cb2fedafc9f52664126", "bb23725abc47cc5f4cc4cd2", "ded9dba3bee40c59b5609b4",
+    "d9a7016ac653e6decdc9036", "9ad46aed5f707f280ab5fc4", "e5921c77822587316d7d3c2", "4f14da8242a8b86dca73352",
+    "8b8b507ad467d4441df770e", "22831c9cf1169467ad04b68", "213b838fe2ae54c38ee7180", "5d926b6dd71f085181a4e12",
+    "66ab79d4b29ee6e69509e56", "958148682d748a38dd68baa", "b8ce020cf069c32a723ab14", "f4331d6d461607e95752746",
+    "6da23ba424b9596133cf9c8", "a636bcbc7b30c5fbeae67fe", "5cb0d86a07df654a9089a20", "f11f106848780fc9ecdd80a",
+    "1fbb5364fb8d2c9d730d5ba", "fcb86bc70a50c9d02a5d034", "a534433029eac15f322e34c", "c989d9c7c3d3b8c55d75130",
+    "7bb38b2f0186d46643ae962", "2644ebadeb44b9467d1f42c", "608cc857594bfbb55d69600",)
+GENERATOR = np.array([[(int(row, 16) >> (91 - i)) & 1 for i in range(91)]
+                      for row in GENERATOR_ROWS], dtype=np.uint8)
+
+
+def hash22(call: str) -> int:
+    """22-bit hash used for calls that do not fit the standard 28-bit form"""
+    n = 0
+    for char in (call.upper() + " " * 11)[:11]:
+        n = 38 * n + max(HASH_CHARS.find(char), 0)
+    return ((47055833459 * n) & 0xFFFFFFFFFFFFFFFF) >> (64 - 22)
+
+
+def pack_call(call: str):
+    """Return (c28, suffix bit) for a callsign or CQ/DE/QRZ token"""
+    call = call.upper()
+    if call in TOKENS:
+        return TOKENS[call], 0
+    suffix = 0
+    if call.endswith(("/P", "/R")):
+        call, suffix = call[:-2], 1
+    padded = call
+    if len(call) >= 2 and call[1].isdigit() and (len(call) < 3 or not call[2].isdigit()):
+        padded = " " + call
+    padded = (padded + "      ")[:6]
+    a = " 0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    b = " ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    try:
+        if len(call) > 6 or not padded[2].isdigit():
+            raise ValueError
+        n = a.index(padded[0])
+        n = n * 36 + a[1:].index(padded[1])
+        n = n * 10 + int(padded[2])
+        for char in padded[3:]:
+            n = n * 27 + b.index(char)
+    except ValueError:
+        # Non-standard call: send its hash, shown as <CALL> by receivers that know it
+        return NTOKENS + hash22(call), suffix
+    return NTOKENS + MAX22 + n, suffix
+
+
+def pack_grid(text: str):
+    """Return (R bit, g15) for a grid square, signal report, RRR, RR73, 73 or nothing"""
+    text = text.upper()
+    if text in ("", "RRR", "RR73", "73"):
+        return 0, MAXGRID4 + {"": 1, "RRR": 2, "RR73": 3, "73": 4}[text]
+    ir = 0
+    if text.startswith("R") and len(text) > 1 and text[1] in "+-":
+        ir, text = 1, text[1:]
+    if text[0] in "+-":
+        report = int(text)
+        if not -30 <= report <= 32:
+            raise ValueError(f"FT8 report out of range: {text}")
+        return ir, MAXGRID4 + 35 + report
+    if len(text) == 4 and "A" <= text[0] <= "R" and "A" <= text[1] <= "R" and text[2:].isdigit():
+        return ir, ((ord(text[0]) - 65) * 18 + ord(text[1]) - 65) * 100 + int(text[2:])
+    raise ValueError(f"Not an FT8 grid or report: {text}")
+
+
+def pack_free_text(text: str) -> int:
+    """Pack up to 13 characters as a type 0.0 free text message"""
+    text = text.upper()
+    if len(text) > 13 or any(c not in FREE_TEXT_CHARS for c in text):
+        raise ValueError(f"FT8 free text must be 13 of '{FREE_TEXT_CHARS}': {text}")
+    n = 0
+    for char in text.rjust(13):
+        n = n * 42 + FREE_TEXT_CHARS.index(char)
+    return n << 6  # n3 = 0, i3 = 0
+
+
+def pack_message(message: str) -> int:
+    """Pack a message into its 77-bit payload
+
+    "CALL1 CALL2 [GRID|REPORT|RRR|RR73|73]" becomes a standard type 1 (or
+    type 2 with /P) message, with at most one call hashed; anything else is
+    sent as free text.
+    """
+    words = message.upper().split()
+    if len(words) in (2, 3):
+        try:
+            c28a, p1a = pack_call(words[0])
+            c28b, p1b = pack_call(words[1])
+            ir, g15 = pack_grid(words[2] if len(words) == 3 else "")
+            hashed = [NTOKENS <= c28 < NTOKENS + MAX22 for c28 in (c28a, c28b)]
+            if all(hashed):
+                raise ValueError("No standard callsign")
+        except ValueError:
+            pass
+        else:
+            i3 = 2 if words[0].endswith("/P") or words[1].endswith("/P") else 1
+            return ((((c28a << 1 | p1a) << 28 | c28b) << 1 | p1b) << 1 | ir) << 18 | g15 << 3 | i3
+    return pack_free_text(" ".join(words))
+
+
+def crc14(payload77: int) -> int:
+    """CRC-14 of a 77-bit payload, zero-extended to 82 bits as FT8 specifies"""
+    remainder = payload77 << (5 + 14)
+    for bit in range(95, 13, -1):
+        if remainder & (1 << bit):
+            remainder ^= (CRC_POLY | 1 << 14) << (bit - 14)
+    return remainder
+
+
+def ldpc_codewords(payloads: Sequence[int]) -> np.ndarray:
+    """Encode 77-bit payloads (with CRC) into rows of 174 codeword bits"""
+    messages = np.array([[(m >> (90 - i)) & 1 for i in range(91)]
+                         for m in (p << 14 | crc14(p) for p in payloads)], dtype=np.uint8)
+    parity = (messages.astype(np.uint16) @ GENERATOR.T.astype(np.uint16)) & 1
+    return np.hstack((messages, parity.astype(np.uint8)))
+
+
+def tones(messages: Sequence[str]) -> np.ndarray:
+    """Return the 79 channel symbols (tones 0-7) for each message"""
+    codewords = ldpc_codewords([pack_message(m) for m in messages])
+    triplets = codewords.reshape(len(codewords), 58, 3)
+    data = np.asarray(GRAY_MAP, dtype=np.uint8)[triplets[:, :, 0] << 2 | triplets[:, :, 1] << 1
+                                                | triplets[:, :, 2]]
+    costas = np.broadcast_to(np.asarray(COSTAS, dtype=np.uint8), (len(codewords), 7))
+    return np.hstack((costas, data[:, :29], costas, data[:, 29:], costas))
+
+
+@lru_cache(maxsize=8)
+def gaussian_pulse(samples_per_symbol: int, bt: float = FT8_BT) -> np.ndarray:
+    """GFSK frequency pulse spanning three symbols, split into three symbol-long blocks"""
+    c = math.pi * math.sqrt(2.0 / math.log(2.0))
+    t = np.arange(3 * samples_per_symbol) / samples_per_symbol - 1.5
+    erf = np.frompyfunc(math.erf, 1, 1)
+    pulse = (erf(c * bt * (t + 0.5)) - erf(c * bt * (t - 0.5))).astype(np.float64) / 2.0
+    pulse = pulse.reshape(3, samples_per_symbol)
+    pulse.setflags(write=False)
+    return pulse
+
+
+def gfsk_waveform(symbols: np.ndarray, offset: float = FT8_OFFSET, amplitude: float = 1.0,
+                  sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Gaussian-smoothed 8-FSK IQ for one message's symbols"""
+    nsps = int(round(sample_rate / FT8_BAUD))
+    head, body, tail = gaussian_pulse(nsps)
+    s = np.asarray(symbols, dtype=np.float64)
+    # The first and last symbols are extended by one symbol for the pulse tails
+    ext = np.concatenate(([s[0]], s, [s[-1]]))
+    deviation = (np.outer(ext[2:], head) + np.outer(ext[1:-1], body) + np.outer(ext[:-2], tail))
+    freqs = offset + FT8_BAUD * deviation.ravel()
+    iq = expj(PhaseAccumulator(sample_rate).advance(freqs), amplitude)
+    # Raised-cosine amplitude ramps over an eighth of a symbol at each end
+    ramp = nsps // 8
+    edge = (0.5 - 0.5 * np.cos(np.pi * np.arange(ramp) / ramp)).astype(np.float32)
+    iq[:ramp] *= edge
+    iq[len(iq) - ramp:] *= edge[::-1]
+    return iq
+
+
+def with_callsign(message: str, callsign: str) -> str:
+    """Insert callsign into a bare "CQ" or "CQ GRID" message"""
+    words = message.upper().split()
+    if callsign and words and words[0] == "CQ" and len(words) <= 2 and \
+            (len(words) == 1 or len(words[1]) == 4 and words[1][2:].isdigit()):
+        words.insert(1, callsign.upper())
+    return " ".join(words)
+
+
+def render_ft8(messages: Sequence[str], offset: float = FT8_OFFSET, amplitude: float = 1.0,
+               sample_rate: int = SAMPLE_RATE) -> List[np.ndarray]:
+    """Render a batch of messages ahead of time, one 12.64 s waveform each"""
+    return [gfsk_waveform(symbols, offset, amplitude, sample_rate) for symbols in tones(messages)]
+
+
+def next_slot_start(now: float, slot: float = FT8_SLOT, delay: float = FT8_START_DELAY) -> float:
+    """Unix time of the first slot start (UTC boundary plus delay) at or after now"""
+    start = math.floor((now - delay) / slot) * slot + delay
+    return start if start >= now else start + slot
+
+
+def wait_for_slot(clock: Optional[Callable[[], float]] = None,
+                  sleep: Optional[Callable[[float], None]] = None) -> float:
+    """Sleep until the next slot start and return it, as pift8 does before keying up"""
+    clock = clock or time.time
+    sleep = sleep or time.sleep
+    start = next_slot_start(clock())
+    while True:
+        remaining = start - clock()
+        if remaining <= 0:
+            return start
+        sleep(remaining)
+
+
+def slot_chunks(waveforms: Sequence[np.ndarray], sample_rate: int = SAMPLE_RATE):
+    """Yield pre-rendered waveforms back to back, each padded to a full 15 s slot
+
+    The stream must start on a slot (see wait_for_slot); the padding then
+    keeps every later message on its own slot by the sample clock alone.
+    """
+    slot = int(FT8_SLOT * sample_rate)
+    for i, waveform in enumerate(waveforms):
+        yield waveform
+        if i < len(waveforms) - 1:
+            yield np.zeros(slot - len(waveform), dtype=np.complex64)
+
@@ -2,18 +2,119 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import json
+import queue
+import threading
 from rpitx_chirp import RpiTX, RadioConfig
+from rpitx_channels import ChannelStore
+from rpitx_sstv import SSTV_MODES
+from rpitx_waterfall import FRAME_RATE, WIDTH, WaterfallFeed
+
+CHANNELS_FILE = "radio_configs.json"
+WATERFALL_HEIGHT = 120  # rows of history shown
+
+class VirtualList(ttk.Frame):
+    """Listbox that only holds the rows in view, for lists of any length
+    
+    Rows come from row(i) for i in range(count); the scrollbar and mouse
+    wheel move a window of `height` rows over them.
+    """
+    
+    def __init__(self, master, height=10, **kwargs):
+        super().__init__(master, **kwargs)
+        self.height = height
+        self.first = 0
+        self.count = 0
+        self.row = lambda i: ""
+        self.selected = None
+        self.listbox = tk.Listbox(self, height=height, exportselection=False)
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scroll)
+        self.listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.columnconfigure(0, weight=1)
+        self.listbox.bind('<<ListboxSelect>>', self.on_listbox_select)
+        for sequence in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self.listbox.bind(sequence, self.on_wheel)
+        self.listbox.bind('<Up>', lambda e: self.step(-1))
+        self.listbox.bind('<Down>', lambda e: self.step(1))
+        
+    def set_source(self, count, row):
+        """Show count rows, where row(i) returns the text of row i"""
+        self.count = count
+        self.row = row
+        self.selected = None
+        self.scroll_to(min(self.first, max(count - self.height, 0)))
+        
+    def scroll_to(self, first):
+        """Make first the top visible row and refill the listbox"""
+        self.first = max(0, min(int(first), max(self.count - self.height, 0)))
+        last = min(self.first + self.height, self.count)
+        self.listbox.delete(0, tk.END)
+        for i in range(self.first, last):
+            self.listbox.insert(tk.END, self.row(i))
+        if self.selected is not None and self.first <= self.selected < last:
+            self.listbox.selection_set(self.selected - self.first)
+        if self.count:
+            self.scrollbar.set(self.first / self.count, last / self.count)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(amount) * self.count)
+        else:
+            step = self.height if unit == "pages" else 1
+            self.scroll_to(self.first + int(amount) * step)
+            
+    def on_wheel(self, event):
+        if getattr(event, 'num', None) == 4 or getattr(event, 'delta', 0) > 0:
+            self.scroll_to(self.first - 3)
+        else:
+            self.scroll_to(self.first + 3)
+        return "break"
+        
+    def step(self, delta):
+        """Move the selection by delta rows, scrolling as needed"""
+        if not self.count:
+            return "break"
+        index = 0 if self.selected is None else max(0, min(self.selected + delta, self.count - 1))
+        self.selected = index
+        if not self.first <= index < self.first + self.height:
+            self.scroll_to(index if delta < 0 else index - self.height + 1)
+        else:
+            self.scroll_to(self.first)
+        self.event_generate('<<ListboxSelect>>')
+        return "break"
+        
+    def on_listbox_select(self, event):
+        selection = self.listbox.curselection()
+        if selection:
+            self.selected = self.first + selection[0]
+            self.event_generate('<<ListboxSelect>>')
+            
+    def curselection(self):
+        """Selected row index into the whole list, as a tuple like Listbox's"""
+        return () if self.selected is None else (self.selected,)
 
 class RpiTXGUI:
     def __init__(self, root):
         self.root = root
         self.root.title("Khanfar-TX Control - Developed by Khanfar Systems")
         self.radio = RpiTX()
+        self.channels = None
+        self.channel_span = (0, 0)  # positions in the store shown by the channel list
         
         # Create notebook for tabs
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill='both', expand=True, padx=10, pady=5)
         
+        # Live waterfall of the outgoing IQ; transmissions run on a worker
+        # thread so the mainloop keeps drawing it
+        self.tx_thread = None
+        self.tx_errors = queue.Queue()
+        self.waterfall = WaterfallFeed()
+        self.radio.add_tap(self.waterfall.feed)
+        self.setup_preview()
+        
         # Create tabs
         self.basic_frame = ttk.Frame(self.notebook)
         self.digital_frame = ttk.Frame(self.notebook)
@@ -33,11 +134,71 @@ class RpiTXGUI:
         
         # Load saved configurations
         try:
-            self.radio.load_config("radio_configs.json")
-            self.update_channel_list()
-        except:
-            pass
+            self.channels = ChannelStore(CHANNELS_FILE)
+        except Exception as e:
+            # Never fall back to another file: edits there would fork the
+            # channels and be shadowed once the real file loads again
+            self.channels = ChannelStore(CHANNELS_FILE, read_only=True)
+            messagebox.showerror("Error", f"Could not load {CHANNELS_FILE}: {str(e)}\n\n"
+                                 f"Showing the {len(self.channels)} channels that could be read. "
+                                 "Memory channels are read-only until the file is fixed.")
+        self.update_channel_list()
             
+    def setup_preview(self):
+        """Setup the waterfall panel below the tabs"""
+        frame = ttk.LabelFrame(self.root, text="Preview")
+        frame.pack(fill='x', padx=10, pady=5)
+        
+        # One PhotoImage used as a ring of rows: each frame writes a single
+        # row and the two canvas items showing it are shifted to scroll
+        self.waterfall_image = tk.PhotoImage(width=WIDTH, height=WATERFALL_HEIGHT)
+        self.waterfall_canvas = tk.Canvas(frame, width=WIDTH, height=WATERFALL_HEIGHT,
+                                          bg='black', highlightthickness=0)
+        self.waterfall_canvas.grid(row=0, column=0, padx=5, pady=5)
+        self.waterfall_items = [
+            self.waterfall_canvas.create_image(0, 0, anchor=tk.NW, image=self.waterfall_image),
+            self.waterfall_canvas.create_image(0, WATERFALL_HEIGHT, anchor=tk.NW,
+                                               image=self.waterfall_image),
+        ]
+        self.waterfall_row = 0
+        
+        self.status_var = tk.StringVar(value="Idle")
+        ttk.Label(frame, textvariable=self.status_var).grid(row=1, column=0, sticky=tk.W, padx=5)
+        self.poll_preview()
+        
+    def poll_preview(self):
+        """Draw new waterfall rows and pick up finished transmissions, FRAME_RATE times a second"""
+        for row in self.waterfall.rows():
+            self.waterfall_row = (self.waterfall_row - 1) % WATERFALL_HEIGHT
+            self.waterfall_image.put(row, to=(0, self.waterfall_row))
+        top, bottom = self.waterfall_items
+        self.waterfall_canvas.coords(top, 0, -self.waterfall_row)
+        self.waterfall_canvas.coords(bottom, 0, WATERFALL_HEIGHT - self.waterfall_row)
+        
+        if self.tx_thread is not None and not self.tx_thread.is_alive():
+            self.tx_thread = None
+            self.status_var.set("Idle")
+        while not self.tx_errors.empty():
+            messagebox.showerror("Error", f"Transmission failed: {self.tx_errors.get()}")
+        self.root.after(int(1000 / FRAME_RATE), self.poll_preview)
+        
+    def start_transmission(self, config, description, job):
+        """Run job on a worker thread so the GUI and preview stay responsive"""
+        if self.tx_thread is not None and self.tx_thread.is_alive():
+            messagebox.showerror("Error", "A transmission is already running")
+            return
+        self.radio.current_config = config
+        self.status_var.set(description)
+        
+        def run():
+            try:
+                job()
+            except Exception as e:
+                self.tx_errors.put(str(e))
+                
+        self.tx_thread = threading.Thread(target=run, daemon=True)
+        self.tx_thread.start()
+        
     def setup_basic_tab(self):
         """Setup basic transmission controls"""
         frame = self.basic_frame
@@ -168,7 +329,7 @@ class RpiTXGUI:
         ttk.Label(self.sstv_frame, text="Mode:").grid(row=0, column=0, sticky=tk.W)
         self.sstv_mode_var = tk.StringVar(value="Martin1")
         sstv_combo = ttk.Combobox(self.sstv_frame, textvariable=self.sstv_mode_var)
-        sstv_combo['values'] = ('Martin1', 'Martin2', 'Scottie1', 'Scottie2')
+        sstv_combo['values'] = tuple(SSTV_MODES)
         sstv_combo.grid(row=0, column=1, sticky=(tk.W, tk.E))
         
         # Transmit button
@@ -180,13 +341,26 @@ class RpiTXGUI:
         
         # Channel list
         ttk.Label(frame, text="Memory Channels:").grid(row=0, column=0, sticky=tk.W, padx=5)
-        self.channel_list = tk.Listbox(frame, height=10)
+        self.channel_count_var = tk.StringVar()
+        ttk.Label(frame, textvariable=self.channel_count_var).grid(row=0, column=1, sticky=tk.E, padx=5)
+        self.channel_list = VirtualList(frame, height=10)
         self.channel_list.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), padx=5)
         self.channel_list.bind('<<ListboxSelect>>', self.on_channel_select)
         
+        # Frequency range filter
+        range_frame = ttk.Frame(frame)
+        range_frame.grid(row=2, column=0, columnspan=2, sticky=tk.W, padx=5, pady=2)
+        ttk.Label(range_frame, text="Range (MHz):").pack(side=tk.LEFT)
+        self.range_low_var = tk.StringVar()
+        self.range_high_var = tk.StringVar()
+        ttk.Entry(range_frame, textvariable=self.range_low_var, width=10).pack(side=tk.LEFT, padx=2)
+        ttk.Label(range_frame, text="to").pack(side=tk.LEFT)
+        ttk.Entry(range_frame, textvariable=self.range_high_var, width=10).pack(side=tk.LEFT, padx=2)
+        ttk.Button(range_frame, text="Filter", command=self.update_channel_list).pack(side=tk.LEFT, padx=5)
+        
         # Buttons
         button_frame = ttk.Frame(frame)
-        button_frame.grid(row=2, column=0, columnspan=2, pady=10)
+        button_frame.grid(row=3, column=0, columnspan=2, pady=10)
         
         ttk.Button(button_frame, text="Add Channel", command=self.add_channel).pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Remove Channel", command=self.remove_channel).pack(side=tk.LEFT, padx=5)
@@ -252,18 +426,19 @@ class RpiTXGUI:
                 bandwidth=12500,
                 name="GUI Transmission"
             )
-            self.radio.current_config = config
             
             if self.signal_var.get() == "Chirp":
                 sweep = float(self.sweep_var.get()) * 1e6
                 print(f"Transmitting {duration}s chirp at {freq/1e6:.3f}MHz")
                 print(f"Sweeping ±{float(self.sweep_var.get())/2}MHz")
-                self.radio.transmit_chirp(duration, sweep)
+                self.start_transmission(config, f"Chirp at {freq/1e6:.3f}MHz",
+                                        lambda: self.radio.transmit_chirp(duration, sweep))
             else:
                 tone = float(self.tone_var.get())
                 print(f"Transmitting {duration}s tone at {freq/1e6:.3f}MHz")
                 print(f"Tone frequency: {tone}Hz")
-                self.radio.transmit_tone(duration, tone)
+                self.start_transmission(config, f"Tone at {freq/1e6:.3f}MHz",
+                                        lambda: self.radio.transmit_tone(duration, tone))
                 
         except Exception as e:
             messagebox.showerror("Error", f"Transmission failed: {str(e)}")
@@ -285,24 +460,26 @@ class RpiTXGUI:
                 bandwidth=12500,
                 name="Digital Transmission"
             )
-            self.radio.current_config = config
             
             mode = self.digital_mode_var.get()
             if mode == "Morse":
                 wpm = int(self.wpm_var.get())
-                self.radio.transmit_morse(message, wpm)
+                job = lambda: self.radio.transmit_morse(message, wpm)
             elif mode == "RTTY":
                 baud = int(self.baud_var.get())
-                self.radio.transmit_rtty(message, baud)
+                job = lambda: self.radio.transmit_rtty(message, baud)
             elif mode == "POCSAG":
-                self.radio.transmit_pocsag(message)
+                job = lambda: self.radio.transmit_pocsag(message)
             elif mode == "Opera":
                 callsign = self.callsign_var.get()
                 grid = self.grid_var.get()
-                self.radio.transmit_opera(callsign, grid)
+                job = lambda: self.radio.transmit_opera(callsign, grid)
             elif mode == "FT8":
                 callsign = self.callsign_var.get()
-                self.radio.transmit_ft8(message, callsign)
+                job = lambda: self.radio.transmit_ft8(message, callsign)
+            else:
+                return
+            self.start_transmission(config, f"{mode} at {freq/1e6:.3f}MHz", job)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Transmission failed: {str(e)}")
@@ -324,20 +501,23 @@ class RpiTXGUI:
                 bandwidth=12500,
                 name="Image Transmission"
             )
-            self.radio.current_config = config
             
             mode = self.image_mode_var.get()
             if mode == "SSTV":
                 sstv_mode = self.sstv_mode_var.get()
-                self.radio.transmit_sstv(image_path, sstv_mode)
+                job = lambda: self.radio.transmit_sstv(image_path, sstv_mode)
             else:  # Spectrum
-                self.radio.transmit_spectrum(image_path)
+                job = lambda: self.radio.transmit_spectrum(image_path)
+            self.start_transmission(config, f"{mode} at {freq/1e6:.3f}MHz", job)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Transmission failed: {str(e)}")
             
     def add_channel(self):
         """Add current settings as a new channel"""
+        if self.channels.read_only:
+            messagebox.showerror("Error", f"{CHANNELS_FILE} could not be loaded; channels are read-only")
+            return
         try:
             freq = float(self.freq_var.get()) * 1e6
             config = RadioConfig(
@@ -345,43 +525,60 @@ class RpiTXGUI:
                 modulation=self.mod_var.get(),
                 power=self.power_var.get(),
                 bandwidth=12500,
-                name=f"Channel {len(self.radio.configs) + 1}"
+                name=self.channels.unique_name()
             )
-            self.radio.add_config(config)
+            self.channels.put(config)
             self.update_channel_list()
-            self.radio.save_config("radio_configs.json")
         except ValueError as e:
             messagebox.showerror("Error", f"Invalid input: {str(e)}")
             
+    def selected_channel(self):
+        """The channel selected in the list, or None"""
+        selection = self.channel_list.curselection()
+        if not selection:
+            return None
+        return self.channels[self.channel_span[0] + selection[0]]
+        
     def remove_channel(self):
         """Remove selected channel"""
-        selection = self.channel_list.curselection()
-        if selection:
-            index = selection[0]
-            del self.radio.configs[index]
+        if self.channels.read_only:
+            messagebox.showerror("Error", f"{CHANNELS_FILE} could not be loaded; channels are read-only")
+            return
+        config = self.selected_channel()
+        if config:
+            self.channels.remove(config.name)
             self.update_channel_list()
-            self.radio.save_config("radio_configs.json")
             
     def load_channel(self):
         """Load selected channel settings"""
-        selection = self.channel_list.curselection()
-        if selection:
-            config = self.radio.configs[selection[0]]
+        config = self.selected_channel()
+        if config:
             self.freq_var.set(f"{config.frequency/1e6:.3f}")
             self.mod_var.set(config.modulation)
             self.power_var.set(config.power)
             
     def update_channel_list(self):
-        """Update the channel listbox"""
-        self.channel_list.delete(0, tk.END)
-        for config in self.radio.configs:
-            self.channel_list.insert(tk.END, f"{config.name}: {config.frequency/1e6:.3f}MHz {config.modulation}")
+        """Point the channel list at the store, narrowed to the range filter if set"""
+        try:
+            low = float(self.range_low_var.get() or 0) * 1e6
+            high = float(self.range_high_var.get()) * 1e6 if self.range_high_var.get() else float("inf")
+        except ValueError:
+            messagebox.showerror("Error", "Invalid frequency range")
+            return
+        start, stop = self.channels.span(low, high)
+        self.channel_span = (start, stop)
+        
+        def row(i):
+            config = self.channels[start + i]
+            return f"{config.name}: {config.frequency/1e6:.3f}MHz {config.modulation}"
+            
+        self.channel_list.set_source(stop - start, row)
+        self.channel_count_var.set(f"{stop - start} of {len(self.channels)}")
             
     def on_channel_select(self, event):
         """Handle channel selection"""
-        selection = self.channel_list.curselection()
-        if selection:
-            config = self.radio.configs[selection[0]]
+        config = self.selected_channel()
+        if config:
             self.freq_var.set(f"{config.frequency/1e6:.3f}")
             self.mod_var.set(config.modulation)
             self.power_var.set(config.power)
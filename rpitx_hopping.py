@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import json
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+from rpitx_composite import MAX_OFFSET
+from rpitx_iq import CHUNK_SIZE, SAMPLE_RATE, PhaseAccumulator, expj
+
+
+@dataclass
+class Hop:
+    """One dwell of a hop schedule, offset from the fixed carrier"""
+    offset: float  # Hz from the carrier, negative below it
+    dwell: float  # seconds
+
+
+HopLike = Union[Hop, dict, Sequence[float]]
+
+
+def as_hop(hop: HopLike) -> Hop:
+    """Accept a Hop, a dict with offset and dwell, or an (offset, dwell) pair"""
+    if isinstance(hop, Hop):
+        return hop
+    try:
+        if isinstance(hop, dict):
+            return Hop(float(hop["offset"]), float(hop["dwell"]))
+        offset, dwell = hop
+        return Hop(float(offset), float(dwell))
+    except (KeyError, TypeError, ValueError):
+        raise Exception(f"Hop needs an offset and a dwell: {hop}")
+
+
+def parse_hops(spec: str) -> List[Hop]:
+    """Parse "OFFSET:DWELL_MS,..." (offsets in Hz), e.g. "-6000:5,0:5,6000:5" """
+    hops = []
+    for item in spec.split(","):
+        offset, _, dwell = item.strip().partition(":")
+        try:
+            hops.append(Hop(float(offset), float(dwell) / 1e3))
+        except ValueError:
+            raise Exception(f"Hop must be OFFSET_HZ:DWELL_MS: {item}")
+    return hops
+
+
+def hop_span(hops: Iterable[HopLike]) -> float:
+    """Width in Hz, centred on the carrier, that the hop offsets reach"""
+    return 2 * max((abs(as_hop(h).offset) for h in hops), default=0.0)
+
+
+def load_hops(path: str) -> List[Hop]:
+    """Read a JSON array of {"offset": Hz, "dwell": seconds} objects"""
+    with open(path) as f:
+        specs = json.load(f)
+    if not isinstance(specs, list):
+        raise Exception(f"Hop file must hold a JSON array of hops: {path}")
+    return [as_hop(spec) for spec in specs]
+
+
+class HopNCO:
+    """Numerically controlled oscillator stepping through a hop schedule
+
+    The carrier stays put; each hop is a frequency offset applied to the
+    IQ stream by one phase accumulator, so transitions are phase-continuous
+    and cost nothing but a different phase increment. Hop edges fall on
+    the sample nearest each cumulative dwell time, so rounding never adds
+    up over a long schedule. The schedule repeats until the payload ends.
+    """
+
+    def __init__(self, hops: Iterable[HopLike], sample_rate: int = SAMPLE_RATE):
+        self.hops = [as_hop(h) for h in hops]
+        if not self.hops:
+            raise Exception("Hop schedule needs at least one hop")
+        limit = MAX_OFFSET * sample_rate
+        for hop in self.hops:
+            if abs(hop.offset) > limit:
+                raise Exception(f"Hop offset {hop.offset:g} Hz is outside ±{limit:g} Hz "
+                                f"at {sample_rate} samples/s")
+            if hop.dwell <= 0:
+                raise Exception(f"Hop dwell must be positive: {hop.dwell}")
+        self.sample_rate = sample_rate
+        self.offsets = np.array([h.offset for h in self.hops], dtype=np.float64)
+        # Sample index at which each hop of one pass ends
+        self.edges = np.round(np.cumsum([h.dwell for h in self.hops]) * sample_rate).astype(np.int64)
+        if np.any(np.diff(self.edges, prepend=0) < 1):
+            raise Exception(f"Every hop must dwell at least one sample at {sample_rate} samples/s")
+        self.period = int(self.edges[-1])  # samples in one pass of the schedule
+        self.osc = PhaseAccumulator(sample_rate)
+        self.position = 0  # samples generated so far
+
+    def frequencies(self, n: int) -> np.ndarray:
+        """Per-sample offsets for the next n samples, advancing the schedule"""
+        positions = np.arange(self.position, self.position + n, dtype=np.int64) % self.period
+        freqs = self.offsets[np.searchsorted(self.edges, positions, side="right")]
+        self.position += n
+        return freqs
+
+    def carrier(self, duration: float, amplitude: float = 1.0) -> Iterator[np.ndarray]:
+        """Hop an unmodulated carrier for duration seconds"""
+        remaining = int(round(duration * self.sample_rate))
+        while remaining > 0:
+            n = min(CHUNK_SIZE, remaining)
+            yield expj(self.osc.advance(self.frequencies(n)), amplitude)
+            remaining -= n
+
+    def apply(self, chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Hop a payload: mix every chunk by the schedule's offsets"""
+        for chunk in chunks:
+            shifted = expj(self.osc.advance(self.frequencies(len(chunk))))
+            shifted *= chunk
+            yield shifted
+
+
+def measure_hops(iq: np.ndarray, hops: Iterable[HopLike], sample_rate: int = SAMPLE_RATE,
+                 guard: float = 0.1) -> np.ndarray:
+    """Frequency measured in each dwell of rendered IQ, in Hz
+
+    Uses the mean phase step between neighbouring samples, skipping a guard
+    fraction at both ends of every dwell; meant for carrier-only renders.
+    Covers as many whole dwells as iq holds, repeating the schedule.
+    """
+    hops = [as_hop(h) for h in hops]
+    durations = np.diff(np.round(np.cumsum([h.dwell for h in hops]) * sample_rate).astype(np.int64),
+                        prepend=0)
+    measured = []
+    start = 0
+    while True:
+        for length in durations:
+            if start + length > len(iq):
+                return np.array(measured)
+            skip = int(length * guard)
+            dwell = iq[start + skip:start + length - skip]
+            step = np.angle(np.sum(dwell[1:] * np.conj(dwell[:-1])))
+            measured.append(step * sample_rate / (2 * np.pi))
+            start += length
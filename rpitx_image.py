@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # only needed for image modes
+    Image = None
+
+DEFAULT_IMAGE_CACHE_DIR = os.path.expanduser("~/.cache/khanfar-tx/images")
+DEFAULT_IMAGE_CACHE_SIZE = 64 * 1024 * 1024  # bytes on disk
+MEMORY_ENTRIES = 16  # prepared images kept in memory
+
+
+def _require_pillow():
+    if Image is None:
+        raise Exception("Image transmission needs Pillow (pip3 install Pillow)")
+
+
+def decode_image(path: str, size: Tuple[int, int], mode: str = "RGB") -> np.ndarray:
+    """Decode an image and resize it to size (width, height), bypassing the cache"""
+    _require_pillow()
+    with Image.open(path) as image:
+        image = image.convert(mode).resize(size, Image.LANCZOS)
+        return np.asarray(image, dtype=np.uint8)
+
+
+class ImageCache:
+    """Prepared pixel arrays keyed by file content and target geometry
+
+    Recently used arrays are kept in memory; every prepared image is also
+    written as a .npy file and loaded back by memory mapping, so sending the
+    same image again skips decoding and resizing even in a new process.
+    """
+
+    def __init__(self, directory: Optional[str] = DEFAULT_IMAGE_CACHE_DIR,
+                 max_bytes: int = DEFAULT_IMAGE_CACHE_SIZE, memory_entries: int = MEMORY_ENTRIES):
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._digests: Dict[tuple, str] = {}
+        self._sizes: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self.directory = directory
+        if directory:
+            try:
+                os.makedirs(directory, exist_ok=True)
+            except OSError:
+                self.directory = None  # read-only home: keep the memory cache only
+            else:
+                self._scan()
+
+    def _scan(self):
+        """Rebuild the on-disk LRU index, oldest first"""
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".npy"):
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._size += size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npy")
+
+    def digest(self, path: str) -> str:
+        """Hash of the file's contents, remembered while its size and mtime are unchanged"""
+        stat = os.stat(path)
+        stamp = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(stamp)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+            digest = h.hexdigest()
+            self._digests[stamp] = digest
+        return digest
+
+    def key(self, path: str, size: Tuple[int, int], mode: str) -> str:
+        width, height = size
+        return f"{self.digest(path)[:32]}-{width}x{height}-{mode}"
+
+    def load(self, path: str, size: Tuple[int, int], mode: str = "RGB") -> np.ndarray:
+        """Return the image resized to size as a read-only uint8 array"""
+        key = self.key(path, size, mode)
+        with self._lock:
+            pixels = self._memory.get(key)
+            if pixels is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return pixels
+            pixels = self._read(key)
+            if pixels is not None:
+                self.hits += 1
+                self._remember(key, pixels)
+                return pixels
+            self.misses += 1
+        pixels = decode_image(path, size, mode)
+        pixels.setflags(write=False)
+        with self._lock:
+            self._write(key, pixels)
+            self._remember(key, pixels)
+        return pixels
+
+    def image_size(self, path: str) -> Tuple[int, int]:
+        """Original (width, height) of an image, read from its header once per content"""
+        digest = self.digest(path)
+        if digest not in self._sizes:
+            _require_pillow()
+            with Image.open(path) as image:
+                self._sizes[digest] = image.size
+        return self._sizes[digest]
+
+    def _remember(self, key: str, pixels: np.ndarray):
+        self._memory[key] = pixels
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read(self, key: str) -> Optional[np.ndarray]:
+        if not self.directory or key not in self._files:
+            return None
+        path = self._path(key)
+        try:
+            pixels = np.load(path, mmap_mode="r")
+            os.utime(path)
+        except (OSError, ValueError):
+            self._size -= self._files.pop(key)
+            return None
+        self._files.move_to_end(key)
+        return pixels
+
+    def _write(self, key: str, pixels: np.ndarray):
+        if not self.directory or pixels.nbytes > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                np.save(f, pixels)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            return
+        if key in self._files:
+            self._size -= self._files.pop(key)
+        self._files[key] = os.path.getsize(path)
+        self._size += self._files[key]
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used files until the disk cache fits in max_bytes"""
+        while self._size > self.max_bytes and self._files:
+            key, size = self._files.popitem(last=False)
+            self._size -= size
+            try:
+                os.unlink(self._path(key))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Forget every prepared image, in memory and on disk"""
+        with self._lock:
+            self._memory.clear()
+            for key in list(self._files):
+                try:
+                    os.unlink(self._path(key))
+                except FileNotFoundError:
+                    pass
+            self._files.clear()
+            self._size = 0
+
+
+_image_cache: Optional[ImageCache] = None
+
+
+def image_cache() -> ImageCache:
+    """The shared cache used by load_image, created on first use"""
+    global _image_cache
+    if _image_cache is None:
+        _image_cache = ImageCache()
+    return _image_cache
+
+
+def set_image_cache(cache: Optional[ImageCache]):
+    """Replace the shared cache, e.g. ImageCache(None) for memory only"""
+    global _image_cache
+    _image_cache = cache
+
+
+def load_image(path: str, size: Tuple[int, int], mode: str = "RGB") -> np.ndarray:
+    """Decode an image and resize it to size (width, height)
+
+    Returns a read-only uint8 array of shape (height, width, 3) for RGB or
+    (height, width) for greyscale ("L"). Results come from the shared
+    image cache when the same file was prepared at this size before.
+    """
+    return image_cache().load(path, size, mode)
+
+
+def image_size(path: str) -> Tuple[int, int]:
+    """Return an image's (width, height) without decoding its pixels"""
+    return image_cache().image_size(path)
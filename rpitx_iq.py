@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import math
+import itertools
+from typing import Iterator, Iterable, Optional
+
+import numpy as np
+
+SAMPLE_RATE = 48000  # sendiq sample rate in Hz
+CHUNK_SIZE = 8192  # samples per streamed chunk
+FM_DEVIATION = 2500.0  # peak deviation in Hz for narrowband FM
+AM_DEPTH = 0.8  # modulation index for AM
+
+# Bytes per complex sample for each sendiq -t type
+BYTES_PER_SAMPLE = {"float": 8, "i16": 4, "u8": 2}
+# Interleaved I/Q element type for each sendiq -t type
+SAMPLE_DTYPES = {"float": np.float32, "i16": np.int16, "u8": np.uint8}
+
+TWO_PI = 2.0 * math.pi
+
+
+class PhaseAccumulator:
+    """Oscillator phase carried across chunk boundaries"""
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, phase: float = 0.0):
+        self.sample_rate = sample_rate
+        self.phase = phase
+        self._ramp = np.arange(0, dtype=np.float64)
+
+    def ramp(self, freq: float, n: int) -> np.ndarray:
+        """Return n phases of a constant frequency and advance the oscillator"""
+        if len(self._ramp) < n:
+            self._ramp = np.arange(n, dtype=np.float64)
+        step = TWO_PI * freq / self.sample_rate
+        phases = self._ramp[:n] * step
+        phases += self.phase
+        self.phase = (self.phase + step * n) % TWO_PI
+        return phases
+
+    def advance(self, freqs: np.ndarray) -> np.ndarray:
+        """Return phases for a per-sample frequency array and advance the oscillator"""
+        steps = np.asarray(freqs, dtype=np.float64) * (TWO_PI / self.sample_rate)
+        phases = np.cumsum(steps)
+        # Phase of sample k is the sum of the steps before it
+        phases -= steps
+        phases += self.phase
+        if len(steps):
+            self.phase = float(phases[-1] + steps[-1]) % TWO_PI
+        return phases
+
+
+def expj(phases: np.ndarray, amplitude: float = 1.0, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Return amplitude * exp(j*phases) as complex64"""
+    if out is None:
+        out = np.empty(len(phases), dtype=np.complex64)
+    np.cos(phases, out=out.real)
+    np.sin(phases, out=out.imag)
+    if amplitude != 1.0:
+        out *= amplitude
+    return out
+
+
+def modulate_tone(audio_phases: np.ndarray, modulation: str, amplitude: float = 1.0,
+                  tone_freq: float = 1000.0) -> np.ndarray:
+    """Modulate a sinusoidal audio tone, given its phases, onto the carrier"""
+    mod = modulation.upper()
+    if mod == "FM":
+        beta = FM_DEVIATION / max(abs(tone_freq), 1.0)
+        return expj(beta * np.sin(audio_phases), amplitude)
+    if mod == "AM":
+        iq = np.zeros(len(audio_phases), dtype=np.complex64)
+        np.cos(audio_phases, out=iq.real)
+        iq.real *= AM_DEPTH
+        iq.real += 1.0
+        iq.real *= amplitude / (1.0 + AM_DEPTH)
+        return iq
+    if mod == "USB":
+        return expj(audio_phases, amplitude)
+    if mod == "LSB":
+        return expj(-audio_phases, amplitude)
+    raise Exception(f"Unsupported modulation: {modulation}")
+
+
+def encode_samples(chunk: np.ndarray, iq_type: str, out: Optional[np.ndarray] = None,
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """Convert complex64 IQ to interleaved sendiq samples of the given -t type
+
+    Chunks already in the target element type (e.g. int16 replayed from the
+    render cache) are copied through unchanged. With rng, integer formats
+    get triangular (TPDF) dither of one step before rounding.
+    """
+    dtype = SAMPLE_DTYPES[iq_type]
+    if chunk.dtype == dtype:
+        values = chunk.ravel()
+        if out is None:
+            return values
+        out[:len(values)] = values
+        return out[:len(values)]
+    interleaved = np.ascontiguousarray(chunk, dtype=np.complex64).view(np.float32)
+    if out is None:
+        out = np.empty(len(interleaved), dtype=dtype)
+    out = out[:len(interleaved)]
+    if iq_type == "float":
+        out[:] = interleaved
+        return out
+    if iq_type == "i16":
+        scaled = interleaved * np.float32(32767.0)
+        low, high = -32768, 32767
+    else:  # u8 is offset binary around 127.5
+        scaled = interleaved * np.float32(127.5) + np.float32(127.5)
+        low, high = 0, 255
+    if rng is not None:
+        scaled += rng.random(len(scaled), dtype=np.float32) - rng.random(len(scaled), dtype=np.float32)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, low, high, out=scaled)
+    out[:] = scaled
+    return out
+
+
+def tone_chunks(duration: float, tone_freq: float, modulation: str = "FM",
+                amplitude: float = 1.0, sample_rate: int = SAMPLE_RATE,
+                chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Yield complex64 IQ chunks of a modulated tone
+
+    Only one chunk is alive at a time, so memory use does not depend on
+    duration.
+    """
+    remaining = int(round(duration * sample_rate))
+    osc = PhaseAccumulator(sample_rate)
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        yield modulate_tone(osc.ramp(tone_freq, n), modulation, amplitude, tone_freq)
+        remaining -= n
+
+
+def iter_chunks(samples: np.ndarray, chunk_size: int = CHUNK_SIZE) -> Iterator[np.ndarray]:
+    """Yield successive views of a rendered IQ array"""
+    for start in range(0, len(samples), chunk_size):
+        yield samples[start:start + chunk_size]
+
+
+def prefetch_chunks(chunks: Iterable[np.ndarray], count: int) -> Iterator[np.ndarray]:
+    """Render the first count chunks now and return an iterator over the whole stream"""
+    chunks = iter(chunks)
+    head = list(itertools.islice(chunks, count))
+    return itertools.chain(head, chunks)
+
+
+def write_chunks(stream, chunks: Iterable[np.ndarray]) -> int:
+    """Write IQ chunks to a binary stream without copying, return bytes written"""
+    written = 0
+    for chunk in chunks:
+        chunk = np.ascontiguousarray(chunk)
+        stream.write(memoryview(chunk.view(np.uint8)))
+        written += chunk.nbytes
+    return written
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+import os
+import json
+import time
+import bisect
+import threading
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Phases timed for every transmission, in seconds:
+#   plan          resolving the mode and prefetching chunks (RpiTX.plan)
+#   spawn         starting the rpitx tool process
+#   render        time spent waiting on the renderer for samples
+#   first_sample  from execute() until the first chunk is accepted by the tool
+#   transmit      from the tool starting until its input is fully written
+#   teardown      from closing the tool's input until it exits
+#   total         from execute() until the tool has exited
+PHASES = ("plan", "spawn", "render", "first_sample", "transmit", "teardown", "total")
+
+# Histogram upper bounds in seconds (Prometheus "le" labels)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+           1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+METRIC_PREFIX = "khanfar_tx"
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le label, count of observations <= le) for every bucket"""
+        bounds = [f"{b:g}" for b in self.buckets] + ["+Inf"]
+        return list(zip(bounds, np.cumsum(self.counts).tolist()))
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile"""
+        if not self.count:
+            return None
+        index = int(np.searchsorted(np.cumsum(self.counts), q * self.count))
+        return self.buckets[index] if index < len(self.buckets) else float("inf")
+
+
+def timed_chunks(chunks: Iterable[np.ndarray], timings: Dict[str, float]) -> Iterator[np.ndarray]:
+    """Pass chunks through, adding the time spent producing them to timings["render"]"""
+    timings.setdefault("render", 0.0)
+    chunks = iter(chunks)
+    while True:
+        start = time.monotonic()
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            timings["render"] += time.monotonic() - start
+            return
+        timings["render"] += time.monotonic() - start
+        yield chunk
+
+
+class TransmissionMetrics:
+    """Per-mode, per-phase latency histograms with optional file exports
+
+    Every finished transmission is passed to record(), which updates the
+    histograms, appends one JSON line to jsonl_path, rewrites the
+    Prometheus text file at prometheus_path (for node_exporter's textfile
+    collector) and calls each hook with the record.
+    """
+
+    def __init__(self, prometheus_path: Optional[str] = None, jsonl_path: Optional[str] = None):
+        self.prometheus_path = prometheus_path
+        self.jsonl_path = jsonl_path
+        self.hooks: List[Callable[[dict], None]] = []
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        self.outcomes: Dict[Tuple[str, str], int] = {}
+        self.stream_counts: Dict[Tuple[str, str], int] = {}  # (mode, underruns|overruns) totals
+        self.tool_cpu: Dict[str, float] = {}  # mode -> CPU seconds used by its rpitx tool
+        self._lock = threading.Lock()
+
+    def record(self, plan, status: str = "ok", error: str = "") -> dict:
+        """Record the timings of a finished (or failed) transmission plan"""
+        record = {
+            "time": time.time(),
+            "mode": plan.mode,
+            "tool": plan.tool,
+            "frequency": plan.config.frequency,
+            "status": status,
+            "timings": {phase: plan.timings[phase] for phase in PHASES if phase in plan.timings},
+        }
+        if plan.stream_stats:
+            record["stream"] = dict(plan.stream_stats)
+        if plan.resources:
+            record["resources"] = dict(plan.resources)
+        if plan.analyzer is not None and plan.analyzer.segments:
+            record["occupancy"] = plan.analyzer.report().as_dict()
+        if error:
+            record["error"] = error
+        with self._lock:
+            for phase, seconds in record["timings"].items():
+                key = (plan.mode, phase)
+                if key not in self.histograms:
+                    self.histograms[key] = Histogram()
+                self.histograms[key].observe(seconds)
+            outcome = (plan.mode, status)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+            for counter in ("underruns", "overruns"):
+                key = (plan.mode, counter)
+                self.stream_counts[key] = self.stream_counts.get(key, 0) + plan.stream_stats.get(counter, 0)
+            if plan.resources:
+                self.tool_cpu[plan.mode] = self.tool_cpu.get(plan.mode, 0.0) + plan.resources["cpu_s"]
+            if self.jsonl_path:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(json.dumps(record) + "\n")
+            if self.prometheus_path:
+                self.write_prometheus(self.prometheus_path)
+        for hook in self.hooks:
+            hook(record)
+        return record
+
+    def prometheus(self) -> str:
+        """Render every histogram in the Prometheus text exposition format"""
+        name = f"{METRIC_PREFIX}_phase_seconds"
+        lines = [f"# HELP {name} Time spent in each phase of a transmission.",
+                 f"# TYPE {name} histogram"]
+        for (mode, phase), histogram in sorted(self.histograms.items()):
+            labels = f'mode="{mode}",phase="{phase}"'
+            for le, count in histogram.cumulative():
+                lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        name = f"{METRIC_PREFIX}_transmissions_total"
+        lines += [f"# HELP {name} Transmissions by mode and outcome.",
+                  f"# TYPE {name} counter"]
+        for (mode, status), count in sorted(self.outcomes.items()):
+            lines.append(f'{name}{{mode="{mode}",status="{status}"}} {count}')
+        for counter, text in (("underruns", "Times the sample writer waited on the renderer mid-stream."),
+                              ("overruns", "Times the renderer waited for room in the sample ring.")):
+            name = f"{METRIC_PREFIX}_{counter}_total"
+            lines += [f"# HELP {name} {text}", f"# TYPE {name} counter"]
+            for (mode, kind), count in sorted(self.stream_counts.items()):
+                if kind == counter:
+                    lines.append(f'{name}{{mode="{mode}"}} {count}')
+        name = f"{METRIC_PREFIX}_tool_cpu_seconds_total"
+        lines += [f"# HELP {name} CPU time used by the rpitx tools, from wait4.",
+                  f"# TYPE {name} counter"]
+        for mode, seconds in sorted(self.tool_cpu.items()):
+            lines.append(f'{name}{{mode="{mode}"}} {seconds:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Atomically replace path with the current Prometheus text"""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.prometheus())
+        os.replace(tmp_path, path)
+
+    def summary(self) -> Dict[str, Dict[str, dict]]:
+        """Count, mean and approximate p50/p99 per mode and phase"""
+        with self._lock:
+            result: Dict[str, Dict[str, dict]] = {}
+            for (mode, phase), histogram in sorted(self.histograms.items()):
+                result.setdefault(mode, {})[phase] = {
+                    "count": histogram.count,
+                    "mean": histogram.sum / histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99),
+                }
+            return result
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+from functools import lru_cache
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from rpitx_iq import SAMPLE_RATE, PhaseAccumulator, modulate_tone
+
+MORSE_TONE = 700.0  # keyed tone in Hz
+RISE_TIME = 0.005  # raised-cosine rise and fall time in seconds
+
+MORSE_CODE = {
+    "A": ".-", "B": "-...", "C": "-.-.", "D": "-..", "E": ".", "F": "..-.",
+    "G": "--.", "H": "....", "I": "..", "J": ".---", "K": "-.-", "L": ".-..",
+    "M": "--", "N": "-.", "O": "---", "P": ".--.", "Q": "--.-", "R": ".-.",
+    "S": "...", "T": "-", "U": "..-", "V": "...-", "W": ".--", "X": "-..-",
+    "Y": "-.--", "Z": "--..",
+    "0": "-----", "1": ".----", "2": "..---", "3": "...--", "4": "....-",
+    "5": ".....", "6": "-....", "7": "--...", "8": "---..", "9": "----.",
+    ".": ".-.-.-", ",": "--..--", "?": "..--..", "'": ".----.", "!": "-.-.--",
+    "/": "-..-.", "(": "-.--.", ")": "-.--.-", "&": ".-...", ":": "---...",
+    ";": "-.-.-.", "=": "-...-", "+": ".-.-.", "-": "-....-", "_": "..--.-",
+    "\"": ".-..-.", "$": "...-..-", "@": ".--.-.",
+}
+
+
+def dit_seconds(wpm: float) -> float:
+    """Length of one dit at the given speed (PARIS standard)"""
+    return 1.2 / wpm
+
+
+def farnsworth_gaps(wpm: float, farnsworth_wpm: Optional[float]):
+    """Return (character gap, word gap) in seconds
+
+    With Farnsworth timing the characters are sent at wpm but the gaps are
+    stretched so the overall speed is farnsworth_wpm (ARRL formula).
+    """
+    dit = dit_seconds(wpm)
+    if not farnsworth_wpm or farnsworth_wpm >= wpm:
+        return 3 * dit, 7 * dit
+    delay = (60.0 * wpm - 37.2 * farnsworth_wpm) / (farnsworth_wpm * wpm)
+    return 3 * delay / 19, 7 * delay / 19
+
+
+@lru_cache(maxsize=32)
+def _edges(rise_samples: int):
+    """Raised-cosine rise and fall ramps"""
+    ramp = 0.5 - 0.5 * np.cos(np.pi * (np.arange(rise_samples) + 0.5) / rise_samples)
+    return ramp.astype(np.float32), ramp[::-1].astype(np.float32)
+
+
+def element_envelope(seconds: float, sample_rate: int = SAMPLE_RATE,
+                     rise_time: float = RISE_TIME) -> np.ndarray:
+    """Keyed envelope of one dit or dah, shaped to avoid key clicks"""
+    n = int(round(seconds * sample_rate))
+    rise = min(int(round(rise_time * sample_rate)), n // 2)
+    envelope = np.ones(n, dtype=np.float32)
+    if rise:
+        up, down = _edges(rise)
+        envelope[:rise] = up
+        envelope[n - rise:] = down
+    return envelope
+
+
+class MorseKeyer:
+    """Renders text to keyed IQ from cached per-character waveforms"""
+
+    def __init__(self, wpm: float = 20, tone_freq: float = MORSE_TONE,
+                 sample_rate: int = SAMPLE_RATE, modulation: str = "USB",
+                 amplitude: float = 1.0, farnsworth_wpm: Optional[float] = None):
+        self.wpm = wpm
+        self.sample_rate = sample_rate
+        self.characters = _character_table(wpm, tone_freq, sample_rate, modulation.upper(), amplitude)
+        char_gap, word_gap = farnsworth_gaps(wpm, farnsworth_wpm)
+        self.char_gap = _silence(int(round(char_gap * sample_rate)))
+        self.word_gap = _silence(int(round(word_gap * sample_rate)))
+
+    def waveform(self, char: str) -> Optional[np.ndarray]:
+        """Keyed waveform of one character, built on first use"""
+        wave = self.characters.get(char)
+        if wave is None and char in MORSE_CODE:
+            wave = self.characters.build(char)
+        return wave
+
+    def buffers(self, text: str) -> Iterator[np.ndarray]:
+        """Yield the character and gap buffers that make up text, in order"""
+        first = True
+        for word in text.upper().split():
+            waves = [w for w in map(self.waveform, word) if w is not None]
+            if not waves:
+                continue
+            if not first:
+                yield self.word_gap
+            first = False
+            for i, wave in enumerate(waves):
+                if i:
+                    yield self.char_gap
+                yield wave
+
+    def render(self, text: str) -> np.ndarray:
+        """Render text to one complex64 array"""
+        buffers: List[np.ndarray] = list(self.buffers(text))
+        if not buffers:
+            return np.zeros(0, dtype=np.complex64)
+        return np.concatenate(buffers)
+
+
+class _CharacterTable(Dict[str, np.ndarray]):
+    """Per-character waveforms for one (wpm, tone, sample rate, modulation, amplitude)"""
+
+    def __init__(self, wpm, tone_freq, sample_rate, modulation, amplitude):
+        super().__init__()
+        self.tone_freq = tone_freq
+        self.sample_rate = sample_rate
+        self.modulation = modulation
+        self.amplitude = amplitude
+        dit = dit_seconds(wpm)
+        self.dit = element_envelope(dit, sample_rate)
+        self.dah = element_envelope(3 * dit, sample_rate)
+        self.space = np.zeros(len(self.dit), dtype=np.float32)
+
+    def build(self, char: str) -> np.ndarray:
+        parts = []
+        for i, symbol in enumerate(MORSE_CODE[char]):
+            if i:
+                parts.append(self.space)
+            parts.append(self.dit if symbol == "." else self.dah)
+        envelope = np.concatenate(parts)
+        osc = PhaseAccumulator(self.sample_rate)
+        wave = modulate_tone(osc.ramp(self.tone_freq, len(envelope)), self.modulation,
+                             self.amplitude, self.tone_freq)
+        wave *= envelope
+        wave.setflags(write=False)
+        self[char] = wave
+        return wave
+
+
+@lru_cache(maxsize=16)
+def _character_table(wpm, tone_freq, sample_rate, modulation, amplitude) -> _CharacterTable:
+    return _CharacterTable(wpm, tone_freq, sample_rate, modulation, amplitude)
+
+
+@lru_cache(maxsize=64)
+def _silence(n: int) -> np.ndarray:
+    silence = np.zeros(n, dtype=np.complex64)
+    silence.setflags(write=False)
+    return silence
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+from dataclasses import asdict, dataclass
+from typing import Iterable, Iterator
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from rpitx_export import as_complex
+from rpitx_iq import SAMPLE_RATE
+
+OCCUPANCY_MODES = ("off", "report", "enforce")
+FFT_SIZE = 1024  # Welch segment length (47 Hz bins at 48 kS/s)
+OCCUPIED_FRACTION = 0.99  # occupied bandwidth holds this share of the power (ITU-R SM.328)
+ACP_LIMIT_DB = -30.0  # most power allowed in either adjacent channel, relative to the channel
+MIN_SEGMENTS = 8  # segments averaged before the mask is enforced
+
+
+@dataclass
+class OccupancyReport:
+    """Spectral occupancy of a rendered signal against its channel bandwidth"""
+    bandwidth: float  # allocated channel width in Hz, centred on the carrier
+    occupied_bandwidth: float  # Hz holding OCCUPIED_FRACTION of the power
+    occupied_low: float  # lower and upper edges of the occupied band, Hz from the carrier
+    occupied_high: float
+    peak_offset: float  # Hz from the carrier of the strongest bin
+    peak_dbfs: float  # strongest bin, 0 dB for a full-scale tone
+    acp_lower_db: float  # power in the channel below / above, relative to the channel
+    acp_upper_db: float
+    segments: int
+
+    @property
+    def in_mask(self) -> bool:
+        return (self.occupied_low >= -self.bandwidth / 2 and self.occupied_high <= self.bandwidth / 2
+                and max(self.acp_lower_db, self.acp_upper_db) <= ACP_LIMIT_DB)
+
+    def as_dict(self) -> dict:
+        return dict(asdict(self), in_mask=self.in_mask)
+
+    def describe(self) -> str:
+        return (f"occupied {self.occupied_bandwidth / 1e3:.2f} kHz "
+                f"({self.occupied_low:+.0f} to {self.occupied_high:+.0f} Hz) of "
+                f"{self.bandwidth / 1e3:g} kHz, peak {self.peak_dbfs:.1f} dBFS at "
+                f"{self.peak_offset:+.0f} Hz, ACP {self.acp_lower_db:.1f}/{self.acp_upper_db:.1f} dBc"
+                + ("" if self.in_mask else " - OUT OF MASK"))
+
+
+class OccupancyAnalyzer:
+    """Welch power spectrum accumulated chunk by chunk as a signal is streamed
+
+    Chunks pass through analyze() unchanged while Hann-windowed segments
+    with 50% overlap are transformed in one batched FFT per chunk and their
+    powers summed; leftover samples wait for the next chunk. report() can
+    be called at any point. With enforce, a signal that leaves its channel
+    (occupied band outside it, or adjacent-channel power above
+    ACP_LIMIT_DB) raises, which stops the stream.
+    """
+
+    def __init__(self, bandwidth: float, fft_size: int = FFT_SIZE,
+                 sample_rate: int = SAMPLE_RATE, enforce: bool = False):
+        self.bandwidth = bandwidth
+        self.fft_size = fft_size
+        self.hop = fft_size // 2
+        self.sample_rate = sample_rate
+        self.enforce = enforce
+        self.window = np.hanning(fft_size).astype(np.float32)
+        self.power = np.zeros(fft_size, dtype=np.float64)  # summed |X|^2, FFT bin order
+        self.segments = 0
+        self._pending = np.zeros(0, dtype=np.complex64)
+        freqs = np.fft.fftfreq(fft_size, 1.0 / sample_rate)
+        self.freqs = freqs  # Hz from the carrier of each bin, FFT order
+        half = bandwidth / 2.0
+        self._channel = np.abs(freqs) <= half
+        self._lower = (freqs < -half) & (freqs >= -3 * half)
+        self._upper = (freqs > half) & (freqs <= 3 * half)
+        self._order = np.argsort(freqs)
+        self._freqs = freqs[self._order]
+
+    def update(self, chunk: np.ndarray):
+        """Add a chunk's complete segments to the spectrum"""
+        data = as_complex(chunk)
+        if len(self._pending):
+            data = np.concatenate((self._pending, data))
+        count = (len(data) - self.fft_size) // self.hop + 1 if len(data) >= self.fft_size else 0
+        if count:
+            # Overlapping segments as a view (NumPy 1.19 has no sliding_window_view)
+            step = data.strides[0]
+            frames = as_strided(data, shape=(count, self.fft_size),
+                                strides=(self.hop * step, step), writeable=False)
+            spectra = np.fft.fft(frames * self.window, axis=1)
+            self.power += np.einsum("ij,ij->j", spectra.real, spectra.real)
+            self.power += np.einsum("ij,ij->j", spectra.imag, spectra.imag)
+            self.segments += count
+        self._pending = data[count * self.hop:].copy()
+        if self.enforce and self.segments >= MIN_SEGMENTS:
+            report = self.report()
+            if not report.in_mask:
+                raise Exception(f"Signal is outside its {self.bandwidth / 1e3:g} kHz channel: "
+                                f"{report.describe()}")
+
+    def analyze(self, chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+        """Pass chunks through, analysing each on the way"""
+        for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+
+    def report(self) -> OccupancyReport:
+        """Occupancy of everything analysed so far"""
+        power = self.power
+        channel = power[self._channel].sum()
+        total = power.sum()
+        if not total:
+            edges = (0.0, 0.0)
+        else:
+            cdf = np.cumsum(power[self._order]) / total
+            tail = (1.0 - OCCUPIED_FRACTION) / 2.0
+            edges = (float(self._freqs[np.searchsorted(cdf, tail)]),
+                     float(self._freqs[min(np.searchsorted(cdf, 1.0 - tail), self.fft_size - 1)]))
+        peak = int(np.argmax(power))
+        full_scale = max(self.segments, 1) * float(self.window.sum()) ** 2
+        return OccupancyReport(
+            bandwidth=self.bandwidth,
+            occupied_bandwidth=edges[1] - edges[0] + (self.sample_rate / self.fft_size if total else 0.0),
+            occupied_low=edges[0],
+            occupied_high=edges[1],
+            peak_offset=float(self.freqs[peak]),
+            peak_dbfs=_db(power[peak], full_scale),
+            acp_lower_db=_db(power[self._lower].sum(), channel),
+            acp_upper_db=_db(power[self._upper].sum(), channel),
+            segments=self.segments,
+        )
+
+
+def _db(power: float, reference: float) -> float:
+    """power / reference in dB, infinite when either is zero"""
+    if not power:
+        return -np.inf
+    if not reference:
+        return np.inf
+    return float(10.0 * np.log10(power / reference))
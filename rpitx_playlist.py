@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+import json
+import time
+import inspect
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+from rpitx_chirp import RpiTX, RadioConfig, TransmissionPlan
+from rpitx_metrics import timed_chunks
+
+try:
+    import yaml
+except ImportError:  # YAML playlists are optional
+    yaml = None
+
+PREFETCH_CHUNKS = 4  # chunks rendered ahead for the next item
+
+# Item keys that set the radio config rather than mode parameters
+CONFIG_KEYS = ("frequency", "modulation", "power", "bandwidth", "name")
+
+
+@dataclass
+class PlaylistItem:
+    mode: str
+    params: dict
+    config: RadioConfig
+
+    def describe(self) -> str:
+        return f"{self.mode} at {self.config.frequency / 1e6:.3f}MHz"
+
+
+def parse_item(entry: dict, defaults: Optional[RadioConfig]) -> PlaylistItem:
+    """Build a PlaylistItem from one playlist entry
+
+    Entries look like {"mode": "tone", "frequency": 145.5, "duration": 2,
+    "tone_freq": 1000}: frequency is in MHz as on the command line, the
+    other config keys override the defaults, and everything else is passed
+    to the mode's transmit_* method. A config key that is also a parameter
+    of that method (bandwidth for chirp) is given to both.
+    """
+    entry = dict(entry)
+    mode = entry.pop("mode", None)
+    if not mode:
+        raise Exception(f"Playlist entry has no mode: {entry}")
+    transmit = getattr(RpiTX, f"transmit_{mode}", None)
+    if transmit is None:
+        raise Exception(f"Unknown transmission mode: {mode}")
+    accepted = inspect.signature(transmit).parameters
+    overrides = {k: entry[k] if k in accepted else entry.pop(k) for k in CONFIG_KEYS if k in entry}
+    if "frequency" in overrides:
+        overrides["frequency"] = int(float(overrides["frequency"]) * 1e6)
+    if defaults is None:
+        if "frequency" not in overrides:
+            raise Exception(f"Playlist entry has no frequency: {mode}")
+        defaults = RadioConfig(frequency=0, modulation="FM", power=1.0, bandwidth=12500,
+                               name="Playlist Transmission")
+    return PlaylistItem(mode, entry, replace(defaults, **overrides))
+
+
+def load_playlist(path: str, defaults: Optional[RadioConfig] = None) -> List[PlaylistItem]:
+    """Load a playlist from a YAML list or a JSON-lines file"""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise Exception("YAML playlists need PyYAML (pip3 install pyyaml)")
+            entries = yaml.safe_load(f) or []
+        else:
+            entries = [json.loads(line) for line in f
+                       if line.strip() and not line.lstrip().startswith("#")]
+    return [parse_item(entry, defaults) for entry in entries]
+
+
+def _streamed(plan: TransmissionPlan) -> Iterator[np.ndarray]:
+    """A joined item's chunks, timed as though it were a transmission of its own"""
+    plan.started = time.monotonic()
+    try:
+        yield from timed_chunks(plan.chunks, plan.timings)
+    finally:
+        plan.finished = time.monotonic()
+        plan.timings["transmit"] = plan.timings["total"] = plan.finished - plan.started
+        plan.close()
+
+
+def _close_planned(future: Future):
+    """Free a planned item that will not be transmitted"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class PlaylistPlayer:
+    """Plays playlist items back to back
+
+    The next item is planned and its first chunks rendered on a worker
+    thread while the current one is on air. Consecutive IQ items that would
+    start an identical sendiq command are joined into the running stream, so
+    there is no gap at all between them; otherwise the gap is one process
+    spawn. Joined items still get their own metrics record (timings and
+    occupancy) once the stream ends. An item that fails to plan is raised
+    after the item on air has finished, never in the middle of it.
+    """
+
+    def __init__(self, radio: RpiTX, prefetch: int = PREFETCH_CHUNKS):
+        self.radio = radio
+        self.prefetch = prefetch
+        self.gaps: List[float] = []  # seconds between consecutive items, 0.0 when joined
+        self._planned = -1  # highest item index planned so far
+        self._planning = threading.Lock()
+
+    def _plan(self, index: int, items: List[PlaylistItem]) -> TransmissionPlan:
+        with self._planning:
+            self._planned = max(self._planned, index)
+        item = items[index]
+        return self.radio.plan(item.mode, item.config, self.prefetch, **item.params)
+
+    def _prerender(self, items: List[PlaylistItem]):
+        """Hand items not yet planned to the radio's render pool, in order"""
+        for index, item in enumerate(items):
+            self.radio.render_pool.wait_for_room()
+            # Submit under the lock so an item is either pooled before it is
+            # planned or skipped because planning already started
+            with self._planning:
+                if index > self._planned:
+                    try:
+                        self.radio.prerender(item.mode, item.config, **item.params)
+                    except Exception:
+                        pass  # planning the item reports the error when it is reached
+
+    def play(self, items: List[PlaylistItem],
+             on_item: Optional[Callable[[int, PlaylistItem], None]] = None):
+        """Transmit every item in order, calling on_item(index, item) as each starts"""
+        self.gaps = []
+        if not items:
+            return
+        self._planned = 0
+        if self.radio.render_pool is not None:
+            threading.Thread(target=self._prerender, args=(items,), daemon=True).start()
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pending = [pool.submit(self._plan, 0, items), 0]
+            previous: Optional[TransmissionPlan] = None
+
+            def advance():
+                index = pending[1] + 1
+                pending[:] = [pool.submit(self._plan, index, items) if index < len(items) else None,
+                              index]
+
+            def joined(plan: TransmissionPlan, chunks: Iterator[np.ndarray],
+                       merged: List[TransmissionPlan]) -> Iterator[np.ndarray]:
+                # Keep pulling later items into this stream while they match it
+                while True:
+                    yield from chunks
+                    future = pending[0]
+                    if future is None:
+                        return
+                    try:
+                        upcoming = future.result()
+                    except Exception:
+                        return  # raised by the loop below once this stream has ended
+                    if upcoming.chunks is None or upcoming.command != plan.command or upcoming.align:
+                        return  # a slotted item (FT8) needs its own start
+                    merged.append(upcoming)
+                    chunks = _streamed(upcoming)
+                    advance()
+                    self.gaps.append(0.0)
+                    if on_item:
+                        on_item(pending[1] - 1, items[pending[1] - 1])
+
+            try:
+                while pending[0] is not None:
+                    plan = pending[0].result()
+                    index = pending[1]
+                    advance()
+                    merged: List[TransmissionPlan] = []
+                    if plan.chunks is not None:
+                        plan.chunks = joined(plan, plan.chunks, merged)
+                    if on_item:
+                        on_item(index, items[index])
+                    slot = len(self.gaps)
+                    if previous is not None:
+                        self.gaps.append(0.0)
+                    try:
+                        self.radio.execute(plan)
+                    except Exception as e:
+                        for item in merged:
+                            self.radio.metrics.record(item, "error", str(e))
+                        raise
+                    for item in merged:
+                        self.radio.metrics.record(item)
+                    if previous is not None:
+                        self.gaps[slot] = plan.started - previous.finished
+                    previous = plan
+            finally:
+                if pending[0] is not None:
+                    pending[0].add_done_callback(_close_planned)
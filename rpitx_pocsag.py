@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import csv
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from rpitx_iq import SAMPLE_RATE
+from rpitx_rtty import fsk_bandwidth, fsk_modulate
+
+POCSAG_DEVIATION = 4500.0  # Hz either side of the carrier
+POCSAG_BT = 0.5  # Gaussian premodulation filter, keeps 1200 bps inside a 12.5 kHz channel
+POCSAG_BITRATES = (512, 1200, 2400)
+DEFAULT_CAPCODE = 1234
+FUNCTION_NUMERIC = 0
+FUNCTION_ALPHA = 3
+
+PREAMBLE_BITS = 576
+SYNC_CODEWORD = 0x7CD215D8
+IDLE_CODEWORD = 0x7A89C197
+BATCH_CODEWORDS = 16  # 8 frames of 2 codewords after each sync
+BCH_GENERATOR = 0x769  # x^10 + x^9 + x^8 + x^6 + x^5 + x^3 + 1
+EOT = 0x04
+
+NUMERIC_CODES = {c: i for i, c in enumerate("0123456789*U -)(")}
+
+
+@dataclass
+class Page:
+    capcode: int
+    message: str
+    function: int = FUNCTION_ALPHA
+
+    @property
+    def frame(self) -> int:
+        return self.capcode & 7
+
+
+PageLike = Union[Page, Sequence]
+
+
+def _remainder(value: int) -> int:
+    """Remainder of value (a 31-bit polynomial) divided by the BCH generator"""
+    for bit in range(30, 9, -1):
+        if value & (1 << bit):
+            value ^= BCH_GENERATOR << (bit - 10)
+    return value
+
+
+# BCH is linear, so the parity of 21 data bits is the XOR of two table lookups
+_BCH_HIGH = np.array([_remainder(h << 20) for h in range(1 << 11)], dtype=np.uint32)
+_BCH_LOW = np.array([_remainder(l << 10) for l in range(1 << 10)], dtype=np.uint32)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def bch_encode(data: np.ndarray) -> np.ndarray:
+    """Turn 21-bit payloads into 32-bit codewords with BCH(31,21) and even parity"""
+    data = np.asarray(data, dtype=np.uint32)
+    words = (data << 11) | ((_BCH_HIGH[data >> 10] ^ _BCH_LOW[data & 0x3FF]) << 1)
+    ones = _POPCOUNT[words.view(np.uint8)].reshape(-1, 4).sum(axis=1)
+    return words | (ones & 1).astype(np.uint32)
+
+
+def _pack_bits(bits: np.ndarray) -> np.ndarray:
+    """Pack a bit stream into 20-bit message payloads, first bit most significant"""
+    padded = np.zeros(-(-len(bits) // 20) * 20, dtype=np.uint32)
+    padded[:len(bits)] = bits
+    weights = (1 << np.arange(19, -1, -1)).astype(np.uint32)
+    return padded.reshape(-1, 20) @ weights
+
+
+def message_payloads(page: Page) -> np.ndarray:
+    """20-bit message payloads for a page: BCD for numeric, 7-bit ASCII otherwise"""
+    if page.function == FUNCTION_NUMERIC:
+        codes = np.array([NUMERIC_CODES.get(c, NUMERIC_CODES[" "]) for c in page.message.upper()],
+                         dtype=np.uint32)
+        width = 4
+        pad = NUMERIC_CODES[" "]
+    else:
+        codes = np.frombuffer((page.message + chr(EOT)).encode("ascii", "replace"),
+                              dtype=np.uint8).astype(np.uint32) & 0x7F
+        width = 7
+        pad = 0
+    bits = ((codes[:, None] >> np.arange(width, dtype=np.uint32)) & 1).ravel()
+    if page.function == FUNCTION_NUMERIC and len(bits) % 20:
+        # Numeric pages are padded with spaces rather than zeros
+        fill = -(-len(bits) // 20) * 20 - len(bits)
+        bits = np.concatenate((bits, np.resize((pad >> np.arange(4)) & 1, fill)))
+    return _pack_bits(bits)
+
+
+def as_page(page: PageLike) -> Page:
+    if isinstance(page, Page):
+        return page
+    capcode, function, message = page
+    return Page(int(capcode), str(message), int(function))
+
+
+def encode_pages(pages: Iterable[PageLike]) -> np.ndarray:
+    """Encode pages into one codeword stream of sync-led batches (preamble excluded)
+
+    Pages are sorted by frame slot so each address lands in its own frame
+    with as few idle codewords and batches as possible; every page shares
+    the same preamble.
+    """
+    pages = sorted((as_page(p) for p in pages), key=lambda p: p.frame)
+    payloads: List[int] = []
+    coded: List[bool] = []  # False for idle fill
+    for page in pages:
+        target = 2 * page.frame
+        position = len(payloads) % BATCH_CODEWORDS
+        fill = target - position if position <= target else BATCH_CODEWORDS - position + target
+        payloads.extend([0] * fill)
+        coded.extend([False] * fill)
+        payloads.append(((page.capcode >> 3) << 2) | (page.function & 3))
+        coded.append(True)
+        message = message_payloads(page) | (1 << 20)
+        payloads.extend(message.tolist())
+        coded.extend([True] * len(message))
+    fill = -len(payloads) % BATCH_CODEWORDS or (0 if payloads else BATCH_CODEWORDS)
+    payloads.extend([0] * fill)
+    coded.extend([False] * fill)
+
+    words = np.where(coded, bch_encode(np.array(payloads, dtype=np.uint32)), IDLE_CODEWORD)
+    batches = words.astype(np.uint32).reshape(-1, BATCH_CODEWORDS)
+    sync = np.full((len(batches), 1), SYNC_CODEWORD, dtype=np.uint32)
+    return np.hstack((sync, batches)).ravel()
+
+
+def transmission_bits(codewords: np.ndarray) -> np.ndarray:
+    """Preamble followed by the codewords, most significant bit first"""
+    preamble = np.tile(np.array([1, 0], dtype=np.uint8), PREAMBLE_BITS // 2)
+    bits = ((codewords[:, None] >> np.arange(31, -1, -1, dtype=np.uint32)) & 1).astype(np.uint8)
+    return np.concatenate((preamble, bits.ravel()))
+
+
+def render_pocsag(pages: Iterable[PageLike], bitrate: int = 1200, amplitude: float = 1.0,
+                  sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """Render pages as one GFSK POCSAG transmission (binary 1 is the low tone)"""
+    if bitrate not in POCSAG_BITRATES:
+        raise Exception(f"Unsupported POCSAG bitrate: {bitrate}")
+    bits = transmission_bits(encode_pages(pages))
+    return fsk_modulate(bits, np.ones(len(bits)), bitrate, shift=2 * POCSAG_DEVIATION,
+                        reverse=True, amplitude=amplitude, sample_rate=sample_rate, bt=POCSAG_BT)
+
+
+def pocsag_bandwidth(bitrate: int = 1200) -> float:
+    """Occupied bandwidth of a POCSAG transmission in Hz"""
+    return fsk_bandwidth(bitrate, 2 * POCSAG_DEVIATION)
+
+
+def load_pages_csv(path: str) -> List[Page]:
+    """Read capcode,function,message rows (a header row is skipped)"""
+    pages = []
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().lower() == "capcode":
+                continue
+            if len(row) < 3:
+                raise Exception(f"Bad POCSAG row, expected capcode,function,message: {row}")
+            capcode, function, message = row[0], row[1], ",".join(row[2:])
+            pages.append(Page(int(capcode), message, int(function)))
+    return pages
+
+
+def encode_rate(pages: List[PageLike]) -> Tuple[float, int]:
+    """Encode pages once and return (pages per second, codewords)"""
+    start = time.perf_counter()
+    codewords = encode_pages(pages)
+    return len(pages) / max(time.perf_counter() - start, 1e-9), len(codewords)
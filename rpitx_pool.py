@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+import os
+import json
+import signal
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:  # Python 3.7: only needed for render workers
+    resource_tracker = shared_memory = None
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from rpitx_iq import CHUNK_SIZE
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # rendered IQ held in shared memory at once
+DEFAULT_MAX_PENDING = 4  # jobs submitted and not yet transmitted
+BYTES_PER_SAMPLE = np.dtype(np.complex64).itemsize
+
+_worker_radio = None
+
+
+def _init_worker(radio_class, radio_settings: dict):
+    global _worker_radio
+    # Forked workers must not run the daemon's SIGTERM handler
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    _worker_radio = radio_class(**radio_settings)
+
+
+def _render_job(mode: str, config, params: dict, max_bytes: int) -> Optional[Tuple[str, int]]:
+    """Render a whole job in a worker and leave it in a new shared memory block
+
+    Returns (block name, samples), or None when the render would be larger
+    than max_bytes and should be streamed by the transmitting process instead.
+    """
+    chunks = []
+    total = 0
+    for chunk in getattr(_worker_radio, f"_render_{mode}")(config, **params):
+        chunks.append(np.asarray(chunk, dtype=np.complex64))
+        total += len(chunk)
+        if total * BYTES_PER_SAMPLE > max_bytes:
+            return None
+    if not total:
+        return "", 0
+    block = shared_memory.SharedMemory(create=True, size=total * BYTES_PER_SAMPLE)
+    samples = np.ndarray((total,), dtype=np.complex64, buffer=block.buf)
+    position = 0
+    for chunk in chunks:
+        samples[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    del samples
+    block.close()
+    return block.name, total
+
+
+class PooledChunks:
+    """Chunks of a claimed render, streamed from shared memory as they are iterated
+
+    close() frees the claim's pending slot and shared memory block whether
+    or not the chunks were consumed, so a transmission that fails before
+    (or while) streaming cannot leak them. Closing twice is harmless.
+    """
+
+    def __init__(self, pool: "RenderPool", future: Future, fallback):
+        self._pool = pool
+        self._future = future
+        self._chunks = pool._stream(future, fallback)
+        self._started = False
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> "PooledChunks":
+        return self
+
+    def __next__(self) -> np.ndarray:
+        with self._lock:
+            if self._closed and not self._started:
+                raise StopIteration
+            self._started = True
+        return next(self._chunks)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            started = self._started
+        if not started:
+            self._pool._discard(self._future)
+        elif not self._chunks.gi_running:
+            # Runs _stream's cleanup; a generator busy on another thread
+            # runs it itself when it is finished or collected
+            self._chunks.close()
+
+
+class RenderPool:
+    """Renders queued jobs on every core while the transmitter is busy
+
+    submit() hands a job to a worker process, which renders it completely
+    into shared memory; only the block's name and length come back through
+    the pool. RpiTX.plan() claims a matching result with take() and streams
+    it from the block chunk by chunk. submit() blocks while max_pending jobs
+    are outstanding or max_bytes of rendered IQ is waiting to be sent.
+    Workers build their radio from radio_settings (see
+    RpiTX.render_settings()), so they render as the transmitting radio would.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_pending: int = DEFAULT_MAX_PENDING, radio_class=None,
+                 radio_settings: Optional[dict] = None):
+        if shared_memory is None:
+            raise Exception("Render workers need Python 3.8 or higher (multiprocessing.shared_memory)")
+        if radio_class is None:
+            from rpitx_chirp import RpiTX
+            radio_class = RpiTX
+        # Start the tracker before forking so workers and this process share it
+        resource_tracker.ensure_running()
+        self.workers = workers or os.cpu_count() or 1
+        self.max_bytes = max_bytes
+        self.max_pending = max_pending
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(radio_class, radio_settings or {}))
+        self.held_bytes = 0  # rendered and waiting in shared memory
+        self.pending = 0  # submitted and not yet streamed or released
+        self._jobs: Dict[str, deque] = {}
+        self._changed = threading.Condition()
+
+    @staticmethod
+    def key(mode: str, params: dict, config) -> str:
+        return json.dumps({"mode": mode, "params": params, "config": asdict(config)},
+                          sort_keys=True, default=str)
+
+    def _has_room(self) -> bool:
+        return self.pending < self.max_pending and self.held_bytes < self.max_bytes
+
+    def wait_for_room(self):
+        """Block until submit() would not have to wait"""
+        with self._changed:
+            self._changed.wait_for(self._has_room)
+
+    def submit(self, mode: str, config, params: dict) -> Future:
+        """Start rendering a job, waiting first if the pool is at its limits"""
+        with self._changed:
+            self._changed.wait_for(self._has_room)
+            self.pending += 1
+            future = self.executor.submit(_render_job, mode, config, params, self.max_bytes)
+            future.add_done_callback(self._rendered)
+            self._jobs.setdefault(self.key(mode, params, config), deque()).append(future)
+            return future
+
+    def _rendered(self, future: Future):
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            return
+        with self._changed:
+            self.held_bytes += future.result()[1] * BYTES_PER_SAMPLE
+
+    def take(self, mode: str, params: dict, config,
+             fallback: Callable[[], Iterable[np.ndarray]]) -> Optional[PooledChunks]:
+        """Claim the oldest submitted render of this job, or None if there is none
+
+        The returned chunks wait for the worker when first iterated; fallback
+        renders in-process when the job was too large for shared memory.
+        The caller must close() them if they may not be streamed to the end.
+        """
+        with self._changed:
+            futures = self._jobs.get(self.key(mode, params, config))
+            if not futures:
+                return None
+            future = futures.popleft()
+            if not futures:
+                del self._jobs[self.key(mode, params, config)]
+        return PooledChunks(self, future, fallback)
+
+    def _stream(self, future: Future, fallback) -> Iterator[np.ndarray]:
+        size = 0
+        try:
+            result = future.result()
+            if result is None:
+                yield from fallback()
+                return
+            name, samples = result
+            size = samples * BYTES_PER_SAMPLE
+            if not samples:
+                return
+            block = shared_memory.SharedMemory(name=name)
+            view = np.ndarray((samples,), dtype=np.complex64, buffer=block.buf)
+            try:
+                for start in range(0, samples, CHUNK_SIZE):
+                    # Copy each chunk out so the block can be unmapped while
+                    # the consumer still holds the last one
+                    yield view[start:start + CHUNK_SIZE].copy()
+            finally:
+                view = None
+                block.close()
+                block.unlink()
+        finally:
+            self._release(size)
+
+    def _discard(self, future: Future):
+        """Give up a render that will never be streamed, freeing it once the worker is done"""
+        future.cancel()
+        future.add_done_callback(self._free)
+
+    def _free(self, future: Future):
+        size = 0
+        if not future.cancelled() and future.exception() is None and future.result():
+            name, samples = future.result()
+            size = samples * BYTES_PER_SAMPLE
+            if samples:
+                block = shared_memory.SharedMemory(name=name)
+                block.close()
+                block.unlink()
+        self._release(size)
+
+    def _release(self, size: int):
+        with self._changed:
+            self.held_bytes -= size
+            self.pending -= 1
+            self._changed.notify_all()
+
+    def close(self):
+        """Free unclaimed renders and stop the workers"""
+        with self._changed:
+            leftovers = [f for futures in self._jobs.values() for f in futures]
+            self._jobs.clear()
+        for future in leftovers:
+            self._discard(future)
+        self.executor.shutdown()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import math
+from fractions import Fraction
+from functools import lru_cache
+from typing import Iterable, Iterator, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+from rpitx_iq import CHUNK_SIZE, SAMPLE_RATE
+
+TAPS_PER_PHASE = 16  # FIR length per polyphase branch, in input samples
+KAISER_BETA = 8.0  # roughly 80 dB stopband
+PASSBAND = 0.3  # fraction of the lower rate passed with under -70 dB of error
+MIN_FACTOR = 4  # below this upsampling factor the filter costs more than it saves
+
+# Render rates that divide the sendiq rate evenly, lowest first
+NATURAL_RATES = (1000, 2000, 3000, 4000, 6000, 8000, 12000)
+
+
+def natural_rate(bandwidth: float, sample_rate: int = SAMPLE_RATE) -> int:
+    """Lowest render rate whose passband covers a signal bandwidth Hz wide (centred on 0)
+
+    Returns sample_rate itself when no rate at least MIN_FACTOR lower would
+    do, as synthesizing directly is then cheaper than filtering.
+    """
+    for rate in NATURAL_RATES:
+        if sample_rate % rate == 0 and rate * MIN_FACTOR <= sample_rate and bandwidth <= 2 * PASSBAND * rate:
+            return rate
+    return sample_rate
+
+
+def filter_delay(up: int, taps: int = TAPS_PER_PHASE) -> int:
+    """Group delay of the prototype filter in upsampled samples"""
+    return (up * taps - 1) // 2
+
+
+@lru_cache(maxsize=32)
+def polyphase_bank(up: int, down: int, taps: int = TAPS_PER_PHASE) -> np.ndarray:
+    """Kaiser-windowed sinc low-pass split into up branches of taps coefficients
+
+    Row p holds the coefficients that produce outputs landing p/up of an
+    input sample after an input sample, reversed so a row dotted with the
+    last taps inputs (oldest first) gives the output. Scaled by up so the
+    passband gain is one.
+    """
+    length = up * taps
+    cutoff = 0.5 / max(up, down)  # cycles per upsampled sample
+    # Centred on a whole upsampled sample so the delay removed later is exact
+    n = np.arange(length) - filter_delay(up, taps)
+    window = np.i0(KAISER_BETA * np.sqrt(np.clip(1 - (n / (length / 2.0)) ** 2, 0, 1))) / np.i0(KAISER_BETA)
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * window * up
+    bank = h.reshape(taps, up).T[:, ::-1]
+    bank = np.ascontiguousarray(bank, dtype=np.complex64)
+    bank.setflags(write=False)
+    return bank
+
+
+class Resampler:
+    """Rational up/down polyphase resampler that keeps its state across chunks
+
+    Output m is taken at m*down/up input samples (after the filter delay is
+    removed by resample_chunks); only the filter branch each output needs
+    is kept from one matrix product over the chunk.
+    """
+
+    def __init__(self, up: int, down: int, taps: int = TAPS_PER_PHASE):
+        ratio = Fraction(up, down)
+        self.up, self.down = ratio.numerator, ratio.denominator
+        self.taps = taps
+        self.bank = polyphase_bank(self.up, self.down, taps)
+        self.history = np.zeros(taps - 1, dtype=np.complex64)
+        # Position of the next output in upsampled units, relative to the
+        # start of the next chunk; starting at the filter delay aligns
+        # output 0 with input 0
+        self.t = filter_delay(self.up, taps)
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Resample one chunk, returning every output that chunk completes"""
+        length = len(chunk)
+        end = length * self.up
+        if self.t >= end:
+            self.t -= end
+            self._remember(chunk)
+            return np.zeros(0, dtype=np.complex64)
+        t = np.arange(self.t, end, self.down, dtype=np.int64)
+        n, phase = np.divmod(t, self.up)
+        extended = np.concatenate((self.history, np.asarray(chunk, dtype=np.complex64)))
+        # One taps-long window per input position, as a view (NumPy 1.19 has
+        # no sliding_window_view)
+        step = extended.strides[0]
+        windows = as_strided(extended[n[0]:], shape=(n[-1] - n[0] + 1, self.taps),
+                             strides=(step, step), writeable=False)
+        # Every branch for every input needed, then the one branch each output uses
+        out = (windows @ self.bank.T)[n - n[0], phase]
+        self.t = int(t[-1]) + self.down - end
+        self._remember(chunk)
+        return out
+
+    def _remember(self, chunk: np.ndarray):
+        keep = self.taps - 1
+        if len(chunk) >= keep:
+            self.history = np.asarray(chunk[len(chunk) - keep:], dtype=np.complex64).copy()
+        else:
+            self.history = np.concatenate((self.history, chunk))[-keep:].astype(np.complex64)
+
+    def flush_samples(self) -> int:
+        """Zero inputs needed to push the last real input through the filter"""
+        return -(-(self.up * self.taps) // (2 * self.up)) + 1
+
+
+def rates(render_rate: int, sample_rate: int = SAMPLE_RATE) -> Tuple[int, int]:
+    """(up, down) taking render_rate to sample_rate"""
+    g = math.gcd(render_rate, sample_rate)
+    return sample_rate // g, render_rate // g
+
+
+def resample_chunks(chunks: Iterable[np.ndarray], render_rate: int,
+                    sample_rate: int = SAMPLE_RATE) -> Iterator[np.ndarray]:
+    """Resample a chunk stream rendered at render_rate to sample_rate
+
+    The output is time-aligned with the input and exactly as long as the
+    input scaled to the new rate; the filter is flushed at the end.
+    """
+    if render_rate == sample_rate:
+        yield from chunks
+        return
+    up, down = rates(render_rate, sample_rate)
+    resampler = Resampler(up, down)
+    # Inputs per step, so each output chunk is about CHUNK_SIZE samples
+    step = max(CHUNK_SIZE * down // up, 1)
+    consumed = 0
+    produced = 0
+    for chunk in chunks:
+        consumed += len(chunk)
+        for start in range(0, len(chunk), step):
+            out = resampler.process(chunk[start:start + step])
+            if len(out):
+                produced += len(out)
+                yield out
+    target = -(-consumed * resampler.up // resampler.down)
+    tail = resampler.process(np.zeros(resampler.flush_samples(), dtype=np.complex64))
+    tail = tail[:max(target - produced, 0)]
+    if len(tail):
+        yield tail
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+import time
+import threading
+from typing import Iterable, Optional
+
+import numpy as np
+
+from rpitx_iq import CHUNK_SIZE, SAMPLE_DTYPES, encode_samples
+
+RING_SLOTS = 8  # chunks buffered between the renderer and the tool's stdin
+
+
+class IQRing:
+    """Preallocated ring of sample buffers between a render thread and a pipe
+
+    A producer thread renders chunks and converts them straight into free
+    slots in the output format; the writer hands each filled slot to the
+    pipe as a memoryview, so samples are never copied into bytes objects.
+
+    underruns counts the times the writer, after the first chunk had been
+    written, found the ring empty and had to wait for the renderer: each
+    one is a moment the tool could have run dry. Waiting for the first
+    chunk is start-up latency, not an underrun. overruns counts the times
+    the renderer found the ring full and had to wait for the pipe, which
+    is normal backpressure when rendering is faster than real time.
+    """
+
+    def __init__(self, iq_type: str = "float", slots: int = RING_SLOTS,
+                 chunk_size: int = CHUNK_SIZE, dither: bool = False):
+        if iq_type not in SAMPLE_DTYPES:
+            raise Exception(f"Unsupported sample format: {iq_type}")
+        self.iq_type = iq_type
+        self.chunk_size = chunk_size
+        self.buffers = [np.empty(2 * chunk_size, dtype=SAMPLE_DTYPES[iq_type]) for _ in range(slots)]
+        self.lengths = [0] * slots
+        self.rng = np.random.default_rng() if dither else None
+        self.underruns = 0
+        self.overruns = 0
+        self.bytes_written = 0
+        self.first_write: Optional[float] = None  # time.monotonic() of the first write
+        self._head = 0  # next slot to fill
+        self._tail = 0  # next slot to drain
+        self._filled = 0
+        self._done = False
+        self._closed = False
+        self._error: Optional[BaseException] = None
+        self._changed = threading.Condition()
+
+    def stats(self) -> dict:
+        return {"underruns": self.underruns, "overruns": self.overruns,
+                "bytes": self.bytes_written, "slots": len(self.buffers)}
+
+    def produce(self, chunks: Iterable[np.ndarray]):
+        """Convert chunks into ring slots until the stream ends or the ring is closed"""
+        values = 2 * self.chunk_size
+        try:
+            for chunk in chunks:
+                # Chunks already in the output type are flat, two values per sample
+                flat = chunk.dtype == self.buffers[0].dtype
+                step = values if flat else self.chunk_size
+                for start in range(0, len(chunk), step):
+                    slot = self._acquire_free()
+                    if slot is None:
+                        return
+                    encoded = encode_samples(chunk[start:start + step], self.iq_type,
+                                             self.buffers[slot], self.rng)
+                    with self._changed:
+                        self.lengths[slot] = len(encoded)
+                        self._head = (slot + 1) % len(self.buffers)
+                        self._filled += 1
+                        self._changed.notify_all()
+        except BaseException as e:
+            self._error = e
+        finally:
+            with self._changed:
+                self._done = True
+                self._changed.notify_all()
+
+    def _acquire_free(self) -> Optional[int]:
+        with self._changed:
+            if self._filled == len(self.buffers) and not self._closed:
+                self.overruns += 1
+                self._changed.wait_for(lambda: self._filled < len(self.buffers) or self._closed)
+            return None if self._closed else self._head
+
+    def write_to(self, stream):
+        """Drain slots into stream until the producer finishes; re-raises its errors"""
+        while True:
+            with self._changed:
+                if not self._filled and not self._done:
+                    if self.first_write is not None:
+                        self.underruns += 1
+                    self._changed.wait_for(lambda: self._filled or self._done)
+                if not self._filled:
+                    break
+                slot = self._tail
+            buffer = self.buffers[slot][:self.lengths[slot]]
+            stream.write(memoryview(buffer))
+            if self.first_write is None:
+                self.first_write = time.monotonic()
+            self.bytes_written += buffer.nbytes
+            with self._changed:
+                self._tail = (slot + 1) % len(self.buffers)
+                self._filled -= 1
+                self._changed.notify_all()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """Stop the producer, e.g. after the tool has gone away"""
+        with self._changed:
+            self._closed = True
+            self._changed.notify_all()
+
+    def stream(self, chunks: Iterable[np.ndarray], output) -> int:
+        """Render chunks on a producer thread while writing them to output; returns bytes written"""
+        producer = threading.Thread(target=self.produce, args=(chunks,), daemon=True)
+        producer.start()
+        try:
+            self.write_to(output)
+        finally:
+            self.close()
+            producer.join()
+        return self.bytes_written
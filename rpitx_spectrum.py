@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+from typing import Iterator, Optional
+
+import numpy as np
+
+from rpitx_image import image_size, load_image
+from rpitx_iq import SAMPLE_RATE
+
+FFT_SIZE = 512  # samples per synthesized frame
+ROW_TIME = 0.1  # seconds on air per image row
+ROW_BLOCK = 32  # rows synthesized per batched FFT call
+PEAK_FACTOR = 3.0  # headroom for the noise-like sum of random-phase bins
+MAX_OCCUPANCY = 0.9  # widest painting as a fraction of the sample rate
+
+
+class SpectrumPainter:
+    """Paints a greyscale image onto the waterfall with per-row inverse FFTs
+
+    Each row becomes a magnitude spectrum across the painting bandwidth.
+    Frames of fft_size samples are synthesized with random phases, sine
+    (square-root Hann) windowed and overlap-added at 50%. Frames with
+    independent phases add in power, and the squared sine windows of
+    overlapping frames sum to one, so rows keep an even power with no
+    frame-rate ripple. The sum of random-phase bins is still noise-like,
+    not constant envelope: it is scaled by PEAK_FACTOR and its rare peaks
+    above full amplitude are clipped by _limit(). Rows are processed in blocks with one 2-D inverse FFT each,
+    and the bottom row is sent first so the image appears upright on a
+    waterfall that scrolls down.
+    """
+
+    def __init__(self, bandwidth: float, row_time: float = ROW_TIME, fft_size: int = FFT_SIZE,
+                 sample_rate: int = SAMPLE_RATE, amplitude: float = 1.0,
+                 seed: Optional[int] = None):
+        bandwidth = min(bandwidth, MAX_OCCUPANCY * sample_rate)
+        self.fft_size = fft_size
+        self.hop = fft_size // 2
+        self.sample_rate = sample_rate
+        self.amplitude = amplitude
+        self.bins = max(int(bandwidth * fft_size / sample_rate), 1)
+        self.frames_per_row = max(int(round(row_time * sample_rate / self.hop)), 1)
+        self.window = np.sin(np.pi * np.arange(fft_size) / fft_size).astype(np.float32)
+        # Painting columns map to FFT bins centred on the carrier
+        self.columns = (np.arange(self.bins) - self.bins // 2) % fft_size
+        self.rng = np.random.default_rng(seed)
+
+    @property
+    def width(self) -> int:
+        """Image columns painted, one per FFT bin"""
+        return self.bins
+
+    def chunks(self, pixels: np.ndarray) -> Iterator[np.ndarray]:
+        """Yield IQ for a (rows, width) greyscale image, one row block at a time"""
+        magnitude = pixels[::-1].astype(np.float32) / 255.0
+        scale = self.amplitude / (PEAK_FACTOR * np.sqrt(self.bins))
+        n, hop = self.fft_size, self.hop
+        tail = np.zeros(hop, dtype=np.complex64)
+        for start in range(0, len(magnitude), ROW_BLOCK):
+            rows = np.repeat(magnitude[start:start + ROW_BLOCK], self.frames_per_row, axis=0)
+            spectra = np.zeros((len(rows), n), dtype=np.complex64)
+            phases = self.rng.random(rows.shape, dtype=np.float32) * np.float32(2 * np.pi)
+            spectra[:, self.columns] = rows * np.exp(1j * phases)
+            frames = np.fft.ifft(spectra, axis=1, norm="forward").astype(np.complex64)
+            frames *= self.window * np.float32(scale)
+            # Overlap-add: each output hop is the second half of one frame plus the first half of the next
+            out = frames[:, :hop].copy()
+            out[0] += tail
+            out[1:] += frames[:-1, hop:]
+            tail = frames[-1, hop:]
+            yield self._limit(out.ravel())
+        yield self._limit(tail.copy())
+
+    def _limit(self, iq: np.ndarray) -> np.ndarray:
+        """Scale down the rare noise peaks above full amplitude"""
+        magnitude = np.abs(iq)
+        over = magnitude > self.amplitude
+        iq[over] *= self.amplitude / magnitude[over]
+        return iq
+
+    def encode(self, image_path: str, rows: Optional[int] = None) -> Iterator[np.ndarray]:
+        """Decode and resize an image once, then stream it
+
+        rows defaults to keeping the image's aspect ratio at one column per bin.
+        """
+        if not rows:
+            width, height = image_size(image_path)
+            rows = max(int(round(height * self.width / width)), 1)
+        return self.chunks(load_image(image_path, (self.width, rows), mode="L"))
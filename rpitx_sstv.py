@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterator, Tuple, Union
+
+import numpy as np
+
+from rpitx_image import load_image
+from rpitx_iq import SAMPLE_RATE, PhaseAccumulator, expj
+
+SYNC = 1200.0
+BLACK = 1500.0
+WHITE = 2300.0
+VIS_LEADER = 1900.0
+VIS_ONE = 1100.0
+VIS_ZERO = 1300.0
+
+# A segment is ("tone", frequency in Hz, ms) or ("scan", channel, ms). A
+# scan channel is a plane name, or (plane, rows) where rows are offsets in
+# the line group that are averaged, e.g. ("R-Y", (0, 1)) for PD chroma.
+Segment = Tuple[str, Union[float, str, tuple], float]
+
+
+@dataclass(frozen=True)
+class SSTVMode:
+    name: str
+    vis: int
+    width: int
+    height: int
+    colorspace: str  # "RGB" or "YUV"
+    lines: Tuple[Tuple[Segment, ...], ...]  # line layouts, used in rotation
+    rows_per_line: int = 1  # image rows sent by one line layout
+    start: Tuple[Segment, ...] = ()  # sent once before the first line
+
+
+def _martin(name: str, vis: int, scan_ms: float) -> SSTVMode:
+    line = (
+        ("tone", SYNC, 4.862), ("tone", BLACK, 0.572),
+        ("scan", "G", scan_ms), ("tone", BLACK, 0.572),
+        ("scan", "B", scan_ms), ("tone", BLACK, 0.572),
+        ("scan", "R", scan_ms), ("tone", BLACK, 0.572),
+    )
+    return SSTVMode(name, vis, 320, 256, "RGB", (line,))
+
+
+def _scottie(name: str, vis: int, scan_ms: float) -> SSTVMode:
+    line = (
+        ("tone", BLACK, 1.5), ("scan", "G", scan_ms),
+        ("tone", BLACK, 1.5), ("scan", "B", scan_ms),
+        ("tone", SYNC, 9.0), ("tone", BLACK, 1.5), ("scan", "R", scan_ms),
+    )
+    return SSTVMode(name, vis, 320, 256, "RGB", (line,), start=(("tone", SYNC, 9.0),))
+
+
+def _pd(name: str, vis: int, width: int, height: int, scan_ms: float) -> SSTVMode:
+    line = (
+        ("tone", SYNC, 20.0), ("tone", BLACK, 2.08),
+        ("scan", ("Y", (0,)), scan_ms), ("scan", ("R-Y", (0, 1)), scan_ms),
+        ("scan", ("B-Y", (0, 1)), scan_ms), ("scan", ("Y", (1,)), scan_ms),
+    )
+    return SSTVMode(name, vis, width, height, "YUV", (line,), rows_per_line=2)
+
+
+ROBOT36 = SSTVMode("Robot36", 8, 320, 240, "YUV", (
+    (("tone", SYNC, 9.0), ("tone", BLACK, 3.0), ("scan", "Y", 88.0),
+     ("tone", BLACK, 4.5), ("tone", 1900.0, 1.5), ("scan", "R-Y", 44.0)),
+    (("tone", SYNC, 9.0), ("tone", BLACK, 3.0), ("scan", "Y", 88.0),
+     ("tone", WHITE, 4.5), ("tone", 1900.0, 1.5), ("scan", "B-Y", 44.0)),
+))
+
+SSTV_MODES: Dict[str, SSTVMode] = {mode.name: mode for mode in (
+    _martin("Martin1", 44, 146.432),
+    _martin("Martin2", 40, 73.216),
+    _scottie("Scottie1", 60, 138.240),
+    _scottie("Scottie2", 56, 88.064),
+    ROBOT36,
+    _pd("PD90", 99, 320, 256, 170.240),
+    _pd("PD120", 95, 640, 496, 121.600),
+)}
+
+
+def vis_segments(code: int) -> Tuple[Segment, ...]:
+    """VIS header: leader, break, leader, start bit, 7 data bits LSB first, even parity, stop bit"""
+    bits = [(code >> i) & 1 for i in range(7)]
+    bits.append(sum(bits) & 1)
+    return (("tone", VIS_LEADER, 300.0), ("tone", SYNC, 10.0), ("tone", VIS_LEADER, 300.0),
+            ("tone", SYNC, 30.0)) + tuple(("tone", VIS_ONE if b else VIS_ZERO, 30.0) for b in bits) + \
+        (("tone", SYNC, 30.0),)
+
+
+def color_planes(pixels: np.ndarray, colorspace: str) -> Dict[str, np.ndarray]:
+    """Split an RGB image into the tone frequency planes a mode scans"""
+    rgb = pixels.astype(np.float32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    if colorspace == "RGB":
+        planes = {"R": r, "G": g, "B": b}
+    else:
+        planes = {
+            "Y": 16.0 + (65.738 * r + 129.057 * g + 25.064 * b) / 256.0,
+            "R-Y": 128.0 + (112.439 * r - 94.154 * g - 18.285 * b) / 256.0,
+            "B-Y": 128.0 + (-37.945 * r - 74.494 * g + 112.439 * b) / 256.0,
+        }
+    return {name: BLACK + plane * ((WHITE - BLACK) / 255.0) for name, plane in planes.items()}
+
+
+@lru_cache(maxsize=64)
+def _pixel_index(samples: int, width: int) -> np.ndarray:
+    """Which pixel each sample of a scan of the given length shows"""
+    index = (np.arange(samples) * width // samples).astype(np.intp)
+    index.setflags(write=False)
+    return index
+
+
+class SSTVEncoder:
+    """Streams an image as SSTV one line at a time with continuous phase"""
+
+    def __init__(self, mode: str = "Martin1", sample_rate: int = SAMPLE_RATE,
+                 amplitude: float = 1.0):
+        if mode not in SSTV_MODES:
+            raise Exception(f"Unsupported SSTV mode: {mode}")
+        self.mode = SSTV_MODES[mode]
+        self.sample_rate = sample_rate
+        self.amplitude = amplitude
+
+    def chunks(self, pixels: np.ndarray) -> Iterator[np.ndarray]:
+        """Yield the VIS header, then one IQ chunk per transmitted line"""
+        mode = self.mode
+        planes = color_planes(pixels, mode.colorspace)
+        osc = PhaseAccumulator(self.sample_rate)
+        clock = [0.0, 0]  # elapsed ms, samples emitted
+
+        def render(segments, rows=0):
+            parts = []
+            for kind, value, ms in segments:
+                clock[0] += ms
+                end = int(round(clock[0] * self.sample_rate / 1000.0))
+                n = end - clock[1]
+                clock[1] = end
+                if kind == "tone":
+                    parts.append(np.full(n, value))
+                else:
+                    plane, offsets = (value, (0,)) if isinstance(value, str) else value
+                    line = planes[plane][[rows + o for o in offsets]].mean(axis=0)
+                    parts.append(line[_pixel_index(n, mode.width)])
+            freqs = np.concatenate(parts)
+            return expj(osc.advance(freqs), self.amplitude)
+
+        yield render(vis_segments(mode.vis) + mode.start)
+        for i, row in enumerate(range(0, mode.height, mode.rows_per_line)):
+            yield render(mode.lines[i % len(mode.lines)], row)
+
+    def encode(self, image_path: str) -> Iterator[np.ndarray]:
+        """Decode and resize an image once, then stream it"""
+        return self.chunks(load_image(image_path, (self.mode.width, self.mode.height)))
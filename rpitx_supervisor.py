@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import os
+import time
+import signal
+import threading
+import subprocess
+from dataclasses import asdict, dataclass
+from typing import Iterable, Iterator, List, Optional
+
+import numpy as np
+
+CANCEL_GRACE = 2.0  # seconds between SIGTERM and SIGKILL on cancel
+DEADLINE_FACTOR = 1.5  # time allowed as a multiple of the expected duration
+DEADLINE_SLACK = 10.0  # seconds added to every deadline for start-up and teardown
+DEFAULT_TIMEOUT = 600.0  # deadline when the expected duration is unknown
+
+
+def deadline_for(duration: Optional[float]) -> float:
+    """Seconds a tool expected to run for duration may take before it is considered hung"""
+    if duration is None:
+        return DEFAULT_TIMEOUT
+    return duration * DEADLINE_FACTOR + DEADLINE_SLACK
+
+
+@dataclass
+class ResourceUsage:
+    """What a tool run cost, from os.wait4 (includes children it waited for)"""
+    user_s: float
+    system_s: float
+    max_rss_kb: int  # peak resident set size
+    voluntary_switches: int  # context switches while blocked, e.g. on its input
+    involuntary_switches: int  # context switches from being preempted
+    wall_s: float
+
+    @classmethod
+    def from_rusage(cls, rusage, wall_s: float) -> "ResourceUsage":
+        return cls(rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss,
+                   rusage.ru_nvcsw, rusage.ru_nivcsw, wall_s)
+
+    @property
+    def cpu_s(self) -> float:
+        return self.user_s + self.system_s
+
+    def as_dict(self) -> dict:
+        return dict(asdict(self), cpu_s=self.cpu_s)
+
+
+def _exit_code(status: int) -> int:
+    """Popen-style return code from a wait status: the exit code, or -signal if killed"""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class SupervisedProcess:
+    """An rpitx tool run in its own process group under a deadline
+
+    The tool is started as a session leader, so stop() reaches any helper
+    it spawns: SIGTERM to the whole group, then SIGKILL after CANCEL_GRACE.
+    A watchdog thread calls stop() once timeout seconds have passed;
+    expect() pushes that back for tools fed samples as they are rendered,
+    so the deadline follows the audio streamed so far. wait() reaps
+    the tool with os.wait4 and keeps its ResourceUsage. The group is only
+    signalled while the leader is unreaped, so its id cannot have been
+    reused.
+    """
+
+    def __init__(self, command: List[str], timeout: Optional[float] = None, **popen_args):
+        self.command = command
+        self.started = time.monotonic()
+        self.proc = subprocess.Popen(command, start_new_session=True, **popen_args)
+        self.pid = self.proc.pid
+        self.timeout = timeout  # seconds from start, None for no deadline
+        self.returncode: Optional[int] = None
+        self.usage: Optional[ResourceUsage] = None
+        self.timed_out = False
+        self.cancelled = False
+        self._exited = threading.Event()  # the leader has exited (possibly unreaped)
+        self._lock = threading.Lock()
+        self._reaped = False
+        if timeout is not None:
+            threading.Thread(target=self._watchdog, daemon=True).start()
+
+    def expect(self, duration: float):
+        """Allow the tool to run for at least the deadline of duration seconds on air"""
+        if self.timeout is not None:
+            self.timeout = max(self.timeout, deadline_for(duration))
+
+    def _watchdog(self):
+        while True:
+            remaining = self.started + self.timeout - time.monotonic()
+            if self._exited.wait(max(remaining, 0.0)):
+                return
+            if time.monotonic() >= self.started + self.timeout:
+                break
+        self.timed_out = True
+        self.stop()
+
+    def _signal(self, signum: int) -> bool:
+        with self._lock:
+            if self._reaped:
+                return False
+            try:
+                os.killpg(self.pid, signum)
+            except ProcessLookupError:
+                return False
+            return True
+
+    def stop(self, grace: float = CANCEL_GRACE):
+        """Terminate the tool's process group, killing it if it lingers"""
+        if not self._signal(signal.SIGTERM):
+            return
+        if not self._exited.wait(grace):
+            self._signal(signal.SIGKILL)
+
+    def kill(self):
+        """SIGKILL the tool's process group at once"""
+        self._signal(signal.SIGKILL)
+
+    def cancel(self):
+        """Stop the tool at the user's request"""
+        self.cancelled = True
+        threading.Thread(target=self.stop, daemon=True).start()
+
+    def wait(self) -> int:
+        """Wait for the tool to exit, reap it and record its resource usage"""
+        if self.returncode is not None:
+            return self.returncode
+        # Wait without reaping first, so the group id stays valid for stop()
+        os.waitid(os.P_PID, self.pid, os.WEXITED | os.WNOWAIT)
+        self._exited.set()
+        with self._lock:
+            _, status, rusage = os.wait4(self.pid, 0)
+            self._reaped = True
+        self.returncode = _exit_code(status)
+        self.proc.returncode = self.returncode  # Popen must not try to reap it again
+        self.usage = ResourceUsage.from_rusage(rusage, time.monotonic() - self.started)
+        return self.returncode
+
+    def failure(self, stderr: str = "") -> Optional[str]:
+        """Error message for an unsuccessful run, or None if it succeeded"""
+        tool = os.path.basename(self.command[0])
+        if self.timed_out:
+            return f"{tool} timed out after {self.timeout:.1f}s and was killed"
+        if self.cancelled:
+            return f"{tool} was cancelled"
+        if self.returncode:
+            return f"{tool} error: {stderr}"
+        return None
+
+
+def deadline_chunks(chunks: Iterable[np.ndarray], process: SupervisedProcess,
+                    sample_rate: int) -> Iterator[np.ndarray]:
+    """Pass chunks through, extending process's deadline to cover the samples fed so far"""
+    samples = 0
+    for chunk in chunks:
+        # Chunks replayed as int16 are flat, two values per sample
+        samples += len(chunk) if np.iscomplexobj(chunk) else len(chunk) // 2
+        process.expect(samples / sample_rate)
+        yield chunk
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+import time
+import threading
+from collections import deque
+from typing import List, Optional
+
+import numpy as np
+
+from rpitx_export import as_complex
+
+FRAME_RATE = 10.0  # waterfall rows per second at most
+FFT_SIZE = 1024  # samples per frame
+WIDTH = 512  # pixels per row; FFT bins are max-pooled down to this
+FLOOR_DB = -90.0  # dBFS drawn black
+MAX_ROWS = 32  # rendered rows held for a display that has fallen behind
+
+# Black -> blue -> cyan -> yellow -> white
+_STOPS = np.array([[0, 0, 0], [0, 0, 160], [0, 200, 255], [255, 230, 0], [255, 255, 255]], dtype=float)
+_LEVELS = np.linspace(0, 255, len(_STOPS))
+PALETTE = np.array(["#%02x%02x%02x" % tuple(int(np.interp(i, _LEVELS, _STOPS[:, k])) for k in range(3))
+                    for i in range(256)])
+
+
+class WaterfallFeed:
+    """Turns a stream of IQ chunks into throttled waterfall rows
+
+    feed() runs on the streaming thread and only keeps a reference to at
+    most one chunk per frame interval, so it costs nothing in between.
+    A worker thread transforms each kept chunk (windowed FFT, max-pooled
+    to width pixels, mapped to colours) into a row string ready for
+    PhotoImage.put(); the display drains them with rows() on its own
+    schedule. At FRAME_RATE rows per second this is one small FFT per
+    frame however fast samples are produced.
+    """
+
+    def __init__(self, frame_rate: float = FRAME_RATE, fft_size: int = FFT_SIZE,
+                 width: int = WIDTH, floor_db: float = FLOOR_DB):
+        if fft_size % width:
+            raise Exception(f"Waterfall FFT size {fft_size} is not a multiple of its width {width}")
+        self.interval = 1.0 / frame_rate
+        self.fft_size = fft_size
+        self.width = width
+        self.floor_db = floor_db
+        self.window = np.hanning(fft_size).astype(np.float32)
+        self.full_scale = float(self.window.sum()) ** 2
+        self.frames = 0
+        self._due = 0.0
+        self._chunk: Optional[np.ndarray] = None
+        self._rows: deque = deque(maxlen=MAX_ROWS)
+        self._changed = threading.Condition()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def feed(self, chunk: np.ndarray):
+        """Offer a chunk of outgoing IQ; dropped unless a frame is due"""
+        now = time.monotonic()
+        if now < self._due or len(chunk) == 0:
+            return
+        self._due = now + self.interval
+        with self._changed:
+            self._chunk = chunk
+            self._changed.notify()
+
+    def rows(self) -> List[str]:
+        """Rows rendered since the last call, oldest first"""
+        with self._changed:
+            rows = list(self._rows)
+            self._rows.clear()
+        return rows
+
+    def close(self):
+        with self._changed:
+            self._closed = True
+            self._changed.notify()
+
+    def _run(self):
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: self._chunk is not None or self._closed)
+                if self._closed:
+                    return
+                chunk, self._chunk = self._chunk, None
+            row = self.render_row(chunk)
+            with self._changed:
+                self._rows.append(row)
+                self.frames += 1
+
+    def levels(self, chunk: np.ndarray) -> np.ndarray:
+        """Power in dBFS across the band, carrier in the middle, width values"""
+        samples = as_complex(chunk)[-self.fft_size:]
+        if len(samples) < self.fft_size:
+            samples = np.concatenate((np.zeros(self.fft_size - len(samples), dtype=np.complex64), samples))
+        spectrum = np.fft.fftshift(np.fft.fft(samples * self.window))
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        pooled = power.reshape(self.width, -1).max(axis=1)
+        return 10.0 * np.log10(np.maximum(pooled / self.full_scale, 1e-20))
+
+    def render_row(self, chunk: np.ndarray) -> str:
+        """One waterfall row as PhotoImage.put() data"""
+        scaled = (self.levels(chunk) - self.floor_db) * (255.0 / -self.floor_db)
+        indices = np.clip(scaled, 0, 255).astype(np.uint8)
+        return "{" + " ".join(PALETTE[indices]) + "}"
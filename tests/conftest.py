@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rpitx_chirp import RadioConfig  # noqa: E402
+from rpitx_image import ImageCache, set_image_cache  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def memory_image_cache():
+    """Keep image caching in memory so tests never touch ~/.cache"""
+    set_image_cache(ImageCache(None))
+    yield
+    set_image_cache(None)
+
+
+@pytest.fixture
+def config():
+    return RadioConfig(frequency=145500000, modulation="FM", power=1.0, bandwidth=12500, name="test")
+
+
+@pytest.fixture
+def fake_rpitx(tmp_path):
+    """Stand-in rpitx tools first on PATH, draining input as fast as it comes; yields their call log"""
+    from rpitx_bench import fake_tools
+    directory = tmp_path / "bin"
+    directory.mkdir()
+    with fake_tools(0.0, str(directory)) as log:
+        yield log
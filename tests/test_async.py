@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from rpitx_chirp import RpiTX
+from rpitx_iq import CHUNK_SIZE, tone_chunks
+
+
+class SlowRadio(RpiTX):
+    """A mode whose every chunk takes as long to render as a slow SSTV line"""
+
+    def _render_slow(self, config, chunks: int = 5, delay: float = 0.2):
+        for chunk in tone_chunks(chunks * CHUNK_SIZE / 48000, 1000.0):
+            time.sleep(delay)
+            yield chunk
+
+
+def test_loop_stays_responsive_during_heavy_render(config, fake_rpitx):
+    async def run():
+        radio = SlowRadio(occupancy="off")
+        gaps = []
+
+        async def ticker():
+            last = time.monotonic()
+            while True:
+                await asyncio.sleep(0.01)
+                now = time.monotonic()
+                gaps.append(now - last)
+                last = now
+
+        ticks = asyncio.ensure_future(ticker())
+        handle = await radio.transmit_async("slow", config)
+        await handle
+        ticks.cancel()
+        assert handle.samples_sent == 5 * CHUNK_SIZE
+        return gaps
+
+    gaps = asyncio.run(run())
+    assert len(gaps) > 50
+    assert max(gaps) < 0.1
+
+
+def test_async_transmissions_are_recorded(config, fake_rpitx):
+    async def run():
+        radio = RpiTX(occupancy="off")
+        records = []
+        radio.add_hook(records.append)
+        await (await radio.transmit_async("tone", config, duration=0.5, tone_freq=1000.0))
+        slow = await SlowRadio(occupancy="off", metrics=radio.metrics).transmit_async("slow", config)
+        await asyncio.sleep(0.3)
+        slow.cancel()
+        try:
+            await slow
+        except asyncio.CancelledError:
+            pass
+        return records
+
+    done, cancelled = asyncio.run(run())
+    assert done["status"] == "ok"
+    assert set(done["timings"]) >= {"plan", "spawn", "render", "first_sample", "transmit", "teardown", "total"}
+    assert cancelled["status"] == "cancelled"
+    assert cancelled["mode"] == "slow"
+
+
+def test_async_tool_is_supervised(config, tmp_path, monkeypatch):
+    import rpitx_async
+    import rpitx_supervisor
+    hung = tmp_path / "sendiq"
+    hung.write_text("#!/bin/sh\nsleep 30 &\nwait\n")  # never reads, and forks a helper
+    hung.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+    monkeypatch.setattr(rpitx_async, "deadline_for", lambda duration: 0.5)
+    monkeypatch.setattr(rpitx_supervisor, "deadline_for", lambda duration: 0.5)
+
+    async def run():
+        radio = RpiTX(occupancy="off")
+        records = []
+        radio.add_hook(records.append)
+        handle = await radio.transmit_async("tone", config, duration=5.0, tone_freq=1000.0)
+        with pytest.raises(Exception, match="timed out"):
+            await handle
+        return handle, records
+
+    start = time.monotonic()
+    handle, [record] = asyncio.run(run())
+    assert time.monotonic() - start < 5
+    assert record["status"] == "timeout"
+    assert record["resources"]["max_rss_kb"] > 0
+    assert handle.usage is not None and handle.failure.startswith("sendiq timed out")
+
+
+
+class CapturingRadio(RpiTX):
+    """Sends rendered samples to a file instead of sendiq"""
+
+    def _sendiq_command(self, config, sample_rate, iq_type):
+        return ["sh", "-c", f"cat > {self.output}"]
+
+
+@pytest.mark.parametrize("dither", [False, True])
+def test_async_sends_are_dithered_like_sync_ones(config, tmp_path, dither):
+    radio = CapturingRadio(occupancy="off", iq_type="i16", dither=dither)
+    radio.output = tmp_path / "sent.i16"
+
+    async def run():
+        await (await radio.transmit_async("tone", replace(config, power=0.0), duration=0.1, tone_freq=1000.0))
+
+    asyncio.run(run())
+    samples = np.frombuffer(radio.output.read_bytes(), dtype=np.int16)
+    assert len(samples) and samples.any() == dither
@@ -0,0 +1,33 @@
+import numpy as np
+from PIL import Image
+
+from rpitx_cache import RenderCache
+from rpitx_chirp import RpiTX
+
+
+def _paint(path, colour):
+    Image.new("RGB", (16, 8), colour).save(path)
+
+
+def test_edited_image_misses_cache(tmp_path, config):
+    image = str(tmp_path / "img.png")
+    radio = RpiTX(render_cache=RenderCache(str(tmp_path / "iq")), occupancy="off")
+    first, second = str(tmp_path / "first.cf32"), str(tmp_path / "second.cf32")
+
+    _paint(image, (255, 255, 255))
+    radio.export("spectrum", first, config, image_path=image, row_time=0.01)
+    _paint(image, (0, 0, 0))
+    radio.export("spectrum", second, config, image_path=image, row_time=0.01)
+
+    assert radio.cache_hits == 0
+    assert radio.cache_misses == 2
+    assert not np.array_equal(np.fromfile(first, np.complex64), np.fromfile(second, np.complex64))
+
+
+def test_unchanged_image_hits_cache(tmp_path, config):
+    image = str(tmp_path / "img.png")
+    radio = RpiTX(render_cache=RenderCache(str(tmp_path / "iq")), occupancy="off")
+    _paint(image, (255, 255, 255))
+    for name in ("first.cf32", "second.cf32"):
+        radio.export("spectrum", str(tmp_path / name), config, image_path=image, row_time=0.01)
+    assert radio.cache_hits == 1
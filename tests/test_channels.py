@@ -0,0 +1,39 @@
+import os
+from dataclasses import replace
+
+import pytest
+
+from rpitx_channels import ChannelStore
+from rpitx_chirp import RadioConfig
+
+
+def test_damaged_store_opens_read_only(tmp_path, config):
+    path = str(tmp_path / "channels.json")
+    store = ChannelStore(path)
+    store.put(config)
+    with open(store.journal_path, "a") as f:
+        f.write('{"op": "put", "config": {"bogus": 1}}\n')
+    with pytest.raises(Exception):
+        ChannelStore(path)
+    store = ChannelStore(path, read_only=True)
+    assert [c.name for c in store] == [config.name]
+    assert store.errors
+    with pytest.raises(Exception, match="read-only"):
+        store.put(RadioConfig(146000000, "FM", 1.0, 12500, "other"))
+    with pytest.raises(Exception, match="read-only"):
+        store.remove(config.name)
+    assert sorted(os.listdir(tmp_path)) == ["channels.json.journal"]
+
+
+def test_writes_after_a_torn_entry_survive(tmp_path, config):
+    path = str(tmp_path / "channels.json")
+    store = ChannelStore(path)
+    store.put(replace(config, name="a"))
+    store.close()
+    with open(store.journal_path, "a") as f:
+        f.write('{"op": "put", "conf')  # crash mid-write
+    store = ChannelStore(path)
+    store.put(replace(config, name="b"))
+    store.put(replace(config, name="c"))
+    store.close()
+    assert [c.name for c in ChannelStore(path)] == ["a", "b", "c"]
@@ -0,0 +1,47 @@
+import pytest
+
+from rpitx_composite import Channel, as_channel, check_offsets
+
+
+def test_readme_example_passes():
+    check_offsets([as_channel({"mode": "tone", "offset": -10000}),
+                   as_channel({"mode": "morse", "offset": 5000, "bandwidth": 2000}),
+                   as_channel({"mode": "pocsag", "offset": 15000})], 12500)
+
+
+def test_touching_channels_pass():
+    check_offsets([Channel("tone", -6250), Channel("tone", 6250)], 12500)
+
+
+def test_overlapping_channels_are_refused():
+    with pytest.raises(Exception, match="overlap"):
+        check_offsets([Channel("tone", 0), Channel("tone", 10000)], 12500)
+
+
+def test_channel_past_nyquist_is_refused():
+    # Centre inside MAX_OFFSET, but the upper edge folds over 24 kHz
+    with pytest.raises(Exception, match="runs past"):
+        check_offsets([Channel("pocsag", 20000)], 12500)
+
+
+def test_channel_bandwidth_overrides_default():
+    check_offsets([Channel("morse", 0, bandwidth=1000), Channel("morse", 1000, bandwidth=1000)], 12500)
+
+
+def test_chirp_train_channel_gets_its_sweep_width(config):
+    from rpitx_chirp import RpiTX
+    channel = as_channel({"mode": "chirp_train", "offset": 0, "bandwidth": 6000, "pri": 0.01})
+    assert channel.bandwidth == 6000 and "bandwidth" not in channel.params
+    chunks = RpiTX(occupancy="off")._render_composite(config, [channel])
+    assert sum(len(c) for c in chunks) > 0
+
+
+def test_readme_example_passes_mask_enforcement(config, tmp_path):
+    from rpitx_chirp import RpiTX
+    channels = [{"mode": "tone", "offset": -10000, "duration": 1, "tone_freq": 1000},
+                {"mode": "morse", "offset": 5000, "text": "DE N0CALL", "modulation": "USB", "bandwidth": 2000},
+                {"mode": "pocsag", "offset": 15000, "message": "Hello", "gain": 0.5}]
+    radio = RpiTX(occupancy="enforce")
+    radio.export("composite", str(tmp_path / "composite.cf32"), config, channels=channels)
+    assert radio.last_occupancy.in_mask
+    assert radio.last_occupancy.bandwidth == 2 * (15000 + config.bandwidth / 2)
@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import threading
+import subprocess
+
+from rpitx_chirp import RpiTX
+from rpitx_daemon import TransmitDaemon, submit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _wait_for(path, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, f"{path} never appeared"
+        time.sleep(0.05)
+
+
+def _request(path, line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(line + b"\n")
+        with sock.makefile("rb") as replies:
+            return json.loads(replies.readline())
+
+
+def test_bad_requests_get_error_replies(tmp_path):
+    path = str(tmp_path / "tx.sock")
+    daemon = TransmitDaemon(RpiTX(occupancy="off"), path)
+    server = threading.Thread(target=daemon.serve_forever, daemon=True)
+    server.start()
+    try:
+        _wait_for(path)
+        for line in (b"[1, 2]", b'"tone"', b"{not json", b'{"mode": "tone", "config": 5}'):
+            reply = _request(path, line)
+            assert reply["status"] == "error", line
+        assert _request(path, b'{"command": "status"}')["status"] == "ok"
+    finally:
+        daemon.shutdown()
+        server.join(5)
+    assert not os.path.exists(path)
+
+
+def test_sigterm_cleans_up(tmp_path, fake_rpitx):
+    path = str(tmp_path / "tx.sock")
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "rpitx_daemon.py"), "--socket", path,
+                             "--render-workers", "1", "--occupancy", "off"],
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        _wait_for(path)
+        reply = submit({"mode": "tone", "params": {"duration": 0.1, "tone_freq": 1000},
+                        "config": {"frequency": 145500000, "modulation": "FM", "power": 1.0,
+                                   "bandwidth": 12500}}, path)
+        assert reply["status"] == "done", reply
+        proc.send_signal(signal.SIGTERM)
+        proc.communicate(timeout=15)
+    finally:
+        proc.kill()
+    assert not os.path.exists(path)
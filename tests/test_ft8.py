@@ -0,0 +1,64 @@
+import pytest
+
+from rpitx_bench import read_calls
+from rpitx_chirp import RpiTX
+from rpitx_ft8 import FT8_SLOT, next_slot_start, tones, wait_for_slot
+from rpitx_iq import SAMPLE_RATE
+
+# Channel symbols for standard messages, cross-checked against an independent encoder
+REFERENCE_TONES = {
+    "CQ K1ABC FN42": "3140652000000001005476704606021533433140652736011047517007334745455133543140652",
+    "WM3PEN EA6VQ +08": "3140652733363401044634242717464430573140652674704515004212442016610544243140652",
+    "EC5A 9A5E RR73": "3140652222347640056405414017455436253140652264556704777461217600300412513140652",
+    "E67A/P EA6VQ R-08": "3140652221125471344634242727463466343140652475206351451426312376016235413140652",
+}
+
+
+@pytest.mark.parametrize("message", REFERENCE_TONES)
+def test_reference_tones(message):
+    assert "".join(map(str, tones([message])[0])) == REFERENCE_TONES[message]
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.mark.parametrize("now, start", [
+    (1000.2, 1005.5),  # slots start at 990 and 1005 UTC
+    (990.5, 990.5),    # exactly on a slot start
+    (990.6, 1005.5),
+    (1004.9, 1005.5),
+])
+def test_next_slot_start(now, start):
+    assert next_slot_start(now) == pytest.approx(start)
+
+
+def test_wait_for_slot_sleeps_to_the_boundary():
+    clock = FakeClock(1_700_000_003.25)
+    start = wait_for_slot(clock, clock.sleep)
+    assert start % FT8_SLOT == pytest.approx(0.5)
+    assert clock.now == pytest.approx(start)
+    assert sum(clock.sleeps) == pytest.approx(start - 1_700_000_003.25)
+
+
+def test_batch_starts_on_a_slot_with_each_message_in_its_own(config, fake_rpitx):
+    radio = RpiTX(occupancy="off")
+    clock = FakeClock(1_700_000_007.0)
+    radio.clock, radio.sleep = clock, clock.sleep
+    radio.current_config = config
+    radio.transmit_ft8_batch(["CQ N0CALL FN31", "N0CALL K1ABC FN42", "K1ABC N0CALL RR73"])
+
+    assert clock.now == pytest.approx(1_700_000_010.5)  # slot at ...010 UTC plus 0.5 s
+    [call] = read_calls(fake_rpitx)
+    samples = call["bytes"] // 8
+    # Two whole slots, then the last message's 12.64 s
+    assert samples == 2 * int(FT8_SLOT * SAMPLE_RATE) + int(round(79 / 6.25 * SAMPLE_RATE))
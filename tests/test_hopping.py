@@ -0,0 +1,28 @@
+import numpy as np
+
+from rpitx_chirp import RpiTX
+from rpitx_cli import attach_negative_values
+from rpitx_hopping import HopNCO, measure_hops
+
+HOPS = [(-15000, 0.002), (0, 0.002), (12000, 0.002)]
+
+
+def test_negative_hop_offsets_parse_as_a_value():
+    argv = ["-f", "145.5", "--hop", "-5000:5,5000:5", "-d", "2"]
+    assert attach_negative_values(argv, ("--hop",)) == ["-f", "145.5", "--hop=-5000:5,5000:5", "-d", "2"]
+
+
+def test_hopped_carrier_passes_mask_enforcement(config, tmp_path):
+    radio = RpiTX(occupancy="enforce")
+    radio.export("hop", str(tmp_path / "hop.cf32"), config, hops=HOPS, duration=0.5)
+    assert radio.last_occupancy.in_mask
+    assert radio.last_occupancy.bandwidth == 30000 + config.bandwidth
+
+
+def test_carrier_hops_to_the_scheduled_offsets():
+    periods = 3
+    iq = np.concatenate(list(HopNCO(HOPS).carrier(periods * sum(dwell for _, dwell in HOPS))))
+    measured = measure_hops(iq, HOPS)
+    expected = [offset for offset, _ in HOPS] * periods
+    assert len(measured) == len(expected)
+    assert np.allclose(measured, expected, atol=5)
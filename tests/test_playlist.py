@@ -0,0 +1,37 @@
+import pytest
+
+from rpitx_bench import read_calls
+from rpitx_chirp import RpiTX
+from rpitx_playlist import PlaylistItem, PlaylistPlayer
+
+
+def _tone(config, **params):
+    return PlaylistItem("tone", dict({"duration": 0.3, "tone_freq": 1000.0}, **params), config)
+
+
+def test_joined_items_keep_their_own_records(config, fake_rpitx):
+    radio = RpiTX()
+    records = []
+    radio.add_hook(records.append)
+    PlaylistPlayer(radio).play([_tone(config), _tone(config, tone_freq=1500.0), _tone(config)])
+
+    assert len(read_calls(fake_rpitx)) == 1  # one joined sendiq run
+    assert [r["status"] for r in records] == ["ok"] * 3
+    for record in records:
+        assert {"plan", "render", "transmit"} <= set(record["timings"])
+        assert record["occupancy"]["segments"] > 0
+    # The joined items' peaks are their own tones, not the first item's
+    assert [round(r["occupancy"]["peak_offset"], -2) for r in records] == [1000.0, 1500.0, 1000.0]
+
+
+def test_next_item_failure_waits_for_current_item(config, fake_rpitx):
+    radio = RpiTX(occupancy="off")
+    records = []
+    radio.add_hook(records.append)
+    broken = PlaylistItem("tone", {"duration": 0.3}, config)  # no tone_freq
+    with pytest.raises(Exception, match="tone_freq"):
+        PlaylistPlayer(radio).play([_tone(config), broken])
+
+    assert [r["status"] for r in records] == ["ok"]
+    [call] = read_calls(fake_rpitx)
+    assert call["bytes"] == int(0.3 * 48000) * 8
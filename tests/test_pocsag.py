@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+from rpitx_chirp import RpiTX
+from rpitx_occupancy import OccupancyAnalyzer
+from rpitx_pocsag import POCSAG_BITRATES, render_pocsag
+
+
+def test_default_page_passes_mask_enforcement(config, tmp_path):
+    radio = RpiTX(occupancy="enforce")
+    radio.export("pocsag", str(tmp_path / "page.cf32"), config, message="Hello World")
+    assert radio.last_occupancy.in_mask
+
+
+@pytest.mark.parametrize("bitrate", POCSAG_BITRATES)
+def test_every_bitrate_fits_a_narrow_channel(bitrate):
+    analyzer = OccupancyAnalyzer(12500, enforce=True)
+    analyzer.update(render_pocsag([(1234, 3, "Hello World")], bitrate))
+    assert analyzer.report().in_mask
+
+
+def test_shaping_keeps_constant_envelope():
+    iq = render_pocsag([(1234, 3, "Hello World")])
+    assert np.allclose(np.abs(iq), 1.0, atol=1e-3)
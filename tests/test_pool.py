@@ -0,0 +1,77 @@
+import os
+import time
+
+import numpy as np
+import pytest
+
+from rpitx_chirp import RpiTX
+from rpitx_pool import RenderPool
+
+TONE = {"duration": 0.5, "tone_freq": 1000.0}
+
+
+def _blocks():
+    return set(os.listdir("/dev/shm"))
+
+
+def _until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def pool():
+    pool = RenderPool(1)
+    yield pool
+    pool.close()
+
+
+def test_unconsumed_take_frees_slot_and_block(config, pool):
+    radio = RpiTX(render_pool=pool, occupancy="off")
+    before = _blocks()
+    radio.prerender("tone", config, **TONE)
+    _until(lambda: pool.held_bytes > 0)
+    assert len(_blocks() - before) == 1
+    plan = radio.plan("tone", config, **TONE)
+    plan.close()
+    assert pool.pending == 0 and pool.held_bytes == 0
+    assert _blocks() == before
+
+
+def test_take_before_render_finishes_is_freed_later(config, pool):
+    radio = RpiTX(render_pool=pool, occupancy="off")
+    before = _blocks()
+    radio.prerender("tone", config, duration=20.0, tone_freq=1000.0)
+    radio.plan("tone", config, duration=20.0, tone_freq=1000.0).close()
+    _until(lambda: pool.pending == 0)
+    assert pool.held_bytes == 0
+    assert _blocks() == before
+
+
+def test_failed_execute_frees_slot(config, pool, tmp_path, monkeypatch):
+    monkeypatch.setenv("PATH", str(tmp_path))  # no sendiq to run
+    radio = RpiTX(render_pool=pool, occupancy="off")
+    before = _blocks()
+    radio.prerender("tone", config, **TONE)
+    with pytest.raises(OSError):
+        radio.execute(radio.plan("tone", config, **TONE))
+    _until(lambda: pool.pending == 0)
+    assert _blocks() == before
+
+
+def test_workers_render_with_the_radio_settings(config):
+    radio = RpiTX(occupancy="off", resample=False)
+    rtty = {"text": "RYRY"}  # renders differently with resampling
+    inline = np.concatenate(list(radio.plan("rtty", config, **rtty).chunks))
+    radio.render_pool = RenderPool(1, radio_settings=radio.render_settings())
+    try:
+        radio.prerender("rtty", config, **rtty)
+        plan = radio.plan("rtty", config, **rtty)
+        assert plan.release is not None  # streamed from the pool
+        pooled = np.concatenate(list(plan.chunks))
+        plan.close()
+    finally:
+        radio.render_pool.close()
+    assert np.array_equal(pooled, inline)
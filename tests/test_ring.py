@@ -0,0 +1,31 @@
+import io
+import time
+
+import numpy as np
+
+from rpitx_ring import IQRing
+
+
+def chunks(delays):
+    """One chunk after each delay, in seconds"""
+    for delay in delays:
+        time.sleep(delay)
+        yield np.ones(1024, dtype=np.complex64)
+
+
+def test_waiting_for_the_first_chunk_is_not_an_underrun():
+    ring = IQRing(chunk_size=1024)
+    ring.stream(chunks([0.05]), io.BytesIO())
+    assert ring.underruns == 0
+
+
+def test_stall_after_the_first_chunk_is_an_underrun():
+    ring = IQRing(chunk_size=1024)
+    ring.stream(chunks([0, 0.05]), io.BytesIO())
+    assert ring.underruns == 1
+
+
+def test_waits_mid_stream_are_underruns():
+    ring = IQRing(chunk_size=1024)
+    ring.stream(chunks([0.05, 0.05, 0.05, 0.05]), io.BytesIO())
+    assert ring.underruns == 3
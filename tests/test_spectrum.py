@@ -0,0 +1,16 @@
+import numpy as np
+
+from rpitx_spectrum import SpectrumPainter
+
+
+def test_power_is_flat_across_frames():
+    painter = SpectrumPainter(20000, seed=1)
+    pixels = np.full((64, painter.width), 255, dtype=np.uint8)
+    iq = np.concatenate(list(painter.chunks(pixels)))
+    period = painter.fft_size
+    frames = len(iq) // period
+    # Mean power at each 32-sample step of the frame period, over every frame
+    power = np.abs(iq[:frames * period]) ** 2
+    profile = power.reshape(frames, period // 32, 32).mean(axis=(0, 2))
+    ripple = 10 * np.log10(profile.max() / profile.min())
+    assert ripple < 0.5